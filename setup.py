@@ -7,4 +7,5 @@ setup(
     description="Dada2 Parameter optimization",
     python_requires=">=3.10",
     packages=find_packages(),
+    extras_require={"zstd": ["zstandard"]},
 )
@@ -0,0 +1,379 @@
+import argparse as arg
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from smartdada2.pipeline import trimming_tables
+from smartdada2.reader import reader
+from smartdada2.reader.cache import DEFAULT_DISK_CACHE_SIZE
+from smartdada2.reader.compression import (
+    COMPRESSION_RATIO,
+    COMPRESSION_SUFFIXES,
+    is_supported_path,
+)
+
+# estimated memory used by a worker, independent of the file size (bytes)
+BASE_MEMORY = 128 * 1024 * 1024
+
+# estimated memory per byte of an uncompressed fastq file: per read arrays
+# and the sum of expected errors table
+MEMORY_PER_BYTE = 0.5
+
+
+def find_samples(input_path: str) -> list[tuple[str, str]]:
+    """Collects the samples of a directory or a manifest file.
+
+    A directory contains one FASTQ file per sample, the sample name is the
+    file name without the FASTQ and compression extensions. A manifest
+    contains one sample per line, either a file path or a sample name and a
+    file path separated by a tab. Empty lines and lines starting with "#"
+    are ignored, relative paths are relative to the manifest.
+
+    Args:
+        input_path (str): directory or manifest file path
+
+    Returns:
+        list: (sample name, FASTQ file path) tuples
+    """
+    if not isinstance(input_path, str):
+        raise TypeError("must be a file path of type string")
+
+    path = Path(input_path)
+    samples = []
+    if path.is_dir():
+        for fpath in sorted(path.iterdir()):
+            if fpath.is_file() and is_supported_path(fpath):
+                samples.append((sample_name(fpath), str(fpath)))
+    else:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if len(line) == 0 or line.startswith("#"):
+                    continue
+
+                fields = line.split("\t")
+                if len(fields) > 2:
+                    raise ValueError(f"invalid manifest line: {line}")
+                fpath = path.parent / fields[-1]
+                name = fields[0] if len(fields) == 2 else sample_name(fpath)
+                samples.append((name, str(fpath)))
+
+    # samples are the keys of the combined tables
+    names = [name for name, _ in samples]
+    if len(set(names)) != len(names):
+        raise ValueError("sample names must be unique")
+    return samples
+
+
+def sample_name(fpath: Path) -> str:
+    """Removes the FASTQ and compression extensions of a file name.
+
+    Args:
+        fpath (Path): FASTQ file path
+
+    Returns:
+        str: sample name
+    """
+    name = fpath.name
+    if fpath.suffix.lower() in COMPRESSION_SUFFIXES:
+        name = name[: -len(fpath.suffix)]
+    return name[: -len(".fastq")]
+
+
+def estimate_memory(fpath: str) -> int:
+    """Estimates the memory needed to profile a FASTQ file.
+
+    Args:
+        fpath (str): FASTQ file path
+
+    Returns:
+        int: estimated memory in bytes
+    """
+    size = os.path.getsize(fpath)
+    if Path(fpath).suffix.lower() in COMPRESSION_SUFFIXES:
+        size *= COMPRESSION_RATIO
+    return BASE_MEMORY + int(size * MEMORY_PER_BYTE)
+
+
+def profile_sample(
+    sample: str,
+    fpath: str,
+    threshold=30,
+    o_mtp=0.1,
+    a_mtp=0.2,
+    qs_tol=None,
+    max_ee=None,
+    cache_dir=None,
+    cache_size=DEFAULT_DISK_CACHE_SIZE,
+) -> tuple[pd.DataFrame, pd.DataFrame, Optional[pd.DataFrame]]:
+    """Creates the trimming information, sum of EE and retained reads
+    tables of one sample with the same pipeline as main.py.
+
+    Args:
+        sample (str): sample name
+        fpath (str): FASTQ file path
+        threshold (int): Phred score threshold for obvious trimming
+        o_mtp (float): max trim percentage of obvious trimming
+        a_mtp (float): max trim percentage of further trimming
+        qs_tol (float): if provided, average quality scores are estimated
+        from the first reads within this tolerance
+        max_ee (list): maxEE thresholds used for counting retained reads, no
+        retained reads table is created if None
+        cache_dir (str): if provided, parsed quality scores are cached
+        within this directory
+        cache_size (int): max size of the cache directory in bytes
+
+    Returns:
+        tuple: trimming information, sum of EE and retained reads (None if
+        not requested) dataframes, all with a Sample column
+    """
+    fqe = reader.FastqReader(fpath, cache_dir=cache_dir, disk_cache_size=cache_size)
+    tables = trimming_tables(
+        fqe, threshold=threshold, o_mtp=o_mtp, a_mtp=a_mtp, qs_tol=qs_tol, max_ee=max_ee
+    )
+
+    outputs = [tables.trim_info, tables.sum_ee, tables.retained_reads]
+    for df in outputs:
+        if df is not None:
+            df.insert(0, "Sample", sample)
+    return tuple(outputs)
+
+
+def batch_profiles(
+    samples: list[tuple[str, str]],
+    n_workers=None,
+    max_memory=4096 * 1024 * 1024,
+    **options,
+) -> tuple[pd.DataFrame, pd.DataFrame, Optional[pd.DataFrame], dict]:
+    """Profiles samples concurrently within a process pool. Samples are
+    only submitted while the estimated memory of all running samples fits
+    within the memory budget, one sample is always allowed to run.
+
+    Args:
+        samples (list): (sample name, FASTQ file path) tuples
+        n_workers (int): number of worker processes, by default the
+        number of CPUs
+        max_memory (int): memory budget in bytes
+        options: pipeline options of `profile_sample` (threshold, o_mtp,
+        a_mtp, qs_tol, max_ee, cache_dir, cache_size)
+
+    Returns:
+        tuple: combined trimming information, sum of EE and retained reads
+        (None if not requested) dataframes in sample order, and the errors
+        of samples that failed by sample name. If a worker is killed, the
+        remaining samples fail as well
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if not isinstance(n_workers, int) or n_workers < 1:
+        raise ValueError("number of workers must be a positive integer")
+    if not isinstance(max_memory, int) or max_memory < 1:
+        raise ValueError("memory budget must be a positive integer")
+
+    pending = [(name, fpath, estimate_memory(fpath)) for name, fpath in samples]
+    pending.reverse()
+    results, errors = {}, {}
+    running, used_memory = {}, 0
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        while len(pending) > 0 or len(running) > 0:
+            # submitting samples while the budget allows
+            while len(pending) > 0 and len(running) < n_workers:
+                name, fpath, memory = pending[-1]
+                if len(running) > 0 and used_memory + memory > max_memory:
+                    break
+                pending.pop()
+                try:
+                    future = pool.submit(profile_sample, name, fpath, **options)
+                except BrokenProcessPool as e:
+                    # a killed worker (e.g. out of memory) breaks the pool,
+                    # -- the remaining samples fail without losing results
+                    errors[name] = e
+                    errors.update((name, e) for name, _, _ in pending)
+                    pending.clear()
+                    break
+                running[future] = (name, memory)
+                used_memory += memory
+
+            # collecting finished samples
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, memory = running.pop(future)
+                used_memory -= memory
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+
+    # combining tables in sample order
+    ordered = [results[name] for name, _ in samples if name in results]
+    if len(ordered) == 0:
+        return pd.DataFrame(), pd.DataFrame(), None, errors
+    trim_df = pd.concat([tables[0] for tables in ordered], ignore_index=True)
+    sumEE = pd.concat([tables[1] for tables in ordered], ignore_index=True)
+    retained_df = None
+    if ordered[0][2] is not None:
+        retained_df = pd.concat([tables[2] for tables in ordered], ignore_index=True)
+    return trim_df, sumEE, retained_df, errors
+
+
+# created parser to run through terminal
+def main():
+    parser = arg.ArgumentParser(
+        description="This script will output the trimming information and "
+        + "sum of EE of multiple samples as two tables keyed by sample"
+    )
+
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument(
+        "--fq_dir",
+        "-fastq_directory",
+        type=str,
+        help="directory containing one fastq file per sample",
+    )
+    inputs.add_argument(
+        "--manifest",
+        type=str,
+        help="file containing one fastq file path per line, optionally "
+        + "preceded by a sample name and a tab",
+    )
+
+    parser.add_argument(
+        "--t_of",
+        "-trim_output_file",
+        type=str,
+        required=False,
+        help="name of the output file containing trim information",
+        default="batch_parameter_info.tsv",
+    )
+    parser.add_argument(
+        "--EE_of",
+        "-EE_output_file",
+        type=str,
+        required=False,
+        help="name of output file containing sum of EE information",
+        default="batch_SumEEInfo.tsv",
+    )
+    parser.add_argument(
+        "--th",
+        "-threshold",
+        type=int,
+        required=False,
+        help="Phred score threshold for obvious trimming",
+        default=30,
+    )
+    parser.add_argument(
+        "--o_mtp",
+        "-obvs_max_trim_percentage",
+        type=float,
+        required=False,
+        help="max percent of the length of the original trim to be"
+        + "trimmed on either end of the read in obvious trimming",
+        default=0.1,
+    )
+    parser.add_argument(
+        "--a_mtp",
+        "-additional_max_trim_percentage",
+        type=float,
+        required=False,
+        help="when performing further trimming the max percentage of"
+        + "the read to be trimmed at either end",
+        default=0.2,
+    )
+    parser.add_argument(
+        "--RR_of",
+        "-retained_reads_output_file",
+        type=str,
+        required=False,
+        help="name of output file containing the number of retained reads"
+        + "for each trimming pair and maxEE threshold",
+        default=None,
+    )
+    parser.add_argument(
+        "--max_ee",
+        "-max_expected_errors",
+        type=float,
+        nargs="+",
+        required=False,
+        help="maxEE thresholds used for counting retained reads",
+        default=[1.0, 2.0, 3.0, 5.0],
+    )
+    parser.add_argument(
+        "--qs_tol",
+        "-quality_score_tolerance",
+        type=float,
+        required=False,
+        help="if provided, average quality scores are estimated from the first "
+        + "reads until the 95%% confidence interval of every position is "
+        + "within this tolerance (phred) instead of reading all reads",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        required=False,
+        help="if provided, parsed quality scores are cached within this "
+        + "directory and reruns on the same fastq files load them instead of "
+        + "parsing the files",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        required=False,
+        help="max size of the cache directory in MB",
+        default=8192,
+    )
+    parser.add_argument(
+        "--n_workers",
+        type=int,
+        required=False,
+        help="number of samples profiled at the same time",
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--max_memory",
+        type=int,
+        required=False,
+        help="memory budget of all workers in MB",
+        default=4096,
+    )
+
+    args = parser.parse_args()
+
+    samples = find_samples(args.fq_dir if args.fq_dir is not None else args.manifest)
+    if len(samples) == 0:
+        raise ValueError("no fastq files were found")
+
+    trim_df, sumEE, retained_df, errors = batch_profiles(
+        samples,
+        n_workers=args.n_workers,
+        max_memory=args.max_memory * 1024 * 1024,
+        threshold=args.th,
+        o_mtp=args.o_mtp,
+        a_mtp=args.a_mtp,
+        qs_tol=args.qs_tol,
+        max_ee=args.max_ee if args.RR_of is not None else None,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+    )
+
+    # convert final dataframes to TSV
+    trim_df.to_csv(args.t_of, sep="\t", index=False)
+    sumEE.to_csv(args.EE_of, sep="\t", index=False)
+    if retained_df is not None:
+        retained_df.to_csv(args.RR_of, sep="\t", index=False)
+
+    # report failed samples
+    for name, error in errors.items():
+        print(f"{name}: {error}", file=sys.stderr)
+
+    exit(1 if len(errors) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@ import numpy as np
 import pandas as pd
 
 import smartdada2.GetTrimParameters as GTP
-from smartdada2.reader import reader
+from smartdada2.reader import phred, reader
+from smartdada2.reader.cache import QualityColumns
 
 
 def read_size_by_maxEE(FastqEntries, left: int, right: int):
@@ -11,7 +12,8 @@ def read_size_by_maxEE(FastqEntries, left: int, right: int):
     obvious trimming.
 
     Args:
-        FastqEntries (FastqEntry): reads taken from fastq files
+        FastqEntries (FastqEntry): reads taken from fastq files, or their
+        QualityColumns if they were already collected
         left (int): trim value output from trim_ends_less_than_threshold
         right (int): trunc value output from trim_ends_less_than_threshold
 
@@ -19,44 +21,166 @@ def read_size_by_maxEE(FastqEntries, left: int, right: int):
         pd.dataframe: dataframe containing two columns
     """
     # raise errors for wronog data types
-    if not isinstance(FastqEntries, reader.FastqReader):
+    if not isinstance(FastqEntries, (reader.FastqReader, QualityColumns)):
         raise TypeError("must be of FastqEntry type")
+    if not isinstance(left, int):
+        raise TypeError("left must be of type int")
+    if not isinstance(right, int):
+        raise TypeError("right must be of type int")
 
-    # get list of expected errors per read
-    raw_EE = []
+    # get sum of EE for no trimming and obvious trimming
+    no_trimming = []
+    obv_trimming = []
 
-    # for each entry
-    for entry in FastqEntries.unpack_entries():
-        phred_scores = list(entry.scores)
+    # for each batch of reads, loaded from the disk cache if enabled
+    for batch in _quality_batches(FastqEntries):
+        # converts phred scores to expected error, padded positions are 0
+        raw_EE = phred.ee_matrix(batch.scores, batch.lengths)
 
-        # convert scores to numeric format to integer 0-42
-        scores = np.array(phred_scores).view(np.int32) - 33
+        # get the sum of EE
+        no_trimming.append(raw_EE.sum(axis=1))
+        obv_trimming.append(raw_EE[:, left:right].sum(axis=1))
 
-        # converts phred scores to expected error
-        EE_entry = [10 ** (-score / 10) for score in scores]
+    no_trimming = np.concatenate(no_trimming) if no_trimming else np.zeros(0)
+    obv_trimming = np.concatenate(obv_trimming) if obv_trimming else np.zeros(0)
 
-        # create list of lists of expected error
-        raw_EE.append(EE_entry)
+    # create two column dataframe from the arrays
+    sumEE = pd.DataFrame({"NoTrimming": no_trimming, "ObviousTrimming": obv_trimming})
+
+    return sumEE
 
-    # get sum of EE for no trimming and obvious trimming
-    no_trimming = []
-    obv_trimming = []
 
-    # get the sum of EE
-    for EE_list in raw_EE:
-        obv_trim = EE_list[left:right]
-        sum_no_trim = sum(EE_list)
-        sum_obv_trim = sum(obv_trim)
+def retained_reads_by_maxEE(
+    FastqEntries, left_indexes, right_indexes, max_ee_values=(1.0, 2.0, 3.0, 5.0)
+):
+    """Counts the reads that pass filtering for every combination of left
+    trim index, right trunc index and maxEE threshold. A read is retained if
+    it reaches the right index and the sum of the expected error between the
+    left and right index is not larger than maxEE (same as DADA2's
+    filterAndTrim with trimLeft, truncLen and maxEE).
 
-        # append to lists
-        no_trimming.append(sum_no_trim)
-        obv_trimming.append(sum_obv_trim)
+    Args:
+        FastqEntries (FastqEntry): reads taken from fastq files, or their
+        QualityColumns if they were already collected
+        left_indexes (list): left trim indexes
+        right_indexes (list): right trunc indexes (exclusive)
+        max_ee_values (list, optional): maxEE thresholds. Defaults to
+        (1.0, 2.0, 3.0, 5.0).
 
-    # create two column dataframe
-    sumEE = pd.DataFrame(
-        list(zip(no_trimming, obv_trimming)), columns=["NoTrimming", "ObviousTrimming"]
+    Returns:
+        pd.dataframe: dataframe containing the trim indexes, maxEE threshold,
+        number and fraction of retained reads
+    """
+    # raise errors for wrong data types
+    if not isinstance(FastqEntries, (reader.FastqReader, QualityColumns)):
+        raise TypeError("must be of FastqEntry type")
+    for index in [*left_indexes, *right_indexes]:
+        if not isinstance(index, (int, np.integer)):
+            raise TypeError("trim indexes must be of type int")
+    if len(max_ee_values) == 0:
+        raise ValueError("at least one maxEE threshold is required")
+
+    counts, n_reads = retained_read_histogram(
+        _quality_batches(FastqEntries),
+        left_indexes,
+        right_indexes,
+        max_ee_values,
     )
 
-    sumEE = sumEE.reset_index(drop=True)
+    # flattening the (left, right, maxEE) surface
+    left_grid, right_grid, max_ee_grid = np.meshgrid(
+        left_indexes, right_indexes, max_ee_values, indexing="ij"
+    )
+    retained = pd.DataFrame(
+        {
+            "LeftIndex": left_grid.ravel(),
+            "RightIndex": right_grid.ravel(),
+            "MaxEE": max_ee_grid.ravel(),
+            "RetainedReads": counts.ravel(),
+            "RetainedFraction": counts.ravel() / max(n_reads, 1),
+        }
+    )
 
-    return sumEE
+    return retained
+
+
+def retained_read_histogram(
+    batches, left_indexes, right_indexes, max_ee_values, chunk_size=4_000_000
+):
+    """Streams batches of reads into a 3-D histogram of retained reads over
+    (left index, right index, maxEE). Only the histogram is kept in memory,
+    per read expected errors are discarded after each batch.
+
+    Each read's expected error within every trimming window is taken from
+    its cumulative expected errors and binned by the smallest maxEE
+    threshold it passes. The cumulative sum over the bins gives the number
+    of reads passing each threshold.
+
+    Args:
+        batches (Iterable[FastqBatch]): batches of reads
+        left_indexes (list): left trim indexes
+        right_indexes (list): right trunc indexes (exclusive)
+        max_ee_values (list): maxEE thresholds
+        chunk_size (int, optional): max number of (read, window) values
+        computed at once. Defaults to 4_000_000.
+
+    Returns:
+        tuple: (left, right, maxEE) array of retained read counts and the
+        total number of reads
+    """
+    lefts = np.asarray(left_indexes, dtype=np.int64)
+    rights = np.asarray(right_indexes, dtype=np.int64)
+    max_ees = np.asarray(max_ee_values, dtype=np.float64)
+    if (lefts < 0).any() or (rights[None, :] <= lefts[:, None]).any():
+        raise ValueError("left indexes must be smaller than right indexes")
+
+    # thresholds are binned in ascending order, the last bin holds reads
+    # that do not pass any threshold (or are too short)
+    order = np.argsort(max_ees)
+    n_bins = len(max_ees) + 1
+    n_windows = len(lefts) * len(rights)
+    histogram = np.zeros(n_windows * n_bins, dtype=np.int64)
+    window_ids = np.arange(n_windows).reshape(len(lefts), len(rights))
+
+    n_reads = 0
+    reads_per_chunk = max(1, chunk_size // max(n_windows, 1))
+    for batch in batches:
+        n_reads += len(batch)
+        for start in range(0, len(batch), reads_per_chunk):
+            scores = batch.scores[start : start + reads_per_chunk]  # noqa
+            lengths = batch.lengths[start : start + reads_per_chunk]  # noqa
+            cumulative = phred.cumulative_ee(scores, lengths)
+
+            # (reads, lefts, rights) expected errors within each window
+            width = cumulative.shape[1] - 1
+            window_ee = (
+                cumulative[:, np.minimum(rights, width)][:, None, :]
+                - cumulative[:, np.minimum(lefts, width)][:, :, None]
+            )
+            bins = np.searchsorted(max_ees[order], window_ee, side="left")
+
+            # reads shorter than the right index are discarded
+            too_short = lengths[:, None, None] < rights[None, None, :]
+            bins[np.broadcast_to(too_short, bins.shape)] = n_bins - 1
+
+            histogram += np.bincount(
+                (window_ids[None, :, :] * n_bins + bins).ravel(),
+                minlength=len(histogram),
+            )
+
+    # reads passing a threshold also pass all larger thresholds
+    histogram = histogram.reshape(len(lefts), len(rights), n_bins)
+    retained = np.cumsum(histogram[:, :, :-1], axis=2)
+
+    # restoring the order of the provided thresholds
+    counts = np.empty_like(retained)
+    counts[:, :, order] = retained
+    return counts, n_reads
+
+
+def _quality_batches(FastqEntries):
+    """Returns the quality batches of a reader (loaded from the disk cache if
+    enabled) or of columns that were already collected"""
+    if isinstance(FastqEntries, QualityColumns):
+        return FastqEntries.iter_batches()
+    return FastqEntries.iter_quality_batches()
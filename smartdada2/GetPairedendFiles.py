@@ -1,17 +1,32 @@
 import argparse as arg
+from typing import Optional
 
+from smartdada2.common.profiling import StageProfiler
 from smartdada2.reader import reader
+from smartdada2.reader.writer import FastqWriter
 
 
-def getPairedFiles(main_fastq: str, output_f: str, output_r: str):
+def getPairedFiles(
+    main_fastq: str,
+    output_f: str,
+    output_r: str,
+    profiler: Optional[StageProfiler] = None,
+):
     """If paired end sequencing was performed get
     two files containing reverse and forward sequences.
 
+    The input is read once, each batch of reads is split by direction and
+    streamed to the buffered output files, therefore memory usage does not
+    depend on the size of the input. Outputs ending with '.gz', '.bgz'
+    (BGZF blocks) or '.zst' are compressed.
+
     Args:
         main_fastq (str): one FASTq formatted file containing all
         reads
         output_f (str): output file path for forward sequences
         output_r (str): output file path for reverse sequences
+        profiler (StageProfiler): records the splitting stage, by default
+        None (not recorded)
 
     Returns:
         files: two fastq files will be written containing
@@ -28,27 +43,17 @@ def getPairedFiles(main_fastq: str, output_f: str, output_r: str):
     if not isinstance(fqe, reader.FastqReader):
         raise TypeError("must be of FastqEntry type")
 
-    # get forward reads in list format
-    forward = []
-    for reads in fqe.get_forward_reads():
-        forward.extend((reads.header, reads.seq, "+", reads.scores))
-
-    # write forward file
-    with open(output_f, "+w") as f:
-        for line in forward:
-            line = str(line) + "\n"
-            f.write(line)
-
-    # get reverse reads in list format
-    reverse = []
-    for reads in fqe.get_reverse_reads():
-        reverse.extend((reads.header, reads.seq, "+", reads.scores))
+    if profiler is None:
+        profiler = StageProfiler("getPairedFiles", enabled=False)
 
-    # write reverse file
-    with open(output_r, "+w") as f:
-        for line in reverse:
-            line = str(line) + "\n"
-            f.write(line)
+    # write forward and reverse reads of each batch, parsing and writing are
+    # -- interleaved within a single stage
+    with profiler.stage("splitting", reader=fqe) as stats:
+        with FastqWriter(output_f) as forward, FastqWriter(output_r) as reverse:
+            for batch in fqe.iter_batches():
+                forward.write_batch(batch, ~batch.rseq)
+                reverse.write_batch(batch, batch.rseq)
+        stats.bytes_written = forward.n_bytes + reverse.n_bytes
 
     return None
 
@@ -73,7 +78,8 @@ def main():
         "-output_file_forward",
         type=str,
         required=True,
-        help="output file path for forward sequences",
+        help="output file path for forward sequences, compressed if it ends "
+        + "with '.gz', '.bgz' (BGZF) or '.zst'",
     )
 
     parser.add_argument(
@@ -81,12 +87,37 @@ def main():
         "-output_file_reverse",
         type=str,
         required=True,
-        help="output file path for reverse sequences",
+        help="output file path for reverse sequences, compressed if it ends "
+        + "with '.gz', '.bgz' (BGZF) or '.zst'",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        required=False,
+        help="if provided, the wall time, CPU time, peak memory, reads and "
+        + "bytes of each stage are written into this JSON file",
+        default=None,
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=str,
+        required=False,
+        help="if provided together with --profile, cProfile stats of the "
+        + "whole run are dumped into this file",
+        default=None,
     )
 
     args = parser.parse_args()
+    profiler = StageProfiler(
+        "GetPairedendFiles",
+        enabled=args.profile is not None,
+        cprofile_path=args.cprofile,
+    )
 
-    getPairedFiles(args.fq, args.of_f, args.of_r)
+    getPairedFiles(args.fq, args.of_f, args.of_r, profiler=profiler)
+    if args.profile is not None:
+        profiler.write(args.profile, input=args.fq)
 
     exit()
 
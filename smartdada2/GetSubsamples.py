@@ -1,15 +1,28 @@
 import argparse as arg
+from typing import Optional
 
+from smartdada2.common.profiling import StageProfiler
 from smartdada2.reader import reader
+from smartdada2.reader.writer import FastqWriter
 
 
-def subsample(input_fp: str, subsample: int, output_fp: str):
-    """Takes one FASTQ file and outputs subsets of the reads.
+def subsample(
+    input_fp: str,
+    subsample: int,
+    output_fp: str,
+    seed: int = 5,
+    profiler: Optional[StageProfiler] = None,
+):
+    """Takes one FASTQ file and outputs subsets of the reads. Reads are
+    sampled within a single pass over the file.
 
     Args:
         input_fp (str): FASTQ file path
         subsample (int): number of reads in subset
         output_fp (str): FASTQ file subset output path
+        seed (int): seed of the random sampling, by default 5
+        profiler (StageProfiler): records the sampling and writing stages,
+        by default None (not recorded)
 
     Returns:
         A fastq formatted file containing a subset of the original
@@ -30,19 +43,18 @@ def subsample(input_fp: str, subsample: int, output_fp: str):
     if not isinstance(fqe, reader.FastqReader):
         raise TypeError("must be of FastqEntry type")
 
-    # perform reservoir sampling
-    samples = fqe.reservoir_sampling(n_samples=subsample, seed=5)
+    if profiler is None:
+        profiler = StageProfiler("subsample", enabled=False)
 
-    # create list of samples
-    sample_list = []
-    for sample in samples:
-        sample_list.extend((sample.header, sample.seq, "+", sample.scores))
+    # perform reservoir sampling
+    with profiler.stage("sampling", reader=fqe):
+        samples = fqe.reservoir_sampling(n_samples=subsample, seed=seed)
 
     # write into a fastq formatted file
-    with open(output_fp, "+w") as f:
-        for line in sample_list:
-            line = str(line) + "\n"
-            f.write(line)
+    with profiler.stage("writing") as stats:
+        with FastqWriter(output_fp) as writer:
+            writer.write_entries(samples)
+        stats.reads, stats.bytes_written = writer.n_records, writer.n_bytes
 
     return None
 
@@ -70,9 +82,35 @@ def main():
         "--of", "-output_file", type=str, required=True, help="output file path"
     )
 
+    parser.add_argument(
+        "--seed", type=int, default=5, help="seed of the random sampling"
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        required=False,
+        help="if provided, the wall time, CPU time, peak memory, reads and "
+        + "bytes of each stage are written into this JSON file",
+        default=None,
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=str,
+        required=False,
+        help="if provided together with --profile, cProfile stats of the "
+        + "whole run are dumped into this file",
+        default=None,
+    )
+
     args = parser.parse_args()
+    profiler = StageProfiler(
+        "GetSubsamples", enabled=args.profile is not None, cprofile_path=args.cprofile
+    )
 
-    subsample(args.fq, args.n, args.of)
+    subsample(args.fq, args.n, args.of, seed=args.seed, profiler=profiler)
+    if args.profile is not None:
+        profiler.write(args.profile, input=args.fq)
 
     exit()
 
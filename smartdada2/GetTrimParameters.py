@@ -1,5 +1,6 @@
 import warnings
 
+import numpy as np
 import pandas as pd
 
 from smartdada2.reader import reader
@@ -116,7 +117,6 @@ def get_trim_length_avgEE(avgEE_list, left, right):
 
 
 def read_size_by_avg_EE(FastqEntries, left: int, right: int, max_trim_perc=0.20):
-    # sourcery skip: remove-zero-from-range, use-itertools-product
     """Creates a dataframe containing average expected error per position
     for each length of read calculated within certain ranges of positions
     (e.g., not taking out more than 20% off of either end)
@@ -145,61 +145,85 @@ def read_size_by_avg_EE(FastqEntries, left: int, right: int, max_trim_perc=0.20)
     avg_EE_df = FastqEntries.get_expected_error()
     avg_EE_list = list(avg_EE_df["AverageExpectedError"])
 
+    return trim_info_by_avg_EE(avg_EE_list, left, right, max_trim_perc)
+
+
+def trim_info_by_avg_EE(avg_EE_list, left: int, right: int, max_trim_perc=0.20):
+    """Creates the trim information dataframe of read_size_by_avg_EE from
+    precomputed average expected errors per position (e.g. from
+    FastqReader.profile())
+
+    Args:
+        avg_EE_list (list): average expected error per position
+        left (integer): left index
+        right (integer): right index
+        max_trim_perc (float, optional): max percentage of the read trimmed on
+        either end. Defaults to 0.2.
+
+    Returns:
+        pandas dataframe: dataframe containing 3 columns: trim positions, read
+        length, and average EE per position
+    """
     for avgEE in avg_EE_list:
         if not isinstance(avgEE, float):
             raise TypeError("avg EEs must be of type float")
 
     # get length of reads
     read_len = len(avg_EE_list)
-
-    # create lists with trim sites, read length, avg EE per position
-    left_trim = []
-    right_trunc = []
-    read_len_list = []
-    avgEE_position = []
-    right_obv_trim = []
-    left_obv_trim = []
-
     trim_bound = round(read_len * max_trim_perc)
 
-    # for current_left in range(left, trim_bound):
-    #   for current_right in range(read_len - trim_bound, right):
-
     # for each set of trim & trunc indexes
-    for current_left in range(0, trim_bound):
-        for current_right in range(read_len - trim_bound, read_len):
-            # calculate avg EE
-            trim_readLen_avgEE = get_trim_length_avgEE(
-                avg_EE_list, current_left, current_right
-            )
-            left_trim.append(trim_readLen_avgEE[0])
-            right_trunc.append(trim_readLen_avgEE[1])
-            read_len_list.append(trim_readLen_avgEE[2])
-            avgEE_position.append(trim_readLen_avgEE[3])
-            right_obv_trim.append(right)
-            left_obv_trim.append(left)
+    left_indexes = np.arange(0, trim_bound)
+    right_indexes = np.arange(read_len - trim_bound, read_len)
+    read_len_grid, avgEE_grid = avg_EE_trim_grid(
+        avg_EE_list, left_indexes, right_indexes
+    )
 
+    # flattening the grid, rows are left indexes and columns right indexes
+    n_pairs = len(left_indexes) * len(right_indexes)
     TrimInfo = pd.DataFrame(
-        list(
-            zip(
-                left_trim,
-                right_trunc,
-                read_len_list,
-                avgEE_position,
-                right_obv_trim,
-                left_obv_trim,
-            )
-        ),
-        columns=[
-            "LeftIndex",
-            "RightIndex",
-            "ReadLength",
-            "AvgEEPerPosition",
-            "RightTrim",
-            "LeftTrim",
-        ],
+        {
+            "LeftIndex": np.repeat(left_indexes, len(right_indexes)),
+            "RightIndex": np.tile(right_indexes, len(left_indexes)),
+            "ReadLength": read_len_grid.ravel(),
+            "AvgEEPerPosition": avgEE_grid.ravel(),
+            "RightTrim": np.full(n_pairs, right),
+            "LeftTrim": np.full(n_pairs, left),
+        }
     )
 
-    TrimInfo = TrimInfo.reset_index(drop=True)
-
     return TrimInfo
+
+
+def avg_EE_trim_grid(avg_EE_list, left_indexes, right_indexes):
+    """Calculates the read length and average expected error per position of
+    every (left, right) trimming pair at once. The sums of expected errors
+    are taken from the cumulative sum of the average expected errors, so
+    each pair costs O(1) instead of re-summing the positions.
+
+    Args:
+        avg_EE_list (list): average expected error per position
+        left_indexes (array-like): left trim indexes (rows of the grid)
+        right_indexes (array-like): right trunc indexes, exclusive (columns of
+        the grid)
+
+    Returns:
+        tuple: two arrays of shape (left indexes, right indexes) containing
+        the read length and the average EE per position of each pair
+
+    Raises:
+        ValueError: raised if a pair does not contain any positions
+    """
+    left_indexes = np.asarray(left_indexes, dtype=np.int64)
+    right_indexes = np.asarray(right_indexes, dtype=np.int64)
+
+    # cumulative[i] is the sum of the expected errors of the first i positions
+    cumulative = np.zeros(len(avg_EE_list) + 1)
+    np.cumsum(np.asarray(avg_EE_list, dtype=np.float64), out=cumulative[1:])
+
+    read_len_grid = right_indexes[None, :] - left_indexes[:, None]
+    if (read_len_grid <= 0).any():
+        raise ValueError("trimming pairs must contain at least one position")
+
+    sum_EE_grid = cumulative[right_indexes][None, :] - cumulative[left_indexes][:, None]
+    return read_len_grid, sum_EE_grid / read_len_grid
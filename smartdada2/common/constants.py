@@ -0,0 +1,13 @@
+"""
+Module contains constants that are shared across the fastq readers.
+"""
+
+# nucleotides
+DNA = list("ATCGU")
+AMB_DNA = list("NRYKMSWBDHV")
+ALL_DNA = DNA + AMB_DNA
+
+# quality scores
+ASCII_SCORES = [chr(i) for i in range(33, 70 + 1)]
+NUMERICAL_SCORES = list(range(33, 70 + 1))
+PHRED_OFFSET = 33
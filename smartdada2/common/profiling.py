@@ -0,0 +1,228 @@
+"""
+Module contains the stage level profiling of the command line scripts.
+
+Each stage of a script records its wall time, CPU time, peak memory (RSS),
+the number of reads processed and the number of bytes read and written. The
+report is written as JSON, optionally with a cProfile dump of the whole run
+that can be inspected with `python -m pstats` or snakeviz.
+
+On linux the peak memory is reset at the start of each stage, therefore it
+is the peak of the stage itself. On other unix platforms it is the peak of
+the process up to the end of the stage. On windows the peak memory is not
+measured (None).
+"""
+import cProfile
+import json
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+MB = 1024 * 1024
+
+
+@dataclass
+class StageStats:
+    """Contains the measurements of a single stage
+
+    Attributes
+    ----------
+    name : str
+        name of the stage
+    wall_seconds : float
+        elapsed time
+    cpu_seconds : float
+        CPU time of the process (user and system), worker processes are not
+        included
+    peak_rss_mb : Optional[float]
+        peak resident memory, None if it cannot be measured on the platform
+    reads : Optional[int]
+        number of reads processed, None if the stage does not process reads
+    bytes_read : Optional[int]
+        number of (uncompressed) bytes loaded from the input file
+    bytes_written : Optional[int]
+        number of (uncompressed) bytes written to output files
+    """
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    reads: Optional[int] = None
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        """Returns the measurements with the read and byte throughput"""
+        stats = asdict(self)
+        stats["reads_per_s"] = _rate(self.reads, self.wall_seconds)
+        stats["read_mb_per_s"] = _rate(self.bytes_read, self.wall_seconds * MB)
+        return stats
+
+
+@dataclass
+class StageProfiler:
+    """Records the stages of a script. A disabled profiler only yields empty
+    stats, therefore scripts can always wrap their stages.
+
+    Attributes
+    ----------
+    command : str
+        name of the profiled script
+    enabled : bool
+        if False nothing is measured, by default True
+    cprofile_path : Optional[str]
+        if provided, the whole run is profiled with cProfile and the stats
+        are dumped into this file by `write`
+    stages : list[StageStats]
+        measurements of the finished stages
+    """
+
+    command: str
+    enabled: bool = True
+    cprofile_path: Optional[str] = None
+    stages: list[StageStats] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.__start = time.perf_counter()
+        self.__cpu_start = time.process_time()
+        self.__profiler: Optional[cProfile.Profile] = None
+        if self.enabled and self.cprofile_path is not None:
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+
+    @contextmanager
+    def stage(self, name: str, reader=None) -> Iterator[StageStats]:
+        """Measures the code within the context as a stage. Reads and bytes
+        can be set on the yielded stats, otherwise they are taken from the
+        loading counters of the reader.
+
+        Parameters
+        ----------
+        name : str
+            name of the stage
+        reader : Optional[FastqReader], optional
+            reader used by the stage, by default None
+
+        Yields
+        ------
+        StageStats
+            measurements of the stage, filled in when the context exits
+        """
+        stats = StageStats(name)
+        if not self.enabled:
+            yield stats
+            return
+
+        reads = reader.n_reads_loaded if reader is not None else 0
+        n_bytes = reader.n_bytes_loaded if reader is not None else 0
+        reset_peak_rss()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_seconds = time.perf_counter() - start
+            stats.cpu_seconds = time.process_time() - cpu_start
+            stats.peak_rss_mb = peak_rss_mb()
+            if reader is not None:
+                if stats.reads is None:
+                    stats.reads = reader.n_reads_loaded - reads
+                if stats.bytes_read is None:
+                    stats.bytes_read = reader.n_bytes_loaded - n_bytes
+            self.stages.append(stats)
+
+    def report(self, **metadata) -> dict:
+        """Returns the report of all finished stages
+
+        Parameters
+        ----------
+        metadata
+            additional information of the run (e.g. input file)
+
+        Returns
+        -------
+        dict
+            command, metadata, totals and stages
+        """
+        return {
+            "command": self.command,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            **metadata,
+            "total": {
+                "wall_seconds": time.perf_counter() - self.__start,
+                "cpu_seconds": time.process_time() - self.__cpu_start,
+                "peak_rss_mb": max(
+                    (
+                        stats.peak_rss_mb
+                        for stats in self.stages
+                        if stats.peak_rss_mb is not None
+                    ),
+                    default=None,
+                ),
+            },
+            "stages": [stats.to_dict() for stats in self.stages],
+        }
+
+    def write(self, fpath: Union[str, Path], **metadata) -> None:
+        """Writes the report as JSON and dumps the cProfile stats
+
+        Parameters
+        ----------
+        fpath : Union[str, Path]
+            JSON output path
+        metadata
+            additional information of the run (e.g. input file)
+        """
+        if not self.enabled:
+            return
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            self.__profiler.dump_stats(self.cprofile_path)
+
+        with open(fpath, "w") as f:
+            json.dump(self.report(**metadata), f, indent=2)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Returns the peak resident memory (MB) of the current process, None if
+    it cannot be measured (windows).
+
+    On linux ru_maxrss is inherited across exec from the forking process and
+    cannot be reset, therefore the high water mark of the process memory
+    (VmHWM) is used.
+    """
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+
+    # the resource module is only available on unix
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is reported in KB on linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (MB if sys.platform == "darwin" else 1024)
+
+
+def reset_peak_rss() -> None:
+    """Resets the peak resident memory to the current memory (linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _rate(amount: Optional[int], seconds: float) -> Optional[float]:
+    """Returns the amount per second, None if not available"""
+    if amount is None or seconds <= 0:
+        return None
+    return amount / seconds
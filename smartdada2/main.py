@@ -1,10 +1,12 @@
 import argparse as arg
+import os
+import sys
 import warnings
 
-import GetMaxEE as GME
-import GetTrimParameters as GTP
-
+from smartdada2.common.profiling import StageProfiler
+from smartdada2.pipeline import trimming_tables
 from smartdada2.reader import reader
+from smartdada2.reader.progress import ProgressBar, PrometheusTextfile
 
 
 def main():
@@ -64,7 +66,88 @@ def main():
         default="SumEEInfo.tsv",
     )
 
+    parser.add_argument(
+        "--RR_of",
+        "-retained_reads_output_file",
+        type=str,
+        required=False,
+        help="name of output file containing the number of retained reads"
+        + "for each trimming pair and maxEE threshold",
+        default=None,
+    )
+    parser.add_argument(
+        "--max_ee",
+        "-max_expected_errors",
+        type=float,
+        nargs="+",
+        required=False,
+        help="maxEE thresholds used for counting retained reads",
+        default=[1.0, 2.0, 3.0, 5.0],
+    )
+
+    parser.add_argument(
+        "--qs_tol",
+        "-quality_score_tolerance",
+        type=float,
+        required=False,
+        help="if provided, average quality scores are estimated from the first "
+        + "reads until the 95%% confidence interval of every position is "
+        + "within this tolerance (phred) instead of reading all reads",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        required=False,
+        help="if provided, parsed quality scores are cached within this "
+        + "directory and reruns on the same fastq file load them instead of "
+        + "parsing the file",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        required=False,
+        help="max size of the cache directory in MB",
+        default=8192,
+    )
+
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="shows a progress bar with an ETA while reading the fastq file",
+    )
+    parser.add_argument(
+        "--metrics_file",
+        type=str,
+        required=False,
+        help="if provided, loading metrics are written into this file for "
+        + "the textfile collector of the Prometheus node exporter ('.prom')",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        required=False,
+        help="if provided, the wall time, CPU time, peak memory, reads and "
+        + "bytes of each stage are written into this JSON file",
+        default=None,
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=str,
+        required=False,
+        help="if provided together with --profile, cProfile stats of the "
+        + "whole run are dumped into this file",
+        default=None,
+    )
+
     args = parser.parse_args()
+    profiler = StageProfiler(
+        "main", enabled=args.profile is not None, cprofile_path=args.cprofile
+    )
 
     # ensure o_mtp is less than a_mtp
     if args.o_mtp > args.a_mtp:
@@ -73,27 +156,47 @@ def main():
             + "than the max in following steps which is not recommended"
         )
 
-    # read in data
-    fqe = reader.FastqReader(args.fq)
-
-    # get average scores per position
-    avg_scores_df = fqe.get_average_score()
-    avg_scores_list = avg_scores_df["AverageQualityScore"].values.tolist()
-
-    # perform obvious trimming
-    left, right = GTP.trim_ends_less_than_threshold(
-        avg_scores_list, args.th, args.o_mtp
+    # read in data, optionally reporting the progress of each pass
+    observers = []
+    if args.progress:
+        observers.append(ProgressBar())
+    if args.metrics_file is not None:
+        observers.append(PrometheusTextfile(args.metrics_file))
+    fqe = reader.FastqReader(
+        args.fq,
+        observers=observers,
+        cache_dir=args.cache_dir,
+        disk_cache_size=args.cache_size * 1024 * 1024,
     )
 
-    # get average EE by position for different read sizes
-    EE_by_size_df = GTP.read_size_by_avg_EE(fqe, left, right, args.a_mtp)
-
-    # get dataframe containing the sum of the expected error per sequence
-    sumEE = GME.read_size_by_maxEE(fqe, left, right)
+    # profile, obvious trimming, trimming grid, sum of EE and retained reads
+    tables = trimming_tables(
+        fqe,
+        threshold=args.th,
+        o_mtp=args.o_mtp,
+        a_mtp=args.a_mtp,
+        qs_tol=args.qs_tol,
+        max_ee=args.max_ee if args.RR_of is not None else None,
+        profiler=profiler,
+    )
+    if args.qs_tol is not None:
+        print(
+            f"average quality scores estimated from {tables.profile.n_reads} reads "
+            + f"(converged: {tables.profile.converged})",
+            file=sys.stderr,
+        )
 
     # convert final dataframes to TSV
-    EE_by_size_df.to_csv(args.t_of, sep="\t", index=False)
-    sumEE.to_csv(args.EE_of, sep="\t", index=False)
+    with profiler.stage("tsv_output") as stats:
+        outputs = [(tables.trim_info, args.t_of), (tables.sum_ee, args.EE_of)]
+        if tables.retained_reads is not None:
+            outputs.append((tables.retained_reads, args.RR_of))
+        for df, fpath in outputs:
+            df.to_csv(fpath, sep="\t", index=False)
+        stats.bytes_written = sum(os.path.getsize(fpath) for _, fpath in outputs)
+
+    if args.profile is not None:
+        profiler.write(args.profile, input=args.fq)
 
     exit()
 
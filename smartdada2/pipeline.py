@@ -0,0 +1,120 @@
+"""
+Module contains the trimming parameter pipeline shared by main.py (single
+sample) and GetBatchProfiles.py (multiple samples): per position profile,
+obvious trimming, trimming grid, sum of expected errors and optionally the
+number of retained reads per maxEE threshold.
+
+The file is read once: the profile and the phred scores (without padding)
+of all reads are collected within a single pass, the tables that depend on
+the trimming positions are computed from the scores in memory.
+"""
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import pandas as pd
+
+import smartdada2.GetMaxEE as GME
+import smartdada2.GetTrimParameters as GTP
+from smartdada2.common.profiling import StageProfiler
+from smartdada2.reader.convergence import ConvergedProfile
+from smartdada2.reader.profile import SampleProfile
+from smartdada2.reader.reader import FastqReader
+
+
+@dataclass
+class TrimmingTables:
+    """Contains the output tables of the pipeline
+
+    Attributes:
+        trim_info (pd.DataFrame): average EE by position for different read
+        sizes
+        sum_ee (pd.DataFrame): sum of the expected error per read before and
+        after obvious trimming
+        retained_reads (pd.DataFrame): number of retained reads per trimming
+        pair and maxEE threshold, None if not requested
+        profile (SampleProfile): per position statistics, a
+        ConvergedProfile if the quality scores were estimated
+    """
+
+    trim_info: pd.DataFrame
+    sum_ee: pd.DataFrame
+    retained_reads: Optional[pd.DataFrame]
+    profile: Union[SampleProfile, ConvergedProfile]
+
+
+def trimming_tables(
+    fqe: FastqReader,
+    threshold: int = 30,
+    o_mtp: float = 0.1,
+    a_mtp: float = 0.2,
+    qs_tol: Optional[float] = None,
+    max_ee: Optional[Sequence[float]] = None,
+    profiler: Optional[StageProfiler] = None,
+) -> TrimmingTables:
+    """Creates the trimming information, sum of EE and retained reads tables
+    of one sample.
+
+    Args:
+        fqe (FastqReader): reader of the sample
+        threshold (int): Phred score threshold for obvious trimming
+        o_mtp (float): max trim percentage of obvious trimming
+        a_mtp (float): max trim percentage of further trimming
+        qs_tol (float): if provided, average quality scores are estimated
+        from the first reads until the confidence interval of every position
+        is within this tolerance
+        max_ee (list): maxEE thresholds used for counting retained reads, no
+        retained reads table is created if None
+        profiler (StageProfiler): records the stages, by default nothing is
+        recorded
+
+    Returns:
+        TrimmingTables: output tables and the per position statistics
+    """
+    if profiler is None:
+        profiler = StageProfiler("pipeline", enabled=False)
+
+    # collect the profile and the phred scores of all reads within a single
+    # -- pass, or stop once the averages have converged
+    columns = None
+    with profiler.stage("parsing", reader=fqe):
+        if qs_tol is None:
+            columns = fqe.get_quality_columns()
+            profile = columns.profile
+        else:
+            profile = fqe.estimate_quality(tolerance=qs_tol)
+
+    # per position averages of the collected sums
+    with profiler.stage("averaging"):
+        avg_scores_list = profile.mean_quality.tolist()
+        avg_EE_list = profile.expected_error_frame()["AverageExpectedError"].tolist()
+
+    # perform obvious trimming
+    with profiler.stage("obvious_trimming"):
+        left, right = GTP.trim_ends_less_than_threshold(
+            avg_scores_list, threshold, o_mtp
+        )
+
+    # get average EE by position for different read sizes
+    with profiler.stage("trim_grid"):
+        EE_by_size_df = GTP.trim_info_by_avg_EE(avg_EE_list, left, right, a_mtp)
+
+    # get dataframe containing the sum of the expected error per sequence,
+    # -- estimated averages only read the first reads of the file
+    with profiler.stage("max_ee", reader=fqe):
+        if columns is None:
+            columns = fqe.get_quality_columns()
+        sumEE = GME.read_size_by_maxEE(columns, left, right)
+
+    # get the number of retained reads over the trimming pairs of the trim
+    # information and maxEE thresholds
+    retained_df = None
+    if max_ee is not None:
+        with profiler.stage("retained_reads", reader=fqe):
+            retained_df = GME.retained_reads_by_maxEE(
+                columns,
+                sorted(EE_by_size_df["LeftIndex"].unique().tolist()),
+                sorted(EE_by_size_df["RightIndex"].unique().tolist()),
+                max_ee,
+            )
+
+    return TrimmingTables(EE_by_size_df, sumEE, retained_df, profile)
@@ -0,0 +1,108 @@
+"""
+Module contains single pass accumulators for per position statistics.
+
+Accumulators are updated with batches of reads and only store running
+totals per position, therefore memory usage stays constant regardless of
+the number of reads within a fastq file.
+"""
+import numpy as np
+import pandas as pd
+
+
+class QualityAccumulator:
+    """Accumulates running sums and counts of quality scores per position.
+
+    Reads can be of different lengths. Each read only contributes to the
+    positions that are within its length (ragged-length mask), therefore the
+    average of a position is only taken over the reads that reach it.
+    """
+
+    def __init__(self):
+        self.sums: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.counts: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.n_reads: int = 0
+
+    def update(self, scores: np.ndarray, lengths: np.ndarray) -> None:
+        """Adds a batch of reads into the running totals
+
+        Parameters
+        ----------
+        scores : np.ndarray
+            (n_reads, width) zero padded phred score matrix
+        lengths : np.ndarray
+            (n_reads,) length of each read
+        """
+        width = scores.shape[1]
+        self.__resize(width)
+
+        # padded positions are zeros, therefore they do not affect the sums
+        self.sums[:width] += scores.sum(axis=0, dtype=np.int64)
+        self.counts[:width] += position_coverage(lengths, width)
+        self.n_reads += len(lengths)
+
+    def merge(self, other: "QualityAccumulator") -> None:
+        """Merges the running totals of another accumulator
+
+        Parameters
+        ----------
+        other : QualityAccumulator
+            accumulator to be merged
+        """
+        width = len(other.sums)
+        self.__resize(width)
+        self.sums[:width] += other.sums
+        self.counts[:width] += other.counts
+        self.n_reads += other.n_reads
+
+    def mean(self) -> np.ndarray:
+        """Returns the average quality score per position
+
+        Returns
+        -------
+        np.ndarray
+            average quality score per position
+        """
+        return self.sums / np.maximum(self.counts, 1)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the average quality score per position as a DataFrame
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position" and "AverageQualityScore" columns
+        """
+        return pd.DataFrame(
+            {
+                "Position": np.arange(len(self.sums)),
+                "AverageQualityScore": self.mean(),
+            }
+        )
+
+    def __resize(self, width: int) -> None:
+        """Extends the running totals if longer reads are found"""
+        if width > len(self.sums):
+            extension = np.zeros(width - len(self.sums), dtype=np.int64)
+            self.sums = np.concatenate((self.sums, extension))
+            self.counts = np.concatenate((self.counts, extension))
+
+
+def position_coverage(lengths: np.ndarray, width: int) -> np.ndarray:
+    """Counts the number of reads that reach each position
+
+    Parameters
+    ----------
+    lengths : np.ndarray
+        (n_reads,) length of each read
+    width : int
+        number of positions
+
+    Returns
+    -------
+    np.ndarray
+        (width,) number of reads that cover each position
+    """
+    # number of reads ending at each length, then counting reads that are
+    # longer than each position
+    ends = np.bincount(np.minimum(lengths, width), minlength=width + 1)
+    return ends[::-1].cumsum()[::-1][1:]
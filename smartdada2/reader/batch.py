@@ -0,0 +1,416 @@
+"""
+Module contains the columnar representation of fastq reads.
+
+A FastqBatch stores a block of reads as NumPy arrays (struct-of-arrays)
+instead of creating a FastqEntry object per read. Quality scores and
+sequences are stored as zero padded uint8 matrices alongside a length vector
+and a direction vector.
+"""
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from smartdada2.common.constants import ALL_DNA, AMB_DNA, PHRED_OFFSET
+from smartdada2.common.errors import FastqFormatError
+
+# byte constants
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+HEADER_START = ord("@")
+FORWARD_DIR = ord("1")
+REVERSE_DIR = ord("2")
+DIR_SEPARATOR = ord(":")
+
+# lookup table of header whitespace (spaces, tabs and carriage returns)
+WHITESPACE_TABLE = np.zeros(256, dtype=bool)
+WHITESPACE_TABLE[[ord(" "), ord("\t"), CARRIAGE_RETURN]] = True
+
+# allowed nucleotides as bytes
+SEQ_BYTES = np.frombuffer("".join(ALL_DNA).encode(), dtype=np.uint8)
+
+# ambiguous nucleotides as bytes and as a lookup table of all bytes
+AMB_BYTES = np.frombuffer("".join(AMB_DNA).encode(), dtype=np.uint8)
+AMB_TABLE = np.zeros(256, dtype=bool)
+AMB_TABLE[AMB_BYTES] = True
+
+# validation modes
+# -- full: sequence characters, quality characters and quality line lengths
+# -- fast: sequence characters only
+# -- off: no validation
+VALIDATION_MODES = ("full", "fast", "off")
+
+# lookup tables of allowed bytes, quality characters are all printable
+# characters (phred scores 0 to 93)
+VALID_SEQ_TABLE = np.zeros(256, dtype=bool)
+VALID_SEQ_TABLE[SEQ_BYTES] = True
+VALID_SCORE_TABLE = np.zeros(256, dtype=bool)
+VALID_SCORE_TABLE[PHRED_OFFSET : ord("~") + 1] = True  # noqa
+
+# lookup table for converting lower case nucleotides into upper case
+UPPER_CASE_TABLE = np.arange(256, dtype=np.uint8)
+UPPER_CASE_TABLE[ord("a") : ord("z") + 1] -= 32  # noqa
+
+
+@dataclass
+class FastqBatch:
+    """Contains the contents of a block of reads stored as arrays.
+
+    Attributes
+    ----------
+    scores : np.ndarray
+        (n_reads, width) uint8 matrix of phred scores. Positions beyond the
+        length of a read are zero padded.
+    seqs : np.ndarray
+        (n_reads, width) uint8 matrix of upper case nucleotides (ASCII).
+        Positions beyond the length of a read are zero padded.
+    lengths : np.ndarray
+        (n_reads,) vector containing the length of each read
+    rseq : np.ndarray
+        (n_reads,) boolean vector. True if the read is a reverse read
+    """
+
+    scores: np.ndarray
+    seqs: np.ndarray
+    lengths: np.ndarray
+    rseq: np.ndarray
+
+    # raw record bytes and (n_reads, 4, 2) start and end offsets of each
+    # line, used for decoding header ids and records on demand
+    raw: bytes = field(default=b"", repr=False)
+    line_bounds: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def width(self) -> int:
+        """Returns the number of columns (longest read) within the batch"""
+        return self.scores.shape[1]
+
+    @property
+    def mask(self) -> np.ndarray:
+        """Returns a (n_reads, width) boolean matrix. True values represent
+        positions that are within the length of the read."""
+        return np.arange(self.width) < self.lengths[:, None]
+
+    @property
+    def headers(self) -> List[str]:
+        """Decodes and returns the header ids of all reads in the batch"""
+        if self.line_bounds is None:
+            return []
+        return [
+            self.raw[start:end].decode()
+            for start, end in self.line_bounds[:, 0].tolist()
+        ]
+
+    def sequences(self) -> List[str]:
+        """Decodes and returns the sequences of all reads in the batch"""
+        return _decode_rows(self.seqs)
+
+    def quality_strings(self) -> List[str]:
+        """Encodes the phred scores back into ASCII quality strings"""
+        return _decode_rows(np.where(self.mask, self.scores + PHRED_OFFSET, 0))
+
+    def records(self) -> List[bytes]:
+        """Returns the compact record of each read: the header, sequence and
+        quality lines joined by newlines. Sequence and quality lines are
+        truncated to the length of the read and the separator line is
+        dropped. The records are copied out of the raw bytes without decoding.
+        """
+        raw = self.raw
+        return [
+            raw[h_start:h_end] + b"\n" + raw[s_start:s_end] + b"\n" + raw[q_start:q_end]
+            for (h_start, s_start, q_start), (h_end, s_end, q_end) in zip(
+                *self.__record_bounds()
+            )
+        ]
+
+    def to_fastq(self, select: Optional[np.ndarray] = None) -> bytes:
+        """Returns the reads as fastq formatted text (header, sequence, "+"
+        and quality lines). Sequence and quality lines are truncated to the
+        length of the read.
+
+        Parameters
+        ----------
+        select : Optional[np.ndarray], optional
+            (n_reads,) boolean mask or indices of the reads to write, by
+            default None (all reads)
+
+        Returns
+        -------
+        bytes
+            fastq records copied out of the raw bytes
+        """
+        raw = self.raw
+        return b"".join(
+            b"%b\n%b\n+\n%b\n"
+            % (raw[h_start:h_end], raw[s_start:s_end], raw[q_start:q_end])
+            for (h_start, s_start, q_start), (h_end, s_end, q_end) in zip(
+                *self.__record_bounds(select)
+            )
+        )
+
+    def __record_bounds(self, select: Optional[np.ndarray] = None) -> tuple[list, list]:
+        """Returns the start and end offsets of the header, sequence and
+        quality line of the (selected) reads"""
+        if self.line_bounds is None or len(self) == 0:
+            return [], []
+
+        line_bounds, lengths = self.line_bounds, self.lengths
+        if select is not None:
+            line_bounds, lengths = line_bounds[select], lengths[select]
+
+        starts = line_bounds[:, [0, 1, 3], 0]
+        ends = line_bounds[:, [0, 1, 3], 1]
+        ends[:, 1] = starts[:, 1] + lengths
+        ends[:, 2] = np.minimum(ends[:, 2], starts[:, 2] + lengths)
+        return starts.tolist(), ends.tolist()
+
+
+def parse_records(
+    data: Union[bytes, bytearray, memoryview, np.ndarray],
+    scale: Optional[int] = None,
+    validate: str = "full",
+) -> FastqBatch:
+    """Parses a buffer containing complete fastq records into a FastqBatch.
+
+    Record boundaries are found by scanning the buffer for newlines; every 4
+    lines make up a record. Trailing lines that do not make up a full record
+    are ignored.
+
+    Parameters
+    ----------
+    data : bytes-like
+        buffer containing fastq records
+    scale : Optional[int], optional
+        max length of the reads, by default None
+    validate : str, optional
+        validation mode (see VALIDATION_MODES). "full" checks the sequence
+        and quality characters and the length of the quality lines, "fast"
+        only checks the sequence characters and "off" skips validation,
+        by default "full"
+
+    Returns
+    -------
+    FastqBatch
+        reads stored as arrays
+
+    Raises
+    ------
+    FastqFormatError
+        Raised if a record contains an invalid header, direction,
+        sequence or quality characters
+    ValueError
+        Raised if the validation mode is unknown
+    """
+    if validate not in VALIDATION_MODES:
+        raise ValueError(
+            f"validate must be one of {VALIDATION_MODES}, provided: {validate}"
+        )
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    # locating all line endings
+    # -- the last line might not contain a newline character
+    line_ends = np.flatnonzero(buffer == NEWLINE)
+    if len(buffer) > 0 and buffer[-1] != NEWLINE:
+        line_ends = np.append(line_ends, len(buffer))
+
+    # only selecting complete records (4 lines = 1 entry)
+    n_reads = len(line_ends) // 4
+    line_ends = line_ends[: n_reads * 4]
+    line_starts = np.zeros_like(line_ends)
+    line_starts[1:] = line_ends[:-1] + 1
+
+    # removing carriage returns from windows line endings
+    last_chars = buffer[np.maximum(line_ends - 1, 0)] if n_reads > 0 else line_ends
+    line_ends = line_ends - (
+        (line_ends > line_starts) & (last_chars == CARRIAGE_RETURN)
+    )
+
+    # -- row: record, columns: header, sequence, separator, scores
+    line_starts = line_starts.reshape(n_reads, 4)
+    line_ends = line_ends.reshape(n_reads, 4)
+
+    # checking headers and obtaining sequence direction
+    rseq = _parse_directions(buffer, line_starts[:, 0], line_ends[:, 0])
+
+    # obtaining read lengths
+    lengths = line_ends[:, 1] - line_starts[:, 1]
+    if validate == "full" and not np.array_equal(
+        lengths, line_ends[:, 3] - line_starts[:, 3]
+    ):
+        raise FastqFormatError("Sequence and quality lines have different lengths")
+    width = int(lengths.max()) if n_reads > 0 else 0
+    if scale is not None:
+        width = min(width, int(scale))
+        lengths = np.minimum(lengths, width)
+
+    # collecting sequences and scores into padded matrices
+    mask = np.arange(width) < lengths[:, None]
+    seqs = _gather(buffer, line_starts[:, 1], width, mask)
+    scores = _gather(buffer, line_starts[:, 3], width, mask)
+
+    # check for valid sequences and scores
+    # -- padded positions (zeros) are never valid, therefore all positions
+    # -- are valid if the number of valid bytes equals the total length
+    n_bases = int(lengths.sum())
+    if validate != "off" and _count_valid(VALID_SEQ_TABLE, seqs) != n_bases:
+        raise FastqFormatError("File contains invalid sequence characters")
+    if validate == "full" and _count_valid(VALID_SCORE_TABLE, scores) != n_bases:
+        raise FastqFormatError("File contains invalid score characters")
+
+    # converting ASCII scores into phred scores
+    seqs = UPPER_CASE_TABLE[seqs]
+    np.subtract(scores, PHRED_OFFSET, out=scores, where=mask)
+
+    return FastqBatch(
+        scores=scores,
+        seqs=seqs,
+        lengths=lengths.astype(np.int64),
+        rseq=rseq,
+        raw=bytes(data) if not isinstance(data, bytes) else data,
+        line_bounds=np.stack((line_starts, line_ends), axis=2),
+    )
+
+
+def concat_arrays(arrays: List[np.ndarray], dtype: Any) -> np.ndarray:
+    """Concatenates per batch arrays, returns an empty array if there are
+    no batches
+
+    Parameters
+    ----------
+    arrays : List[np.ndarray]
+        arrays of each batch
+    dtype : Any
+        data type of the concatenated array
+
+    Returns
+    -------
+    np.ndarray
+        concatenated array
+    """
+    if len(arrays) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(arrays).astype(dtype, copy=False)
+
+
+def add_padded(totals: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Adds two per position vectors of different lengths. The longer vector
+    is updated in place (or copied if values is the longer one)
+
+    Parameters
+    ----------
+    totals : np.ndarray
+        running totals
+    values : np.ndarray
+        values to be added
+
+    Returns
+    -------
+    np.ndarray
+        sum of both vectors with the length of the longer vector
+    """
+    if len(values) > len(totals):
+        totals, values = values.astype(totals.dtype), totals
+    totals[: len(values)] += values
+    return totals
+
+
+def stack_padded(matrices: List[np.ndarray]) -> np.ndarray:
+    """Stacks zero padded matrices of different widths into a single zero
+    padded matrix
+
+    Parameters
+    ----------
+    matrices : List[np.ndarray]
+        (n_reads, width) matrices of each batch
+
+    Returns
+    -------
+    np.ndarray
+        (total_reads, max_width) matrix
+    """
+    width = max((matrix.shape[1] for matrix in matrices), default=0)
+    n_rows = sum(len(matrix) for matrix in matrices)
+    dtype = matrices[0].dtype if len(matrices) > 0 else np.uint8
+    stacked = np.zeros((n_rows, width), dtype=dtype)
+
+    row = 0
+    for matrix in matrices:
+        stacked[row : row + len(matrix), : matrix.shape[1]] = matrix  # noqa
+        row += len(matrix)
+    return stacked
+
+
+def _gather(
+    buffer: np.ndarray, starts: np.ndarray, width: int, mask: np.ndarray
+) -> np.ndarray:
+    """Collects `width` bytes from each starting position into a zero padded
+    matrix. Positions outside of the mask are set to zero"""
+    if len(starts) == 0 or width == 0:
+        return np.zeros(mask.shape, dtype=np.uint8)
+
+    # selecting rows of a sliding window view copies each row as a whole
+    padded = np.concatenate((buffer, np.zeros(width, dtype=np.uint8)))
+    matrix = sliding_window_view(padded, width)[starts]
+    if not mask.all():
+        matrix[~mask] = 0
+    return matrix
+
+
+def _count_valid(table: np.ndarray, matrix: np.ndarray) -> int:
+    """Counts the bytes of a matrix that are allowed by a lookup table"""
+    return int(np.count_nonzero(table[matrix]))
+
+
+def _parse_directions(
+    buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    """Checks the header of each record and returns the direction of each read.
+
+    The direction is the first field (split by ":") of the last whitespace
+    separated token of the header (1 == forward, 2 == reverse).
+    """
+    if len(starts) == 0:
+        return np.zeros(0, dtype=bool)
+
+    # parse the header
+    if not (buffer[starts] == HEADER_START).all() or not (ends > starts).all():
+        raise FastqFormatError("Unable to find header id")
+
+    # trailing whitespace is ignored, like str.split()
+    ends = ends.copy()
+    trailing = (ends > starts) & WHITESPACE_TABLE[buffer[np.maximum(ends - 1, 0)]]
+    while trailing.any():
+        ends[trailing] -= 1
+        trailing &= (ends > starts) & WHITESPACE_TABLE[buffer[np.maximum(ends - 1, 0)]]
+
+    # locating the last whitespace within each header
+    whitespace = np.flatnonzero(WHITESPACE_TABLE[buffer])
+    last_ws_idx = np.searchsorted(whitespace, ends) - 1
+    last_ws = whitespace[np.maximum(last_ws_idx, 0)] if len(whitespace) else starts
+    has_ws = (last_ws_idx >= 0) & (last_ws >= starts)
+    token_starts = np.where(has_ws, last_ws + 1, starts)
+
+    # direction is a single digit followed by ":" or the end of the header
+    safe_token_starts = np.minimum(token_starts, len(buffer) - 1)
+    directions = np.where(token_starts < ends, buffer[safe_token_starts], 0)
+    next_chars = buffer[np.minimum(token_starts + 1, len(buffer) - 1)]
+    terminated = (token_starts + 1 == ends) | (next_chars == DIR_SEPARATOR)
+    valid = terminated & ((directions == FORWARD_DIR) | (directions == REVERSE_DIR))
+    if not valid.all():
+        raise FastqFormatError("Unable to find the sequence direction")
+
+    return directions == REVERSE_DIR
+
+
+def _decode_rows(matrix: np.ndarray) -> List[str]:
+    """Decodes each row of a zero padded uint8 matrix into a string"""
+    if matrix.shape[1] == 0:
+        return [""] * len(matrix)
+
+    # fixed width byte strings drop the trailing zero padding
+    rows = np.ascontiguousarray(matrix, dtype=np.uint8).view(f"S{matrix.shape[1]}")
+    return [row.decode() for row in rows.ravel().tolist()]
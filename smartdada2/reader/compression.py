@@ -0,0 +1,282 @@
+"""
+Module contains support for reading compressed fastq files.
+
+Supported formats
+-----------------
+gzip (.fastq.gz)
+    decompressed in a background thread
+bgzip (.fastq.gz, .fastq.bgz)
+    blocks are decompressed in parallel by a thread pool
+zstd (.fastq.zst)
+    decompressed in a background thread, requires the optional `zstandard`
+    package
+
+Decompression runs in separate threads so it overlaps with parsing. zlib
+and zstandard release the GIL while decompressing.
+"""
+import collections
+import gzip
+import io
+import os
+import queue
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+# supported extensions
+FASTQ_SUFFIX = ".fastq"
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bgz": "gzip", ".zst": "zstd"}
+
+# magic bytes
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# bgzf block header: gzip header with an extra field containing the block size
+BGZF_HEADER = struct.Struct("<4BI2BH")
+BGZF_FEXTRA = 4
+
+# size of decompressed chunks passed between threads
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# assumed compression ratio of compressed fastq files, used for estimating
+# the decompressed size
+COMPRESSION_RATIO = 4
+
+
+def is_supported_path(fpath: Path) -> bool:
+    """Checks if the file has a '.fastq' extension, optionally followed by a
+    compression extension ('.gz', '.bgz', '.zst')
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+
+    Returns
+    -------
+    bool
+        True if the extension is supported
+    """
+    suffixes = [suffix.lower() for suffix in fpath.suffixes]
+    if len(suffixes) > 0 and suffixes[-1] == FASTQ_SUFFIX:
+        return True
+    return suffixes[-2:-1] == [FASTQ_SUFFIX] and suffixes[-1] in COMPRESSION_SUFFIXES
+
+
+def detect_compression(fpath: Path) -> Optional[str]:
+    """Detects the compression format of a file by its magic bytes
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+
+    Returns
+    -------
+    Optional[str]
+        "bgzip", "gzip", "zstd" or None if the file is not compressed
+    """
+    with open(fpath, "rb") as fastq_file:
+        header = fastq_file.read(BGZF_HEADER.size + 4)
+
+    if header.startswith(ZSTD_MAGIC):
+        return "zstd"
+    elif header.startswith(GZIP_MAGIC):
+        is_bgzf = _is_bgzf_header(header) and b"BC" in header[BGZF_HEADER.size :]
+        return "bgzip" if is_bgzf else "gzip"
+    return None
+
+
+def open_fastq(fpath: Path, threads: Optional[int] = None) -> BinaryIO:
+    """Opens a fastq file as a binary stream. Compressed files are
+    decompressed in background threads.
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+    threads : Optional[int], optional
+        number of threads used for decompressing bgzip blocks,
+        by default None (up to 8 threads)
+
+    Returns
+    -------
+    BinaryIO
+        buffered binary stream of the decompressed contents
+    """
+    compression = detect_compression(fpath)
+    if compression is None:
+        return open(fpath, "rb")
+    elif compression == "bgzip":
+        chunks = _iter_bgzf_chunks(fpath, threads)
+    elif compression == "gzip":
+        chunks = _iter_stream_chunks(fpath, gzip.open)
+    else:
+        chunks = _iter_stream_chunks(fpath, _open_zstd)
+
+    return io.BufferedReader(ThreadedReader(chunks), buffer_size=CHUNK_SIZE)
+
+
+class ThreadedReader(io.RawIOBase):
+    """Read-only stream that consumes chunks of bytes that are produced by a
+    background thread. The number of pending chunks is bounded to limit
+    memory usage.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], max_pending: int = 8):
+        super().__init__()
+        self.__queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.__stop = threading.Event()
+        self.__chunk = memoryview(b"")
+        self.__finished = False
+
+        self.__thread = threading.Thread(
+            target=self.__produce, args=(chunks,), daemon=True
+        )
+        self.__thread.start()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        # obtaining next chunk once the current one is consumed
+        while len(self.__chunk) == 0:
+            if self.__finished:
+                return 0
+            item = self.__queue.get()
+            if item is None:
+                self.__finished = True
+            elif isinstance(item, Exception):
+                self.__finished = True
+                raise item
+            else:
+                self.__chunk = memoryview(item)
+
+        size = min(len(buffer), len(self.__chunk))
+        buffer[:size] = self.__chunk[:size]
+        self.__chunk = self.__chunk[size:]
+        return size
+
+    def close(self) -> None:
+        # stopping the producer thread
+        self.__stop.set()
+        while self.__thread.is_alive():
+            try:
+                self.__queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        super().close()
+
+    def __produce(self, chunks: Iterable[bytes]) -> None:
+        """Puts decompressed chunks into the queue, None marks the end"""
+        try:
+            for chunk in chunks:
+                if not self.__put(chunk):
+                    return
+            self.__put(None)
+        except Exception as e:
+            # errors are raised within the consumer
+            self.__put(e)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    def __put(self, item) -> bool:
+        """Waits until there is space in the queue. Returns False if the
+        reader has been closed"""
+        while not self.__stop.is_set():
+            try:
+                self.__queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def _iter_stream_chunks(fpath: Path, opener) -> Iterable[bytes]:
+    """Reads decompressed chunks from a decompressing file object"""
+    with opener(fpath) as stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+
+def _iter_bgzf_chunks(fpath: Path, threads: Optional[int]) -> Iterable[bytes]:
+    """Decompresses bgzf blocks in parallel while preserving their order"""
+    n_threads = threads if threads is not None else min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        pending = collections.deque()
+        for block in _iter_bgzf_blocks(fpath):
+            pending.append(pool.submit(_inflate_bgzf_block, block))
+            if len(pending) >= 4 * n_threads:
+                yield pending.popleft().result()
+        for future in pending:
+            yield future.result()
+
+
+def _iter_bgzf_blocks(fpath: Path) -> Iterable[bytes]:
+    """Splits a bgzip file into its compressed blocks"""
+    with open(fpath, "rb") as bgzf_file:
+        while True:
+            header = bgzf_file.read(BGZF_HEADER.size)
+            if len(header) == 0:
+                break
+            elif not _is_bgzf_header(header):
+                raise ValueError("file is not a valid bgzip file")
+
+            # the extra field contains the size of the block
+            extra = bgzf_file.read(BGZF_HEADER.unpack(header)[-1])
+            remaining_size = _bgzf_block_size(extra) - len(header) - len(extra)
+            remaining = bgzf_file.read(remaining_size)
+            if len(remaining) != remaining_size:
+                raise EOFError("bgzip file ended before the end of a block")
+            yield header + extra + remaining
+
+
+def _bgzf_block_size(extra: bytes) -> int:
+    """Returns the total size of a bgzf block from the "BC" subfield of the
+    gzip extra field"""
+    idx = 0
+    while idx + 4 <= len(extra):
+        subfield_id = extra[idx : idx + 2]  # noqa
+        subfield_length = int.from_bytes(extra[idx + 2 : idx + 4], "little")  # noqa
+        if subfield_id == b"BC" and subfield_length == 2:
+            # block size is stored as (total size - 1)
+            return int.from_bytes(extra[idx + 4 : idx + 6], "little") + 1  # noqa
+        idx += 4 + subfield_length
+    raise ValueError("unable to find the bgzip block size")
+
+
+def _inflate_bgzf_block(block: bytes) -> bytes:
+    """Decompresses a single bgzf block (raw deflate data)"""
+    extra_length = BGZF_HEADER.unpack(block[: BGZF_HEADER.size])[-1]
+    data_start = BGZF_HEADER.size + extra_length
+    return zlib.decompress(block[data_start:-8], wbits=-15)
+
+
+def _is_bgzf_header(header: bytes) -> bool:
+    """Checks if a gzip header contains the bgzf extra field"""
+    if len(header) < BGZF_HEADER.size:
+        return False
+    id1, id2, _, flags, _, _, _, _ = BGZF_HEADER.unpack(header[: BGZF_HEADER.size])
+    return (id1, id2) == (0x1F, 0x8B) and bool(flags & BGZF_FEXTRA)
+
+
+def _open_zstd(fpath: Path) -> BinaryIO:
+    """Opens a zstd compressed file with the optional zstandard package"""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "reading '.zst' files requires the zstandard package: "
+            "pip install zstandard"
+        ) from e
+    # concatenated frames (e.g. from parallel compressors) form one stream
+    return zstandard.ZstdDecompressor().stream_reader(
+        open(fpath, "rb"), closefd=True, read_across_frames=True
+    )
@@ -0,0 +1,196 @@
+"""
+Module contains the early stopping (convergence based) estimation of per
+position quality scores.
+
+Averages per position stabilise long before all reads of a deep sequencing
+run are read. Running sums of scores and squared scores give the variance,
+and therefore a confidence interval, of each per position average. Reading
+stops once the half width of the interval of every position is within the
+tolerance, and the number of reads that were used is reported.
+
+Reads are taken from the start of the file. The estimate is only as good as
+the assumption that the first reads are representative of the whole file.
+"""
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from smartdada2.reader.accumulator import QualityAccumulator
+from smartdada2.reader.batch import FastqBatch, add_padded
+from smartdada2.reader.phred import phred_to_ee
+
+
+@dataclass
+class ConvergedProfile:
+    """Contains per position quality score estimates and their confidence
+    intervals
+
+    Attributes
+    ----------
+    quality : QualityAccumulator
+        per position quality score sums and read coverage
+    squares : np.ndarray
+        per position sums of squared quality scores
+    converged : bool
+        True if reading stopped because all positions converged, False if
+        all reads were used
+    tolerance : float
+        max half width of the confidence interval of the average quality
+        scores (phred)
+    confidence : float
+        confidence level of the intervals
+    ee_tolerance : Optional[float]
+        max half width of the confidence interval of the expected errors,
+        None if only the quality scores are checked
+    min_fraction : float
+        positions covered by a smaller fraction of reads are not required to
+        converge
+    """
+
+    quality: QualityAccumulator = field(default_factory=QualityAccumulator)
+    squares: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    converged: bool = False
+    tolerance: float = 0.1
+    confidence: float = 0.95
+    ee_tolerance: Optional[float] = None
+    min_fraction: float = 0.01
+
+    @property
+    def n_reads(self) -> int:
+        """Returns the number of reads used for the estimates"""
+        return self.quality.n_reads
+
+    @property
+    def mean_quality(self) -> np.ndarray:
+        """Returns the average quality score per position"""
+        return self.quality.mean()
+
+    def update(self, batch: FastqBatch) -> None:
+        """Adds a batch of reads into the running totals"""
+        self.quality.update(batch.scores, batch.lengths)
+        squares = np.square(batch.scores, dtype=np.uint16)
+        self.squares = add_padded(self.squares, squares.sum(axis=0, dtype=np.int64))
+
+    def quality_half_width(self) -> np.ndarray:
+        """Returns the half width of the confidence interval of the average
+        quality score per position. Positions covered by less than two reads
+        have an infinite half width."""
+        counts = self.quality.counts
+        n = np.maximum(counts, 2)
+
+        # float sums, squaring large integer sums overflows
+        sums = self.quality.sums.astype(np.float64)
+        variance = (self.squares - sums**2 / n) / (n - 1)
+        half_width = _z_score(self.confidence) * np.sqrt(np.maximum(variance, 0) / n)
+        return np.where(counts >= 2, half_width, np.inf)
+
+    def ee_half_width(self) -> np.ndarray:
+        """Returns the half width of the confidence interval of the expected
+        error of the average quality score per position (delta method:
+        |dEE/dQ| = ln(10) / 10 * EE)"""
+        slope = np.log(10) / 10 * phred_to_ee(self.mean_quality)
+        return slope * self.quality_half_width()
+
+    def required_positions(self) -> np.ndarray:
+        """Returns a boolean mask of the positions that must converge"""
+        return self.quality.counts >= self.min_fraction * max(self.n_reads, 1)
+
+    def is_converged(self) -> bool:
+        """Checks if all required positions are within the tolerances"""
+        required = self.required_positions()
+        if not required.any():
+            return False
+        elif (self.quality_half_width()[required] > self.tolerance).any():
+            return False
+        elif self.ee_tolerance is not None:
+            return bool((self.ee_half_width()[required] <= self.ee_tolerance).all())
+        return True
+
+    def quality_frame(self) -> pd.DataFrame:
+        """Returns the average quality score per position with the half width
+        of its confidence interval and the read coverage
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position", "AverageQualityScore", "HalfWidth" and
+            "Coverage" columns
+        """
+        frame = self.quality.to_frame()
+        frame["HalfWidth"] = self.quality_half_width()
+        frame["Coverage"] = self.quality.counts
+        return frame
+
+    def expected_error_frame(self) -> pd.DataFrame:
+        """Returns the expected error of the average quality score per
+        position with the half width of its confidence interval
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position", "AverageExpectedError" and "HalfWidth"
+            columns
+        """
+        return pd.DataFrame(
+            {
+                "Position": np.arange(len(self.quality.sums)),
+                "AverageExpectedError": phred_to_ee(self.mean_quality),
+                "HalfWidth": self.ee_half_width(),
+            }
+        )
+
+
+def collect_converged(
+    batches: Iterable[FastqBatch],
+    tolerance: float = 0.1,
+    confidence: float = 0.95,
+    ee_tolerance: Optional[float] = None,
+    min_reads: int = 10_000,
+    min_fraction: float = 0.01,
+) -> ConvergedProfile:
+    """Reads batches until the average quality score of every position is
+    estimated within the tolerance
+
+    Parameters
+    ----------
+    batches : Iterable[FastqBatch]
+        batches of reads
+    tolerance : float, optional
+        max half width of the confidence intervals of the average quality
+        scores (phred), by default 0.1
+    confidence : float, optional
+        confidence level of the intervals, by default 0.95
+    ee_tolerance : Optional[float], optional
+        max half width of the confidence intervals of the expected errors,
+        by default None (not checked)
+    min_reads : int, optional
+        min number of reads before checking for convergence, by default 10_000
+    min_fraction : float, optional
+        positions covered by a smaller fraction of reads are not required to
+        converge, by default 0.01
+
+    Returns
+    -------
+    ConvergedProfile
+        estimates and the number of reads that were used
+    """
+    profile = ConvergedProfile(
+        tolerance=tolerance,
+        confidence=confidence,
+        ee_tolerance=ee_tolerance,
+        min_fraction=min_fraction,
+    )
+    for batch in batches:
+        profile.update(batch)
+        if profile.n_reads >= min_reads and profile.is_converged():
+            profile.converged = True
+            break
+    return profile
+
+
+def _z_score(confidence: float) -> float:
+    """Returns the two sided standard normal quantile of a confidence level"""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
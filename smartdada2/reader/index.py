@@ -0,0 +1,211 @@
+"""
+Module contains the persistent record offset index of fastq files.
+
+The index is stored next to the fastq file as a sidecar file
+(`<file>.fastq.fqi`) and contains the starting byte offset of every record.
+It is built once and validated against the size and modification time of
+the fastq file, allowing readers to seek straight to any record.
+
+Sidecar layout
+--------------
+header : magic (4 bytes), file size, file mtime (ns), number of records
+offsets : (n_records + 1) int64 values. The last value is the end of the
+    last complete record.
+"""
+import mmap
+import struct
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from smartdada2.reader.batch import NEWLINE
+
+INDEX_SUFFIX = ".fqi"
+INDEX_MAGIC = b"FQI1"
+INDEX_HEADER = struct.Struct("<4sQqQ")
+
+# number of bytes scanned per step while building the index
+_SCAN_SIZE = 64 * 1024 * 1024
+
+
+@dataclass
+class RecordIndex:
+    """Contains the starting byte offsets of all records within a fastq file
+
+    Attributes
+    ----------
+    offsets : np.ndarray
+        (n_records + 1,) byte offsets, record i spans
+        offsets[i]:offsets[i + 1]
+    file_size : int
+        size of the indexed fastq file
+    mtime_ns : int
+        modification time of the indexed fastq file
+    """
+
+    offsets: np.ndarray
+    file_size: int
+    mtime_ns: int
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def is_valid_for(self, fpath: Path) -> bool:
+        """Checks if the index was built from the current version of the file
+
+        Parameters
+        ----------
+        fpath : Path
+            path to fastq file
+
+        Returns
+        -------
+        bool
+            True if the size and modification time of the file match
+        """
+        stats = fpath.stat()
+        return stats.st_size == self.file_size and stats.st_mtime_ns == self.mtime_ns
+
+    def save(self, index_path: Path) -> None:
+        """Writes the index as a sidecar file
+
+        Parameters
+        ----------
+        index_path : Path
+            path to sidecar file
+        """
+        with open(index_path, "wb") as index_file:
+            index_file.write(
+                INDEX_HEADER.pack(INDEX_MAGIC, self.file_size, self.mtime_ns, len(self))
+            )
+            np.ascontiguousarray(self.offsets, dtype="<i8").tofile(index_file)
+
+    @classmethod
+    def load(cls, index_path: Path) -> Optional["RecordIndex"]:
+        """Loads a sidecar file. The offsets are memory mapped, therefore only
+        the accessed offsets are read from disk.
+
+        Parameters
+        ----------
+        index_path : Path
+            path to sidecar file
+
+        Returns
+        -------
+        Optional[RecordIndex]
+            index or None if the sidecar file does not exist or is invalid
+        """
+        if not index_path.is_file() or index_path.stat().st_size < INDEX_HEADER.size:
+            return None
+
+        with open(index_path, "rb") as index_file:
+            magic, file_size, mtime_ns, n_records = INDEX_HEADER.unpack(
+                index_file.read(INDEX_HEADER.size)
+            )
+
+        # checking sidecar contents
+        expected_size = INDEX_HEADER.size + 8 * (n_records + 1)
+        if magic != INDEX_MAGIC or index_path.stat().st_size != expected_size:
+            return None
+
+        offsets = np.memmap(
+            index_path,
+            dtype="<i8",
+            mode="r",
+            offset=INDEX_HEADER.size,
+            shape=(n_records + 1,),
+        )
+        return cls(offsets=offsets, file_size=file_size, mtime_ns=mtime_ns)
+
+    @classmethod
+    def build(cls, fpath: Path) -> "RecordIndex":
+        """Builds the index by scanning the memory mapped file for newlines.
+        Every 4th line is the start of a record.
+
+        Parameters
+        ----------
+        fpath : Path
+            path to fastq file
+
+        Returns
+        -------
+        RecordIndex
+            index of the fastq file
+        """
+        stats = fpath.stat()
+        size = stats.st_size
+
+        record_starts = [np.zeros(1, dtype=np.int64)]
+        line_count = 0
+        with open(fpath, "rb") as fastq_file:
+            with mmap.mmap(fastq_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for chunk_start in range(0, size, _SCAN_SIZE):
+                    count = min(_SCAN_SIZE, size - chunk_start)
+                    view = np.frombuffer(
+                        mapped, dtype=np.uint8, count=count, offset=chunk_start
+                    )
+                    newlines = np.flatnonzero(view == NEWLINE) + chunk_start
+                    del view
+
+                    # a record starts after every 4th newline
+                    first = (3 - line_count) % 4
+                    record_starts.append(newlines[first::4] + 1)
+                    line_count += len(newlines)
+
+        # the last line might not contain a newline character
+        if _ends_without_newline(fpath, size):
+            line_count += 1
+
+        # only indexing complete records, the last offset is the end of the
+        # last complete record
+        n_records = line_count // 4
+        offsets = np.concatenate(record_starts)[: n_records + 1]
+        if len(offsets) < n_records + 1:
+            offsets = np.append(offsets, size)
+
+        return cls(offsets=offsets, file_size=size, mtime_ns=stats.st_mtime_ns)
+
+
+def index_path_for(fpath: Path) -> Path:
+    """Returns the path of the sidecar index file of a fastq file"""
+    return fpath.with_name(fpath.name + INDEX_SUFFIX)
+
+
+def load_or_build_index(fpath: Path) -> RecordIndex:
+    """Loads the sidecar index of a fastq file. The index is rebuilt and saved
+    if it does not exist or if the fastq file has been modified.
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+
+    Returns
+    -------
+    RecordIndex
+        index of the fastq file
+    """
+    index_path = index_path_for(fpath)
+    record_index = RecordIndex.load(index_path)
+    if record_index is not None and record_index.is_valid_for(fpath):
+        return record_index
+
+    # (re)building index
+    record_index = RecordIndex.build(fpath)
+    try:
+        record_index.save(index_path)
+    except OSError as e:
+        warnings.warn(f"Unable to save index file {index_path}: {e}")
+    return record_index
+
+
+def _ends_without_newline(fpath: Path, size: int) -> bool:
+    """Checks if the last byte of a non empty file is not a newline"""
+    if size == 0:
+        return False
+    with open(fpath, "rb") as fastq_file:
+        fastq_file.seek(size - 1)
+        return fastq_file.read(1) != b"\n"
@@ -0,0 +1,315 @@
+"""
+Module contains the 2-bit packed representation of sequences.
+
+A, C, G and T are stored as 2-bit codes, four bases per byte, and every read
+starts at a byte boundary. All other bases (ambiguous nucleotides and U) are
+rare and stored separately as a sparse list of (base index, character)
+pairs. Packed sequences use about a quarter of a byte per base, compared to
+one byte per base for uint8 matrices and 50-60 bytes per base for a
+DataFrame of single character strings.
+"""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from smartdada2.reader.batch import AMB_TABLE
+
+# 2-bit codes of the packed bases
+PACKED_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+BASE_CODES = np.zeros(256, dtype=np.uint8)
+BASE_CODES[PACKED_BASES] = np.arange(4, dtype=np.uint8)
+PACKED_TABLE = np.zeros(256, dtype=bool)
+PACKED_TABLE[PACKED_BASES] = True
+
+# lookup table: the 4 bases (ASCII) of every possible byte
+UNPACK_TABLE = PACKED_BASES[(np.arange(256)[:, None] >> np.arange(0, 8, 2)) & 3]
+UNPACK_TABLE = UNPACK_TABLE.astype(np.uint8)
+
+# lookup table: single character strings of ASCII codes, None for padding
+CHARACTERS = np.array([None] + [chr(code) for code in range(1, 256)], dtype=object)
+
+
+@dataclass
+class PackedSequences:
+    """Contains 2-bit packed sequences with a sparse list of the bases that
+    cannot be packed
+
+    Attributes
+    ----------
+    bits : np.ndarray
+        (n_bytes,) uint8 packed bases, the first base of a byte is stored in
+        the lowest 2 bits
+    byte_offsets : np.ndarray
+        (n_reads + 1,) int64 offsets, read i spans
+        bits[byte_offsets[i]:byte_offsets[i + 1]]
+    lengths : np.ndarray
+        (n_reads,) length of each read
+    other_index : np.ndarray
+        (n_other,) int64 index of each unpacked base, counted over the bases
+        of all reads back to back
+    other_bases : np.ndarray
+        (n_other,) uint8 ASCII character of each unpacked base
+    """
+
+    bits: np.ndarray
+    byte_offsets: np.ndarray
+    lengths: np.ndarray
+    other_index: np.ndarray
+    other_bases: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("read index out of range")
+        return self.select(np.array([idx])).to_strings()[0]
+
+    @property
+    def width(self) -> int:
+        """Returns the length of the longest read"""
+        return int(self.lengths.max()) if len(self) > 0 else 0
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """Returns the (n_reads + 1,) base offsets of the reads"""
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(self.lengths, out=offsets[1:])
+        return offsets
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the memory size (bytes) of all arrays"""
+        return sum(
+            array.nbytes
+            for array in (
+                self.bits,
+                self.byte_offsets,
+                self.lengths,
+                self.other_index,
+                self.other_bases,
+            )
+        )
+
+    @classmethod
+    def from_padded(cls, seqs: np.ndarray, lengths: np.ndarray) -> "PackedSequences":
+        """Packs a padded matrix of upper case ASCII sequences (e.g.
+        `FastqBatch.seqs`)
+
+        Parameters
+        ----------
+        seqs : np.ndarray
+            (n_reads, width) uint8 ASCII sequences
+        lengths : np.ndarray
+            (n_reads,) length of each read
+
+        Returns
+        -------
+        PackedSequences
+            packed sequences
+        """
+        lengths = np.asarray(lengths, dtype=np.int64)
+        n_reads, width = seqs.shape
+        n_columns = -(-width // 4)
+
+        # 2-bit codes of 4 consecutive bases combined into one byte
+        codes = np.zeros((n_reads, 4 * n_columns), dtype=np.uint8)
+        codes[:, :width] = BASE_CODES[seqs]
+        codes = codes.reshape(n_reads, n_columns, 4)
+        packed = codes[:, :, 0] | codes[:, :, 1] << 2
+        packed |= codes[:, :, 2] << 4
+        packed |= codes[:, :, 3] << 6
+
+        # bytes within the length of each read
+        n_bytes = -(-lengths // 4)
+        byte_offsets = np.zeros(n_reads + 1, dtype=np.int64)
+        np.cumsum(n_bytes, out=byte_offsets[1:])
+        bits = packed[np.arange(n_columns) < n_bytes[:, None]]
+
+        # bases that cannot be packed
+        valid = np.arange(width) < lengths[:, None]
+        rows, columns = np.nonzero(valid & ~PACKED_TABLE[seqs])
+        offsets = np.zeros(n_reads + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(
+            bits=bits,
+            byte_offsets=byte_offsets,
+            lengths=lengths,
+            other_index=offsets[rows] + columns,
+            other_bases=seqs[rows, columns].astype(np.uint8),
+        )
+
+    @classmethod
+    def from_strings(cls, seqs: List[str]) -> "PackedSequences":
+        """Packs a list of sequences
+
+        Parameters
+        ----------
+        seqs : List[str]
+            upper case sequences
+
+        Returns
+        -------
+        PackedSequences
+            packed sequences
+        """
+        lengths = np.array([len(seq) for seq in seqs], dtype=np.int64)
+        width = int(lengths.max()) if len(seqs) > 0 else 0
+        matrix = np.array(seqs, dtype=f"S{max(width, 1)}").view(np.uint8)
+        return cls.from_padded(matrix.reshape(len(seqs), -1)[:, :width], lengths)
+
+    @classmethod
+    def concat(cls, arrays: List["PackedSequences"]) -> "PackedSequences":
+        """Concatenates the reads of multiple PackedSequences
+
+        Parameters
+        ----------
+        arrays : List[PackedSequences]
+            packed sequences to concatenate
+
+        Returns
+        -------
+        PackedSequences
+            all reads in order
+        """
+        if len(arrays) == 0:
+            return cls.from_padded(np.zeros((0, 0), dtype=np.uint8), np.zeros(0))
+
+        # offsets of each array within the concatenated bytes and bases
+        n_bytes = [array.byte_offsets[-1] for array in arrays]
+        n_bases = [array.lengths.sum() for array in arrays]
+        byte_starts = np.concatenate(([0], np.cumsum(n_bytes)[:-1]))
+        base_starts = np.concatenate(([0], np.cumsum(n_bases)[:-1]))
+
+        byte_offsets = [np.zeros(1, dtype=np.int64)]
+        for array, start in zip(arrays, byte_starts):
+            byte_offsets.append(array.byte_offsets[1:] + start)
+        return cls(
+            bits=np.concatenate([array.bits for array in arrays]),
+            byte_offsets=np.concatenate(byte_offsets),
+            lengths=np.concatenate([array.lengths for array in arrays]),
+            other_index=np.concatenate(
+                [array.other_index + start for array, start in zip(arrays, base_starts)]
+            ).astype(np.int64),
+            other_bases=np.concatenate([array.other_bases for array in arrays]),
+        )
+
+    def select(self, indices: np.ndarray) -> "PackedSequences":
+        """Returns the reads at the selected indices
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            indices of the selected reads
+
+        Returns
+        -------
+        PackedSequences
+            selected reads in the order of the indices
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+
+        # bytes of the selected reads
+        n_bytes = self.byte_offsets[indices + 1] - self.byte_offsets[indices]
+        byte_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(n_bytes, out=byte_offsets[1:])
+        byte_index = np.repeat(self.byte_offsets[indices] - byte_offsets[:-1], n_bytes)
+        bits = self.bits[byte_index + np.arange(byte_offsets[-1])]
+
+        # unpacked bases are sorted by read, those of a read are contiguous
+        rows, columns = self.__other_positions(self.offsets)
+        starts = np.searchsorted(rows, indices, side="left")
+        n_other = np.searchsorted(rows, indices, side="right") - starts
+        other_starts = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(n_other, out=other_starts[1:])
+        other = np.repeat(starts - other_starts[:-1], n_other)
+        other += np.arange(other_starts[-1])
+
+        new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=new_offsets[1:])
+        return PackedSequences(
+            bits=bits,
+            byte_offsets=byte_offsets,
+            lengths=lengths,
+            other_index=np.repeat(new_offsets[:-1], n_other) + columns[other],
+            other_bases=self.other_bases[other],
+        )
+
+    def to_padded(self, fill: int = 0) -> np.ndarray:
+        """Unpacks the sequences into a padded matrix of ASCII characters
+
+        Parameters
+        ----------
+        fill : int, optional
+            value of positions beyond the length of a read, by default 0
+
+        Returns
+        -------
+        np.ndarray
+            (n_reads, width) uint8 ASCII sequences
+        """
+        width = self.width
+        n_columns = -(-width // 4)
+        n_bytes = np.diff(self.byte_offsets)
+
+        # bytes of each read, padded to the longest read
+        packed = np.zeros((len(self), n_columns), dtype=np.uint8)
+        packed[np.arange(n_columns) < n_bytes[:, None]] = self.bits
+        matrix = UNPACK_TABLE[packed].reshape(len(self), 4 * n_columns)[:, :width]
+        matrix = np.ascontiguousarray(matrix)
+
+        rows, columns = self.__other_positions(self.offsets)
+        matrix[rows, columns] = self.other_bases
+        matrix[np.arange(width) >= self.lengths[:, None]] = fill
+        return matrix
+
+    def to_strings(self) -> List[str]:
+        """Unpacks the sequences into strings
+
+        Returns
+        -------
+        List[str]
+            sequence of each read
+        """
+        matrix = self.to_padded()
+        if matrix.shape[1] == 0:
+            return [""] * len(self)
+
+        # fixed width byte strings drop the trailing zero padding
+        rows = matrix.view(f"S{matrix.shape[1]}").ravel()
+        return [row.decode() for row in rows.tolist()]
+
+    def to_characters(self) -> np.ndarray:
+        """Unpacks the sequences into a padded matrix of single character
+        strings. All cells with the same nucleotide share one string object.
+
+        Returns
+        -------
+        np.ndarray
+            (n_reads, width) object matrix, positions beyond the length of a
+            read are None
+        """
+        return CHARACTERS[self.to_padded()]
+
+    def ambiguous_counts(self) -> np.ndarray:
+        """Counts the ambiguous nucleotides at each position. Only the sparse
+        unpacked bases are checked.
+
+        Returns
+        -------
+        np.ndarray
+            (width,) number of ambiguous nucleotides per position
+        """
+        _, columns = self.__other_positions(self.offsets)
+        ambiguous = AMB_TABLE[self.other_bases]
+        return np.bincount(columns[ambiguous], minlength=self.width).astype(np.int64)
+
+    def __other_positions(self, offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the read (row) and position (column) of each unpacked
+        base"""
+        rows = np.searchsorted(offsets, self.other_index, side="right") - 1
+        return rows, self.other_index - offsets[rows]
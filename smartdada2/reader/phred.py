@@ -0,0 +1,114 @@
+"""
+Module contains the conversion of phred scores into expected errors.
+
+The expected error of a base with phred score Q is 10 ** (-Q / 10). Since
+phred scores are stored as uint8, all possible values are precomputed into a
+lookup table and whole quality matrices are converted with a single NumPy
+indexing operation.
+"""
+from typing import Optional, Union
+
+import numpy as np
+
+# lookup table: expected error of every possible uint8 phred score
+PHRED_TO_EE = 10 ** (-(np.arange(256) / 10))
+PHRED_TO_EE.flags.writeable = False
+
+
+def phred_to_ee(scores: Union[np.ndarray, float, int]) -> np.ndarray:
+    """Converts phred scores into expected errors. Integer scores use the
+    lookup table, non integer scores (e.g. averages) are computed directly.
+
+    Parameters
+    ----------
+    scores : Union[np.ndarray, float, int]
+        phred scores
+
+    Returns
+    -------
+    np.ndarray
+        expected errors
+    """
+    scores = np.asarray(scores)
+    if scores.dtype.kind in "ui":
+        return PHRED_TO_EE[scores]
+    return 10 ** (-(scores / 10))
+
+
+def ee_matrix(
+    scores: np.ndarray, lengths: Optional[np.ndarray] = None, fill: float = 0.0
+) -> np.ndarray:
+    """Converts a zero padded phred score matrix into expected errors
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        (n_reads, width) uint8 phred scores
+    lengths : Optional[np.ndarray], optional
+        (n_reads,) length of each read. If provided, positions beyond the
+        length of a read are set to `fill`, by default None
+    fill : float, optional
+        value of padded positions, by default 0.0
+
+    Returns
+    -------
+    np.ndarray
+        (n_reads, width) expected errors
+    """
+    ee_scores = PHRED_TO_EE[scores]
+    if lengths is not None:
+        padded = np.arange(scores.shape[1]) >= lengths[:, None]
+        if padded.any():
+            ee_scores[padded] = fill
+    return ee_scores
+
+
+def read_ee_sums(
+    scores: np.ndarray,
+    lengths: np.ndarray,
+    left: int = 0,
+    right: Optional[int] = None,
+) -> np.ndarray:
+    """Sums the expected errors of each read. If left and right are provided,
+    only the positions between left and right (exclusive) are summed.
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        (n_reads, width) uint8 phred scores
+    lengths : np.ndarray
+        (n_reads,) length of each read
+    left : int, optional
+        first position, by default 0
+    right : Optional[int], optional
+        last position (exclusive), by default None (end of read)
+
+    Returns
+    -------
+    np.ndarray
+        (n_reads,) sum of expected errors per read
+    """
+    return ee_matrix(scores, lengths)[:, left:right].sum(axis=1)
+
+
+def cumulative_ee(scores: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Computes the cumulative expected error of each read. Column j contains
+    the sum of expected errors of the first j bases, therefore the expected
+    error between positions left and right is
+    `cumulative[:, right] - cumulative[:, left]`.
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        (n_reads, width) uint8 phred scores
+    lengths : np.ndarray
+        (n_reads,) length of each read
+
+    Returns
+    -------
+    np.ndarray
+        (n_reads, width + 1) cumulative expected errors
+    """
+    cumulative = np.zeros((scores.shape[0], scores.shape[1] + 1), dtype=np.float64)
+    np.cumsum(ee_matrix(scores, lengths), axis=1, out=cumulative[:, 1:])
+    return cumulative
@@ -0,0 +1,250 @@
+"""
+Module contains the fused single pass profile of a fastq file.
+
+A SampleProfile collects every statistic used for selecting trimming
+parameters while reading the file once: per position quality scores,
+expected errors and ambiguous nucleotides, and per read lengths, directions
+and total expected errors (with and without a trimming window).
+"""
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from smartdada2.reader.accumulator import QualityAccumulator
+from smartdada2.reader.batch import AMB_TABLE, FastqBatch, add_padded, concat_arrays
+from smartdada2.reader.phred import ee_matrix, phred_to_ee
+
+
+@dataclass
+class SampleProfile:
+    """Contains the statistics of all reads within a fastq file
+
+    Attributes
+    ----------
+    quality : QualityAccumulator
+        per position quality score sums and read coverage
+    ee_sums : np.ndarray
+        per position sums of expected errors
+    ambiguous_counts : np.ndarray
+        per position number of ambiguous nucleotides
+    lengths : np.ndarray
+        (n_reads,) length of each read
+    rseq : np.ndarray
+        (n_reads,) direction of each read (True == reverse)
+    read_ee : np.ndarray
+        (n_reads,) sum of expected errors of each read
+    trimmed_ee : Optional[np.ndarray]
+        (n_reads,) sum of expected errors between the trimming positions of
+        each read. None if no trimming window was provided
+    trim : Optional[Tuple[int, int]]
+        trimming window (left, right), right is exclusive
+    """
+
+    quality: QualityAccumulator = field(default_factory=QualityAccumulator)
+    ee_sums: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    ambiguous_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    lengths: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    rseq: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+    read_ee: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    trimmed_ee: Optional[np.ndarray] = None
+    trim: Optional[Tuple[int, int]] = None
+
+    @property
+    def n_reads(self) -> int:
+        """Returns the number of profiled reads"""
+        return len(self.lengths)
+
+    @property
+    def mean_quality(self) -> np.ndarray:
+        """Returns the average quality score per position"""
+        return self.quality.mean()
+
+    @property
+    def mean_ee(self) -> np.ndarray:
+        """Returns the average expected error per position"""
+        return self.ee_sums / np.maximum(self.quality.counts, 1)
+
+    def quality_frame(self) -> pd.DataFrame:
+        """Returns the average quality score per position. Same as
+        `FastqReader.get_average_score()`
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position" and "AverageQualityScore" columns
+        """
+        return self.quality.to_frame()
+
+    def expected_error_frame(self) -> pd.DataFrame:
+        """Returns the expected error of the average quality score per
+        position. Same as `FastqReader.get_expected_error()`
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position" and "AverageExpectedError" columns
+        """
+        return pd.DataFrame(
+            {
+                "Position": np.arange(len(self.quality.sums)),
+                "AverageExpectedError": phred_to_ee(self.mean_quality),
+            }
+        )
+
+    def max_ee_frame(self) -> pd.DataFrame:
+        """Returns the sum of expected errors of each read before trimming and
+        within the trimming window. Same as `GetMaxEE.read_size_by_maxEE()`
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "NoTrimming" and "ObviousTrimming" columns
+
+        Raises
+        ------
+        ValueError
+            Raised if the profile was created without a trimming window
+        """
+        if self.trimmed_ee is None:
+            raise ValueError("profile was created without a trimming window")
+        return pd.DataFrame(
+            {"NoTrimming": self.read_ee, "ObviousTrimming": self.trimmed_ee}
+        )
+
+    def ambiguous_frame(self) -> pd.DataFrame:
+        """Returns the number of ambiguous nucleotides per position. Same as
+        `FastqReader.ambiguous_nucleotide_counts()`
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position" and "AmbiguousCounts" columns
+        """
+        return pd.DataFrame(
+            {
+                "Position": np.arange(len(self.ambiguous_counts)),
+                "AmbiguousCounts": self.ambiguous_counts,
+            }
+        )
+
+    @classmethod
+    def concat(cls, profiles: List["SampleProfile"]) -> "SampleProfile":
+        """Merges the profiles of consecutive parts (shards) of a file
+
+        Parameters
+        ----------
+        profiles : List[SampleProfile]
+            profiles in file order
+
+        Returns
+        -------
+        SampleProfile
+            profile of all reads
+        """
+        merged = cls(trim=profiles[0].trim if len(profiles) > 0 else None)
+        for profile in profiles:
+            merged.quality.merge(profile.quality)
+            merged.ee_sums = add_padded(merged.ee_sums, profile.ee_sums)
+            merged.ambiguous_counts = add_padded(
+                merged.ambiguous_counts, profile.ambiguous_counts
+            )
+
+        merged.lengths = concat_arrays([p.lengths for p in profiles], np.int64)
+        merged.rseq = concat_arrays([p.rseq for p in profiles], bool)
+        merged.read_ee = concat_arrays([p.read_ee for p in profiles], np.float64)
+        if merged.trim is not None:
+            merged.trimmed_ee = concat_arrays(
+                [p.trimmed_ee for p in profiles], np.float64
+            )
+        return merged
+
+
+class ProfileAccumulator:
+    """Accumulates the profile of reads batch by batch, the per read
+    statistics are concatenated once all batches were added.
+
+    Parameters
+    ----------
+    trim : Optional[Tuple[int, int]], optional
+        trimming window (left, right) used for the trimmed expected errors,
+        by default None
+    """
+
+    def __init__(self, trim: Optional[Tuple[int, int]] = None):
+        self.profile = SampleProfile(trim=trim)
+        self.__lengths: List[np.ndarray] = []
+        self.__rseq: List[np.ndarray] = []
+        self.__read_ee: List[np.ndarray] = []
+        self.__trimmed_ee: List[np.ndarray] = []
+
+    def update(self, batch: FastqBatch) -> None:
+        """Adds the reads of a batch
+
+        Parameters
+        ----------
+        batch : FastqBatch
+            batch of reads
+        """
+        # per position statistics
+        profile = self.profile
+        profile.quality.update(batch.scores, batch.lengths)
+        ee_scores = ee_matrix(batch.scores, batch.lengths)
+        profile.ee_sums = add_padded(profile.ee_sums, ee_scores.sum(axis=0))
+        profile.ambiguous_counts = add_padded(
+            profile.ambiguous_counts,
+            AMB_TABLE[batch.seqs].sum(axis=0, dtype=np.int64),
+        )
+
+        # per read statistics
+        trim = profile.trim
+        self.__lengths.append(batch.lengths)
+        self.__rseq.append(batch.rseq)
+        self.__read_ee.append(ee_scores.sum(axis=1))
+        if trim is not None:
+            self.__trimmed_ee.append(
+                ee_scores[:, trim[0] : trim[1]].sum(axis=1)  # noqa
+            )
+
+    def result(self) -> SampleProfile:
+        """Returns the profile of all added reads
+
+        Returns
+        -------
+        SampleProfile
+            profile of all reads
+        """
+        profile = self.profile
+        profile.lengths = concat_arrays(self.__lengths, np.int64)
+        profile.rseq = concat_arrays(self.__rseq, bool)
+        profile.read_ee = concat_arrays(self.__read_ee, np.float64)
+        if profile.trim is not None:
+            profile.trimmed_ee = concat_arrays(self.__trimmed_ee, np.float64)
+        return profile
+
+
+def collect_profile(
+    batches: Iterable[FastqBatch], trim: Optional[Tuple[int, int]] = None
+) -> SampleProfile:
+    """Profiles all reads within a single pass over the batches
+
+    Parameters
+    ----------
+    batches : Iterable[FastqBatch]
+        batches of reads
+    trim : Optional[Tuple[int, int]], optional
+        trimming window (left, right) used for the trimmed expected errors,
+        by default None
+
+    Returns
+    -------
+    SampleProfile
+        profile of all reads
+    """
+    accumulator = ProfileAccumulator(trim)
+    for batch in batches:
+        accumulator.update(batch)
+    return accumulator.result()
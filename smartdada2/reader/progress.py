@@ -0,0 +1,339 @@
+"""
+Module contains the progress and metrics hooks of the fastq loader.
+
+Observers are attached to a FastqReader and are called while a pass over the
+file is loading: every `every_records` records and/or `every_bytes` bytes,
+when loading stops at a record that fails validation and when the pass
+finishes. Progress is
+checked after each parsed block, therefore observers are called at most once
+per block (`batch_size` records).
+
+Built-in observers
+------------------
+ProgressBar
+    progress bar with throughput and an ETA estimated from the file size
+PrometheusTextfile
+    metrics file for the textfile collector of the Prometheus node exporter
+"""
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, TextIO, Union
+
+from smartdada2.reader.compression import COMPRESSION_RATIO
+
+
+@dataclass(frozen=True)
+class LoadProgress:
+    """Contains the cumulative progress of a pass over a fastq file
+
+    Attributes
+    ----------
+    fpath : Path
+        path to fastq file
+    n_records : int
+        number of loaded records
+    n_bytes : int
+        byte offset within the (decompressed) file
+    elapsed : float
+        seconds since the start of the pass
+    failed : bool
+        True if loading stopped at a record that failed validation. Parsing
+        raises on the first invalid record, therefore failures are reported
+        as a flag and not as a count
+    expected_bytes : int
+        estimated size of the (decompressed) file
+    finished : bool
+        True if the whole file was loaded
+    """
+
+    fpath: Path
+    n_records: int
+    n_bytes: int
+    elapsed: float
+    expected_bytes: int
+    finished: bool = False
+    failed: bool = False
+
+    @property
+    def fraction(self) -> float:
+        """Returns the estimated fraction of the file that was loaded"""
+        if self.finished:
+            return 1.0
+        return min(self.n_bytes / max(self.expected_bytes, 1), 0.99)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Returns the estimated seconds until the pass finishes, None if
+        nothing was loaded yet"""
+        if self.finished:
+            return 0.0
+        elif self.n_bytes == 0 or self.elapsed <= 0:
+            return None
+        return self.elapsed * (1 - self.fraction) / self.fraction
+
+    @property
+    def records_per_s(self) -> float:
+        """Returns the number of loaded records per second"""
+        return self.n_records / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class LoadObserver:
+    """Base class of loader observers. Subclasses override `on_progress` and
+    optionally `on_finish`.
+
+    Parameters
+    ----------
+    every_records : Optional[int], optional
+        calls `on_progress` every `every_records` records, by default 100_000
+    every_bytes : Optional[int], optional
+        calls `on_progress` every `every_bytes` bytes, by default None
+    """
+
+    def __init__(
+        self, every_records: Optional[int] = 100_000, every_bytes: Optional[int] = None
+    ):
+        for interval in (every_records, every_bytes):
+            if interval is not None and (not isinstance(interval, int) or interval < 1):
+                raise ValueError("intervals must be positive integers or None")
+        self.every_records = every_records
+        self.every_bytes = every_bytes
+
+    def on_progress(self, progress: LoadProgress) -> None:
+        """Called every `every_records` records or `every_bytes` bytes and
+        when loading stops at a record that fails validation"""
+
+    def on_finish(self, progress: LoadProgress) -> None:
+        """Called once the whole file was loaded, by default calls
+        `on_progress`"""
+        self.on_progress(progress)
+
+
+class ProgressTracker:
+    """Tracks a single pass over a fastq file and notifies the observers.
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+    compression : Optional[str]
+        compression of the file, used for estimating the decompressed size
+    observers : Iterable[LoadObserver]
+        observers that are notified
+    """
+
+    def __init__(
+        self,
+        fpath: Path,
+        compression: Optional[str],
+        observers: Iterable[LoadObserver],
+    ):
+        self.fpath = fpath
+        self.observers = list(observers)
+        self.n_records = 0
+        self.n_bytes = 0
+        self.failed = False
+
+        self.expected_bytes = 0
+        if len(self.observers) > 0:
+            self.expected_bytes = fpath.stat().st_size
+            if compression is not None:
+                self.expected_bytes *= COMPRESSION_RATIO
+
+        # records and bytes of the last notification of each observer
+        self.__notified = [(0, 0)] * len(self.observers)
+        self.__start = time.perf_counter()
+
+    def update(self, n_records: int, n_bytes: int) -> None:
+        """Adds a loaded block and notifies the observers whose interval
+        has passed"""
+        self.n_records += n_records
+        self.n_bytes += n_bytes
+        for i, observer in enumerate(self.observers):
+            last_records, last_bytes = self.__notified[i]
+            if _passed(observer.every_records, self.n_records - last_records) or (
+                _passed(observer.every_bytes, self.n_bytes - last_bytes)
+            ):
+                self.__notified[i] = (self.n_records, self.n_bytes)
+                observer.on_progress(self.progress())
+
+    def fail(self) -> None:
+        """Marks the pass as stopped at an invalid record and notifies all
+        observers"""
+        self.failed = True
+        for observer in self.observers:
+            observer.on_progress(self.progress())
+
+    def finish(self) -> None:
+        """Notifies all observers that the whole file was loaded"""
+        for observer in self.observers:
+            observer.on_finish(self.progress(finished=True))
+
+    def progress(self, finished: bool = False) -> LoadProgress:
+        """Returns the current progress"""
+        return LoadProgress(
+            fpath=self.fpath,
+            n_records=self.n_records,
+            n_bytes=self.n_bytes,
+            elapsed=time.perf_counter() - self.__start,
+            expected_bytes=self.expected_bytes,
+            finished=finished,
+            failed=self.failed,
+        )
+
+
+class ProgressBar(LoadObserver):
+    """Shows a single line progress bar with the number of records, the
+    throughput and the estimated time left.
+
+    Parameters
+    ----------
+    stream : TextIO, optional
+        output stream, by default sys.stderr
+    width : int, optional
+        number of characters of the bar, by default 30
+    every_records : Optional[int], optional
+        updates the bar every `every_records` records, by default 100_000
+    every_bytes : Optional[int], optional
+        updates the bar every `every_bytes` bytes, by default None
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        width: int = 30,
+        every_records: Optional[int] = 100_000,
+        every_bytes: Optional[int] = None,
+    ):
+        super().__init__(every_records, every_bytes)
+        self.stream = stream if stream is not None else sys.stderr
+        self.width = width
+
+    def on_progress(self, progress: LoadProgress) -> None:
+        self.stream.write("\r" + format_progress(progress, self.width))
+        self.stream.flush()
+
+    def on_finish(self, progress: LoadProgress) -> None:
+        self.on_progress(progress)
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class PrometheusTextfile(LoadObserver):
+    """Writes the loading metrics in the Prometheus text format. The file is
+    replaced atomically, so the node exporter textfile collector never reads
+    a partial file. Metrics are labelled by the fastq file name.
+
+    Parameters
+    ----------
+    fpath : Union[str, Path]
+        metrics file path, the collector only reads files ending with '.prom'
+    prefix : str, optional
+        prefix of the metric names, by default "smartdada2"
+    every_records : Optional[int], optional
+        writes the metrics every `every_records` records, by default 1_000_000
+    every_bytes : Optional[int], optional
+        writes the metrics every `every_bytes` bytes, by default None
+    """
+
+    def __init__(
+        self,
+        fpath: Union[str, Path],
+        prefix: str = "smartdada2",
+        every_records: Optional[int] = 1_000_000,
+        every_bytes: Optional[int] = None,
+    ):
+        super().__init__(every_records, every_bytes)
+        self.fpath = Path(fpath)
+        self.prefix = prefix
+
+    def on_progress(self, progress: LoadProgress) -> None:
+        partial = self.fpath.with_name(f".{self.fpath.name}.{os.getpid()}.tmp")
+        with open(partial, "w") as f:
+            f.write(format_prometheus(progress, self.prefix))
+        os.replace(partial, self.fpath)
+
+
+def format_progress(progress: LoadProgress, width: int = 30) -> str:
+    """Formats the progress as a single line progress bar
+
+    Parameters
+    ----------
+    progress : LoadProgress
+        progress of the pass
+    width : int, optional
+        number of characters of the bar, by default 30
+
+    Returns
+    -------
+    str
+        progress bar line
+    """
+    filled = int(progress.fraction * width)
+    eta = "--:--:--" if progress.eta is None else _format_seconds(progress.eta)
+    mb_per_s = progress.n_bytes / max(progress.elapsed, 1e-9) / 1024**2
+    line = (
+        f"[{'#' * filled}{'.' * (width - filled)}] {progress.fraction:6.1%} "
+        f"{progress.n_records:,} reads {mb_per_s:.1f} MB/s ETA {eta}"
+    )
+    if progress.failed:
+        line += " (failed)"
+    return line
+
+
+def format_prometheus(progress: LoadProgress, prefix: str = "smartdada2") -> str:
+    """Formats the progress as Prometheus metrics
+
+    Parameters
+    ----------
+    progress : LoadProgress
+        progress of the pass
+    prefix : str, optional
+        prefix of the metric names, by default "smartdada2"
+
+    Returns
+    -------
+    str
+        metrics in the Prometheus text format
+    """
+    label = str(progress.fpath.name).replace("\\", "\\\\").replace('"', '\\"')
+    metrics = [
+        ("reads_loaded", "counter", "Number of loaded reads", progress.n_records),
+        ("bytes_loaded", "counter", "Number of loaded bytes", progress.n_bytes),
+        ("load_elapsed_seconds", "gauge", "Seconds since the start", progress.elapsed),
+        (
+            "load_progress_ratio",
+            "gauge",
+            "Estimated loaded fraction",
+            progress.fraction,
+        ),
+        ("load_finished", "gauge", "1 if the file was loaded", int(progress.finished)),
+        (
+            "load_failed",
+            "gauge",
+            "1 if loading stopped at a read that failed validation",
+            int(progress.failed),
+        ),
+    ]
+
+    lines = []
+    for name, kind, description, value in metrics:
+        name = f"{prefix}_{name}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f'{name}{{file="{label}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def _passed(interval: Optional[int], amount: int) -> bool:
+    """Checks if an interval has passed"""
+    return interval is not None and amount >= interval
+
+
+def _format_seconds(seconds: float) -> str:
+    """Formats seconds as H:MM:SS"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,140 @@
+"""
+Module contains the ragged (variable length) representation of reads.
+
+A RaggedArray stores the values of all reads back to back in a single flat
+array with CSR-style offsets: read i spans values[offsets[i]:offsets[i + 1]].
+Memory usage is proportional to the number of bases that were read, no
+matter how much the read lengths vary, and per position statistics are
+computed over the reads that actually reach each position.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from smartdada2.reader.accumulator import position_coverage
+
+
+@dataclass
+class RaggedArray:
+    """Contains variable length rows stored as a flat array and offsets
+
+    Attributes
+    ----------
+    values : np.ndarray
+        (n_values,) values of all rows stored back to back
+    offsets : np.ndarray
+        (n_rows + 1,) int64 offsets, row i spans
+        values[offsets[i]:offsets[i + 1]]
+    """
+
+    values: np.ndarray
+    offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("row index out of range")
+        return self.values[self.offsets[idx] : self.offsets[idx + 1]]  # noqa
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Returns the length of each row"""
+        return np.diff(self.offsets)
+
+    @property
+    def width(self) -> int:
+        """Returns the length of the longest row"""
+        return int(self.lengths.max()) if len(self) > 0 else 0
+
+    @classmethod
+    def from_padded(cls, matrix: np.ndarray, lengths: np.ndarray) -> "RaggedArray":
+        """Creates a RaggedArray from a padded matrix and row lengths
+
+        Parameters
+        ----------
+        matrix : np.ndarray
+            (n_rows, width) padded matrix
+        lengths : np.ndarray
+            (n_rows,) length of each row
+
+        Returns
+        -------
+        RaggedArray
+            rows without padding
+        """
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        # boolean indexing selects the values of each row in row order
+        mask = np.arange(matrix.shape[1]) < np.asarray(lengths)[:, None]
+        return cls(values=matrix[mask], offsets=offsets)
+
+    @classmethod
+    def concat(cls, arrays: List["RaggedArray"], dtype=np.uint8) -> "RaggedArray":
+        """Concatenates the rows of multiple RaggedArrays
+
+        Parameters
+        ----------
+        arrays : List[RaggedArray]
+            arrays to concatenate
+        dtype : optional
+            data type of an empty result, by default np.uint8
+
+        Returns
+        -------
+        RaggedArray
+            all rows in order
+        """
+        if len(arrays) == 0:
+            return cls(
+                values=np.zeros(0, dtype=dtype), offsets=np.zeros(1, dtype=np.int64)
+            )
+
+        lengths = np.concatenate([array.lengths for array in arrays])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.concatenate([array.values for array in arrays])
+        return cls(values=values, offsets=offsets)
+
+    def to_padded(self, fill: Optional[float] = 0, dtype=None) -> np.ndarray:
+        """Converts the rows into a padded (n_rows, width) matrix
+
+        Parameters
+        ----------
+        fill : Optional[float], optional
+            value of positions beyond the length of a row, by default 0
+        dtype : optional
+            data type of the matrix, by default the type of the values
+
+        Returns
+        -------
+        np.ndarray
+            padded matrix
+        """
+        dtype = self.values.dtype if dtype is None else dtype
+        matrix = np.full((len(self), self.width), fill, dtype=dtype)
+        matrix[np.arange(self.width) < self.lengths[:, None]] = self.values
+        return matrix
+
+    def positions(self) -> np.ndarray:
+        """Returns the position (column) of each value within its row"""
+        row_starts = np.repeat(self.offsets[:-1], self.lengths)
+        return np.arange(len(self.values)) - row_starts
+
+    def coverage(self) -> np.ndarray:
+        """Returns the number of rows that reach each position"""
+        return position_coverage(self.lengths, self.width)
+
+    def position_sums(self) -> np.ndarray:
+        """Returns the sum of the values at each position"""
+        return np.bincount(self.positions(), weights=self.values, minlength=self.width)
+
+    def position_means(self) -> np.ndarray:
+        """Returns the average value at each position, only taken over the
+        rows that reach the position"""
+        return self.position_sums() / np.maximum(self.coverage(), 1)
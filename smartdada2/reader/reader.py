@@ -1,4 +1,3 @@
-import itertools
 import warnings
 from dataclasses import dataclass
 from pathlib import Path
@@ -7,17 +6,52 @@ from typing import Any, Iterable, List, Optional, Union
 import numpy as np
 import pandas as pd
 
+from smartdada2.common.constants import (  # noqa: F401
+    ALL_DNA,
+    AMB_DNA,
+    ASCII_SCORES,
+    DNA,
+    NUMERICAL_SCORES,
+)
 from smartdada2.common.errors import FastqFormatError
-
-# constants
-DNA = list("ATCGU")
-AMB_DNA = list("NRYKMSWBDHV")
-ALL_DNA = DNA + AMB_DNA
-ASCII_SCORES = [chr(i) for i in range(33, 70 + 1)]
-NUMERICAL_SCORES = list(range(33, 70 + 1))
-
-
-@dataclass
+from smartdada2.reader.batch import (
+    VALIDATION_MODES,
+    FastqBatch,
+    concat_arrays,
+    parse_records,
+    stack_padded,
+)
+from smartdada2.reader.cache import (
+    COLUMN_TASKS,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_DISK_CACHE_SIZE,
+    PROFILE_TASKS,
+    DiskCache,
+    QualityBatch,
+    QualityColumns,
+    ResultCache,
+    file_identity,
+    profile_result,
+)
+from smartdada2.reader.compression import detect_compression, is_supported_path
+from smartdada2.reader.convergence import ConvergedProfile, collect_converged
+from smartdada2.reader.index import RecordIndex, load_or_build_index
+from smartdada2.reader.packed import PackedSequences
+from smartdada2.reader.phred import ee_matrix, phred_to_ee
+from smartdada2.reader.profile import SampleProfile
+from smartdada2.reader.progress import LoadObserver, ProgressTracker
+from smartdada2.reader.ragged import RaggedArray
+from smartdada2.reader.sampling import sample_blocks
+from smartdada2.reader.shards import (
+    TASKS,
+    collect_ragged_scores,
+    map_shards,
+    merge_partials,
+)
+from smartdada2.reader.sources import BACKENDS, iter_mmap_blocks, iter_text_blocks
+
+
+@dataclass(slots=True)
 class FastqEntry:
     """Contains the contents of a single read as a FastqEntry"""
 
@@ -60,6 +94,61 @@ class FastqEntry:
         self.seq = self.seq.upper()
 
 
+class CompactFastqEntry(FastqEntry):
+    """Read-only FastqEntry that only stores the raw record bytes (header,
+    sequence and quality lines joined by newlines) and the end of the header.
+    The header, sequence, scores and direction are decoded on access, which
+    keeps large collections of entries (e.g. subsamples) small and fast to
+    build. Entries are equal to FastqEntries with the same contents.
+
+    Records are created from already validated FastqBatches, therefore the
+    header and direction are not checked again and the sequence and quality
+    lines have the same length.
+    """
+
+    __slots__ = ("_record", "_header_end")
+
+    def __init__(self, record: bytes):
+        self._record = record
+        self._header_end = record.index(b"\n")
+
+    def __reduce__(self):
+        return (self.__class__, (self._record,))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FastqEntry):
+            return NotImplemented
+        return _entry_fields(self) == _entry_fields(other)
+
+    @property
+    def header(self) -> str:
+        return self._record[: self._header_end].decode()
+
+    @property
+    def seq(self) -> str:
+        start = self._header_end + 1
+        return self._record[start : start + self.length].decode().upper()  # noqa
+
+    @property
+    def scores(self) -> str:
+        return self._record[len(self._record) - self.length :].decode()  # noqa
+
+    @property
+    def length(self) -> int:
+        # header, newline, sequence, newline and scores of the same length
+        return (len(self._record) - self._header_end - 2) // 2
+
+    @property
+    def rseq(self) -> bool:
+        header = self._record[: self._header_end]
+        return header.split()[-1].split(b":")[0] == b"2"
+
+
+def _entry_fields(entry: FastqEntry) -> tuple:
+    """Returns the field values of an entry"""
+    return (entry.header, entry.seq, entry.scores, entry.length, entry.rseq)
+
+
 class FastqReader:
     """
     FastqReader is an efficient Fastq file reader that optimizes for memory
@@ -79,6 +168,14 @@ class FastqReader:
         reverse_seq: Optional[bool] = False,
         technology: Optional[str] = "illumina",
         scale: Optional[str | None] = None,
+        backend: Optional[str] = "text",
+        index: Optional[bool] = False,
+        n_workers: Optional[int] = 1,
+        validate: Optional[str] = "full",
+        cache_size: Optional[int] = DEFAULT_CACHE_SIZE,
+        observers: Optional[list[LoadObserver]] = None,
+        cache_dir: Optional[str] = None,
+        disk_cache_size: Optional[int] = DEFAULT_DISK_CACHE_SIZE,
     ):
         # FastqReader accessible parameters
         self.fpath: Path = Path(fpath)
@@ -93,9 +190,100 @@ class FastqReader:
             print(f"scaling reads to {scale}")
             self.scale = scale
 
+        # parsing backend: "text" iterates lines, "mmap" memory maps the file
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, provided: {backend}")
+        self.backend: str = backend
+        self.compression: Optional[str] = detect_compression(self.fpath)
+
+        # uses a sidecar record offset index (.fqi) for random access
+        self.index: bool = index
+
+        # number of processes used for parsing and aggregating byte ranges
+        # (shards) of the file in parallel
+        if not isinstance(n_workers, int) or n_workers < 1:
+            raise ValueError("n_workers must be a positive integer")
+        self.n_workers: int = n_workers
+
+        # record validation: "full" checks sequence and quality characters,
+        # "fast" only checks sequence characters, "off" skips validation
+        if validate not in VALIDATION_MODES:
+            raise ValueError(
+                f"validate must be one of {VALIDATION_MODES}, provided: {validate}"
+            )
+        self.validate: str = validate
+
+        # derived results are cached in memory up to cache_size bytes and
+        # keyed by the file identity (path, size, mtime) and the settings
+        self.__cache: ResultCache = ResultCache(cache_size)
+
+        # opt-in disk cache of the parsed quality scores (see
+        # `smartdada2.reader.cache.DiskCache`), entries are shared between
+        # readers and runs of files with the same contents
+        self.disk_cache: Optional[DiskCache] = None
+        if cache_dir is not None:
+            self.disk_cache = DiskCache(cache_dir, disk_cache_size)
+        self.__columns: Optional[tuple] = None
+
+        # observers are notified about the progress of every pass over the
+        # file (see `smartdada2.reader.progress`), passes of worker processes
+        # are not observed
+        self.observers: list[LoadObserver] = list(observers or [])
+
+        # running totals of the reads and (uncompressed) bytes loaded from the
+        # file, cached results and worker processes are not counted
+        self.n_reads_loaded: int = 0
+        self.n_bytes_loaded: int = 0
+
         # states
         self.__n_entries: Optional[int] = 0
         self.__counted: bool = False
+        self.__index: Optional[RecordIndex] = None
+
+    def __iter__(self) -> Iterable[FastqEntry]:
+        """Iterates all reads in a single pass, same as `iter_reads()`"""
+        return self.iter_reads()
+
+    def __getitem__(self, idx: int) -> FastqEntry:
+        """Returns a single read by its position within the fastq file. The
+        read is obtained by seeking straight to the record with the record
+        index. Readers without a sidecar index (`index=False`) build the
+        index in memory on first use. Compressed files are scanned from the
+        start.
+
+        Parameters
+        ----------
+        idx : int
+            position of the read, negative values count from the last read
+
+        Returns
+        -------
+        FastqEntry
+            read at the given position
+
+        Raises
+        ------
+        TypeError
+            Raised if idx is not an integer
+        IndexError
+            Raised if idx is out of range
+        """
+        if not isinstance(idx, int) or isinstance(idx, bool):
+            raise TypeError("read index must be an integer")
+        record_index = self.__random_access_index()
+        n_reads = len(record_index) if record_index is not None else None
+        if idx < 0:
+            idx += n_reads if n_reads is not None else self.total_reads()
+        if idx < 0:
+            raise IndexError("read index out of range")
+
+        if record_index is not None:
+            reads = list(self.__indexed_slice(record_index, idx, idx + 1))
+        else:
+            reads = list(self.__slice((idx, idx + 1)))
+        if len(reads) == 0:
+            raise IndexError("read index out of range")
+        return reads[0]
 
     def get_quality_scores(self) -> pd.DataFrame:
         """Returns scores in a per sequence bases
@@ -106,24 +294,31 @@ class FastqReader:
             DataFrame containing quality scores per sequence
         """
 
-        # converting to np.array
-        all_scores = []
-        for entry in self.iter_reads():
-            phred_scores = list(entry.scores)
-            scores = np.array(phred_scores).view(np.int32) - 33
-            all_scores.append(scores)
+        # collecting score matrices from all batches
+        scores, lengths = self.__collect("scores")
+        return scores_to_frame(scores, lengths)
 
-        return pd.DataFrame(data=all_scores)
-
-    def get_average_score(self) -> pd.Series:
+    def get_average_score(self, streaming: Optional[bool] = True) -> pd.Series:
         """Returns average score of all sequences. Returns a a pd.Series object
 
+        Parameters
+        ----------
+        streaming : bool, optional
+            If True, the averages are calculated in a single pass with running
+            sums and counts per position, memory usage stays constant
+            regardless of the number of reads. If False, all quality scores
+            are loaded into a DataFrame before taking the average.
+            by default True
+
         Returns
         -------
         pd.Series
             average score of all sequences
 
         """
+        # accumulate per position sums and counts batch by batch
+        if streaming is True:
+            return self.__collect("average").to_frame()
 
         # get all scores df and take the average per column basis
         scores_df = self.get_quality_scores()
@@ -131,6 +326,68 @@ class FastqReader:
         average_score.columns = ["Position", "AverageQualityScore"]
         return average_score
 
+    def get_position_coverage(self) -> pd.DataFrame:
+        """Returns the number of reads that reach each position. Averages per
+        position are only taken over these reads.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with "Position" and "Coverage" columns
+        """
+        counts = self.__collect("average").counts
+        return pd.DataFrame({"Position": np.arange(len(counts)), "Coverage": counts})
+
+    def get_ragged_scores(self) -> RaggedArray:
+        """Returns the phred scores of all reads as a RaggedArray (flat uint8
+        array and offsets). Unlike `get_quality_scores()`, reads of different
+        lengths are not padded, memory usage is proportional to the number
+        of bases.
+
+        Returns
+        -------
+        RaggedArray
+            phred scores of all reads
+        """
+        return self.__collect("ragged_scores")
+
+    def get_quality_columns(self) -> QualityColumns:
+        """Returns the profile and the phred scores (without padding) of all
+        reads, collected within a single pass or loaded from the disk cache.
+        Results that depend on the profile (e.g. trimming windows) are
+        computed from the columns without reading the file again.
+
+        Returns
+        -------
+        QualityColumns
+            profile and phred scores of all reads
+        """
+        return self.__collect("columns")
+
+    def get_ragged_sequences(self) -> RaggedArray:
+        """Returns the sequences of all reads as a RaggedArray of upper case
+        ASCII nucleotides (uint8)
+
+        Returns
+        -------
+        RaggedArray
+            sequences of all reads
+        """
+        return self.__collect("ragged_seqs")
+
+    def get_packed_sequences(self) -> PackedSequences:
+        """Returns the sequences of all reads as 2-bit packed bases (about a
+        quarter of a byte per base). Ambiguous nucleotides and U are stored
+        separately as sparse positions. Use `to_strings()` or `to_padded()`
+        to unpack the sequences.
+
+        Returns
+        -------
+        PackedSequences
+            sequences of all reads
+        """
+        return self.__collect("packed_seqs")
+
     def get_expected_error(self) -> pd.DataFrame:
         """Calculates average expected error per nucleotide
 
@@ -143,8 +400,8 @@ class FastqReader:
         scores_df = self.get_average_score()
 
         # convert quality score values into expected errors values
-        scores_df["AverageExpectedError"] = scores_df["AverageQualityScore"].apply(
-            lambda score: 10 ** (-score / 10)
+        scores_df["AverageExpectedError"] = phred_to_ee(
+            scores_df["AverageQualityScore"].to_numpy()
         )
         return scores_df.drop(columns="AverageQualityScore")
 
@@ -160,8 +417,16 @@ class FastqReader:
             scores in within each sequence.
         """
         # quality scores
-        qual_scores_df = self.get_quality_scores()
-        return qual_scores_df.apply(lambda row: 10 ** (-row / 10), axis=1)
+        scores, lengths = self.__collect("scores")
+        if len(scores) == 0:
+            return pd.DataFrame()
+
+        # convert quality scores into expected errors, reads with different
+        # lengths are NaN padded
+        ee_scores = ee_matrix(
+            stack_padded(scores), concat_arrays(lengths, np.int64), fill=np.nan
+        )
+        return pd.DataFrame(data=ee_scores)
 
     def get_max_seq_ee(self) -> pd.Series:
         """Creates a pandas dataframe object that contains the sum of expected
@@ -174,16 +439,12 @@ class FastqReader:
             A two column dataframe that contains "direction" and "total_error"
         """
 
-        # creates a base dataframe for calculating expected errors
-        expected_error_df = self.__base_max_ee_df()
-
-        # get raw expected error scores
-        raw_scores = self.get_seq_ee_errors()
+        # sum of all expected error scores per read
+        lengths, directions, max_ee = self.__collect("max_ee")
 
-        # sum of all expected error scores
-        expected_error_df["max_ee"] = raw_scores.apply(
-            lambda row: np.round(np.sum(row), 2), axis=1
-        )
+        # creates a base dataframe for calculating expected errors
+        expected_error_df = base_ee_frame([lengths], [directions])
+        expected_error_df["max_ee"] = max_ee
 
         # rearranging columns
         expected_error_df = expected_error_df[["length", "direction", "max_ee"]]
@@ -210,12 +471,27 @@ class FastqReader:
         # return expected_error_df[["length", "direction", "avg_ee"]]
         return expected_error_df[["length", "avg_ee"]]
 
-    def sequence_df(self) -> pd.DataFrame:
+    def sequence_df(self, encoded: bool = False) -> pd.DataFrame:
         """
         Returns a Dataframe structure of sequence reads. Row represents a
-        sequence and the columns represents the individual nucleotides
+        sequence and the columns represents the individual nucleotides.
+        Reads shorter than the longest read are NaN padded.
+
+        Parameters
+        ----------
+        encoded : bool, optional
+            if True, nucleotides are uint8 ASCII codes padded with 0 (1 byte
+            per base instead of a python string), by default False
+
+        Returns
+        -------
+        pd.DataFrame
+            nucleotides of all reads
         """
-        return pd.DataFrame(data=(list(entry.seq) for entry in self.iter_reads()))
+        packed = self.get_packed_sequences()
+        if encoded:
+            return pd.DataFrame(data=packed.to_padded())
+        return pd.DataFrame(data=packed.to_characters(), dtype=object)
 
     def ambiguous_nucleotide_counts(self) -> pd.DataFrame:
         """Counts all ambiguous nucleotides in all reads.
@@ -226,12 +502,103 @@ class FastqReader:
             DataFrame that contains the nucleotide position and the number
             of ambiguous nucleotides
         """
-        seq_df = self.sequence_df()
-        ambi_nuc_counts = (
-            seq_df.apply(search_ambiguous_nucleotide).to_frame().reset_index()
+        # ambiguous nucleotides are within the sparse (unpacked) bases
+        counts = self.get_packed_sequences().ambiguous_counts()
+        return pd.DataFrame(
+            {"Position": np.arange(len(counts)), "AmbiguousCounts": counts}
+        )
+
+    def profile(self, trim: Optional[tuple[int, int]] = None) -> SampleProfile:
+        """Reads the file once and collects all statistics used for selecting
+        trimming parameters: per position average quality scores, expected
+        errors and ambiguous nucleotide counts, and per read lengths,
+        directions and sum of expected errors.
+
+        Parameters
+        ----------
+        trim : Optional[tuple[int, int]], optional
+            trimming window (left, right). If provided, the sum of expected
+            errors between the trimming positions of each read is collected
+            as well, by default None
+
+        Returns
+        -------
+        SampleProfile
+            statistics of all reads
+
+        Raises
+        ------
+        TypeError
+            Raised if trim does not contain two integers
+        ValueError
+            Raised if the left position is larger than the right position
+        """
+        if trim is not None:
+            if not isinstance(trim, (tuple, list)) or len(trim) != 2:
+                raise TypeError("trim must contain two values (left, right)")
+            elif not all(isinstance(value, int) for value in trim):
+                raise TypeError("trim values must be integers")
+            elif trim[0] > trim[1]:
+                raise ValueError("left trim position cannot be larger than right")
+            trim = tuple(trim)
+        return self.__collect("profile", trim=trim)
+
+    def estimate_quality(
+        self,
+        tolerance: float = 0.1,
+        confidence: float = 0.95,
+        ee_tolerance: Optional[float] = None,
+        min_reads: int = 10_000,
+        min_fraction: float = 0.01,
+        batch_size: int = 10_000,
+    ) -> ConvergedProfile:
+        """Estimates the average quality score (and its expected error) per
+        position from the first reads of the file. Reading stops once the
+        confidence interval of every position is within the tolerance.
+
+        Parameters
+        ----------
+        tolerance : float, optional
+            max half width of the confidence intervals of the average quality
+            scores (phred), by default 0.1
+        confidence : float, optional
+            confidence level of the intervals, by default 0.95
+        ee_tolerance : Optional[float], optional
+            max half width of the confidence intervals of the expected
+            errors, by default None (not checked)
+        min_reads : int, optional
+            min number of reads before checking for convergence,
+            by default 10_000
+        min_fraction : float, optional
+            positions covered by a smaller fraction of reads are not required
+            to converge, by default 0.01
+        batch_size : int, optional
+            number of reads between convergence checks, by default 10_000
+
+        Returns
+        -------
+        ConvergedProfile
+            estimates, confidence intervals and the number of reads used
+
+        Raises
+        ------
+        ValueError
+            Raised if the tolerances are not positive or the confidence is not
+            between 0 and 1
+        """
+        if tolerance <= 0 or (ee_tolerance is not None and ee_tolerance <= 0):
+            raise ValueError("tolerance must be larger than 0")
+        elif not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+
+        return collect_converged(
+            self.iter_batches(batch_size),
+            tolerance=tolerance,
+            confidence=confidence,
+            ee_tolerance=ee_tolerance,
+            min_reads=min_reads,
+            min_fraction=min_fraction,
         )
-        ambi_nuc_counts.columns = ["Position", "AmbiguousCounts"]
-        return ambi_nuc_counts
 
     def total_reads(self) -> int:
         """Returns total number of reads. Changes the value of self.n_entries
@@ -242,6 +609,12 @@ class FastqReader:
         int
             total number of reads
         """
+        # indexed files already contain the number of records
+        record_index = self.__get_index()
+        if record_index is not None:
+            self.__n_entries = len(record_index)
+            self.__counted = True
+
         # checks if the n_entries have been counted before
         # -- if not, count and return value
         # -- if yes, return stored count
@@ -290,9 +663,11 @@ class FastqReader:
                 yield read
 
     def reservoir_sampling(
-        self, n_samples: int, seed: Optional[bool] = None
+        self, n_samples: int, seed: Optional[int] = None
     ) -> list[FastqEntry]:
-        """Generates a uniform random subset sample of FastqEntry.
+        """Generates a uniform random subset sample of FastqEntry within a
+        single pass over the file (Algorithm L). Skipped reads are counted
+        but not parsed, therefore only the sampled reads are validated.
 
         Parameters
         ----------
@@ -304,7 +679,15 @@ class FastqReader:
         Returns
         -------
         list[FastqEntry]
-            subset of FastqEntry objects
+            subset of FastqEntry objects, stored as CompactFastqEntry objects
+
+        Raises
+        ------
+        ValueError
+            Raised if the seed is not an integer, the sample size is not a
+            non negative integer or larger than the (counted) number of entries
+        StopIteration
+            Raised if the sample size exceeds the number of entries
         """
 
         # type checking
@@ -312,48 +695,46 @@ class FastqReader:
             raise ValueError(
                 f"seed value must be an integer type, provided: {type(seed)}"
             )
-
-        # set a results array and have elements inside as place holders
-        # -- seen is equals to n_samples because those elements make up the
-        # -- results array
-        seen = n_samples
-        subset_reads = []
-
-        # populating results array with FastqEntry objects as place holders
-
-        # -- checking if number of entries have counted before
-        # -- -- if yes, set slice of FastqEntries as placeholders
-        if self.__counted is True:
-            if self.__n_entries < n_samples:
-                raise ValueError(
-                    "requested sample size is larger than number of entries"
+        if not isinstance(n_samples, int) or n_samples < 0:
+            raise ValueError("sample size must be a non negative integer")
+        if self.__counted is True and self.__n_entries < n_samples:
+            raise ValueError("requested sample size is larger than number of entries")
+        self.__check_file()
+        if n_samples == 0:
+            return []
+
+        # reservoir slots are filled by the first reads and replaced by the
+        # -- selected reads, only the selected reads are parsed
+        rng = np.random.default_rng(seed)
+        subset_reads: list[Optional[FastqEntry]] = [None] * n_samples
+        entry_count, loaded_bytes = 0, self.n_bytes_loaded
+        tracker = ProgressTracker(self.fpath, self.compression, self.observers)
+        for n_records, selected, slots in sample_blocks(
+            self.__iter_blocks(10_000), n_samples, rng
+        ):
+            entry_count += n_records
+            self.n_reads_loaded += n_records
+            tracker.update(n_records, self.n_bytes_loaded - loaded_bytes)
+            loaded_bytes = self.n_bytes_loaded
+            if len(slots) == 0:
+                continue
+            try:
+                batch = parse_records(
+                    selected, scale=self.scale, validate=self.validate
                 )
-            else:
-                subset_reads = list(itertools.islice(self.iter_reads(), n_samples))
+            except FastqFormatError:
+                tracker.fail()
+                raise
+            for slot, entry in zip(slots.tolist(), compact_entries(batch)):
+                subset_reads[slot] = entry
 
-        else:
-            try:
-                entries = self.iter_reads()
-                subset_reads.extend(next(entries) for _ in range(n_samples))
-            except StopIteration as e:
-                raise StopIteration(
-                    "number of requested samples exceeded number of entries"
-                ) from e
-
-        # next is to update the results array
-        # -- checking if seed has been added
-        if seed is not None:
-            np.random.seed(seed)
-
-        # -- now replacing placeholders by randomly selecting values as ind
-        for entry in self.iter_reads():
-            # select random int
-            seen += 1
-            rand_int = np.random.randint(0, seen - 1)
-
-            # replace placeholders via index reassignment
-            if rand_int < n_samples:
-                subset_reads[rand_int] = entry
+        tracker.finish()
+        self.__n_entries = entry_count
+        self.__counted = True
+        if entry_count < n_samples:
+            raise StopIteration(
+                "number of requested samples exceeded number of entries"
+            )
 
         return subset_reads
 
@@ -375,6 +756,8 @@ class FastqReader:
         -------
         List[FastqEntry]
             list of FastqEntry object will be returned if full is set to False.
+            The entries are CompactFastqEntry objects that decode their
+            contents on access.
             If full is set to True, then the FastqEntry object will be fully
             unpacked and returns unstructured entry.
 
@@ -385,31 +768,131 @@ class FastqReader:
         # checking if user want list of FastqEntries or Raw Python data types
         # -- returning list of FastqEntry objects
         if full is False:
-            return list(self.iter_reads())
+            return list(self.__iter_compact_entries())
 
         elif full is True:
             all_unpacked_entries = []
-            for entry in self.iter_reads():
-                # unpack all reads
-                # -- unpacking
-                unpacked_entries = [
-                    entry.header,
-                    entry.seq,
-                    entry.scores,
-                    int(entry.length),
-                ]
-
+            for batch in self.iter_batches():
+                # unpack all reads of the batch
                 # -- converting sequence direction to string types
-                if entry.rseq is True:
-                    unpacked_entries.append("reverse")
-                else:
-                    unpacked_entries.append("forward")
-
-                # storing
-                all_unpacked_entries.append(unpacked_entries)
+                directions = np.where(batch.rseq, "reverse", "forward").tolist()
+                all_unpacked_entries.extend(
+                    [
+                        list(entry)
+                        for entry in zip(
+                            batch.headers,
+                            batch.sequences(),
+                            batch.quality_strings(),
+                            batch.lengths.tolist(),
+                            directions,
+                        )
+                    ]
+                )
 
             return all_unpacked_entries
 
+    def clear_cache(self) -> None:
+        """Removes all cached results. Results are already recomputed if the
+        file is modified, clearing is only required to release memory or if
+        the file was replaced without changing its size and modification
+        time."""
+        self.__cache.clear()
+
+    def build_index(self) -> RecordIndex:
+        """Builds (or loads) the sidecar record offset index (.fqi) of the
+        fastq file and uses it for random access. The index is only rebuilt
+        if the size or modification time of the fastq file has changed.
+
+        Returns
+        -------
+        RecordIndex
+            index containing the byte offsets of all records
+        """
+        self.__check_file()
+        if self.compression is not None:
+            raise ValueError("Compressed fastq files cannot be indexed")
+        self.index = True
+        self.__index = load_or_build_index(self.fpath)
+        return self.__index
+
+    def iter_batches(self, batch_size: int = 10_000) -> Iterable[FastqBatch]:
+        """Returns a python generator containing FastqBatches. Each batch
+        stores a block of reads as arrays (quality score matrix, sequence
+        matrix, lengths and directions) instead of one FastqEntry per read.
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            max number of reads within each batch, by default 10_000
+
+        Returns
+        -------
+        Iterable[FastqBatch]
+            Generator object containing FastqBatches
+
+        Raises
+        ------
+        ValueError
+            Raised if batch_size is not a positive integer
+        """
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.__check_file()
+
+        # parsing blocks of 4 * batch_size lines as a single batch
+        entry_count = 0
+        tracker = ProgressTracker(self.fpath, self.compression, self.observers)
+        for block in self.__iter_blocks(batch_size):
+            try:
+                batch = parse_records(block, scale=self.scale, validate=self.validate)
+            except FastqFormatError:
+                tracker.fail()
+                raise
+            if len(batch) == 0:
+                break
+
+            entry_count += len(batch)
+            self.n_reads_loaded += len(batch)
+            tracker.update(len(batch), len(block))
+            yield batch
+
+        tracker.finish()
+
+        self.__n_entries = entry_count
+        self.__counted = True
+
+    def iter_quality_batches(
+        self, batch_size: int = 10_000
+    ) -> Iterable[Union[FastqBatch, QualityBatch]]:
+        """Returns a python generator containing batches of quality scores,
+        lengths and directions (`scores`, `lengths` and `rseq` attributes).
+        If the disk cache is enabled, batches are loaded from the cache and
+        the file is only parsed (and cached) if it is not cached yet.
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            max number of reads within each batch, by default 10_000
+
+        Returns
+        -------
+        Iterable[Union[FastqBatch, QualityBatch]]
+            Generator object containing batches
+
+        Raises
+        ------
+        ValueError
+            Raised if batch_size is not a positive integer
+        """
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.__check_file()
+
+        columns = self.__load_columns()
+        if columns is not None:
+            return columns.iter_batches(batch_size)
+        return self.__caching_batches(batch_size)
+
     def iter_reads(self) -> Iterable[FastqEntry]:
         """Returns a python generator containing FastqEntries
 
@@ -495,63 +978,155 @@ class FastqReader:
             Generator object with FastqEntries
         """
 
-        if self.fpath.suffix.lower() != ".fastq":
-            raise ValueError("FastqReader only takes files '.fastq' or '.FASTQ' files")
-        elif self.fpath.stat().st_size == 0:
-            raise FastqFormatError("Fastq file contains no contents")
-
-        # iterate all row contents in fastq file and collect entries
-        entry_count = 0
-        with open(self.fpath, "r") as fastq_file:
-            contents_chunk = []
-            for row_entry in fastq_file:
-                # cleaning entries
-                if row_entry == "":
-                    continue
-
-                content = row_entry.rstrip("\n")
-                contents_chunk.append(content)
-
-                # checking if there are 4 elements in the list
-                # -- 4 lines = 1 entry
-                if len(contents_chunk) == 4:
-                    # check for valid sequences
-                    seq_check = set(contents_chunk[1]) - set(ALL_DNA)
-                    if len(seq_check) > 0:
-                        raise FastqFormatError(
-                            "File contains invalid sequence characters"
-                        )
-
-                    # check for valid ascii scores
-                    # score_check = set(contents_chunk[3]) - set(ASCII_SCORES)
-                    # if len(score_check) > 0:
-                    #     raise FastqFormatError(
-                    #         "File contains invalid score characters"
-                    #     )
-
-                    # convert into FastqEntry
-                    entry_count += 1
+        # records are parsed and validated in batches and unpacked into
+        # entries, the batches also count the entries
+        for batch in self.iter_batches():
+            yield from batch_entries(batch)
 
-                    # scaling sequence length
-                    seq_length = len(contents_chunk[1][: self.scale])
-                    if self.scale is not None:
-                        seq_length = len(contents_chunk[1])
+    def __iter_compact_entries(self) -> Iterable[CompactFastqEntry]:
+        """Streams reads as CompactFastqEntry objects built from batches"""
+        for batch in self.iter_batches():
+            yield from compact_entries(batch)
 
-                    fastq_entry = FastqEntry(
-                        header=contents_chunk[0],
-                        seq=contents_chunk[1][: self.scale],
-                        scores=contents_chunk[3][: self.scale],
-                        length=seq_length,
-                    )
+    def __check_file(self) -> None:
+        """Checks if the file can be parsed by the FastqReader
 
-                    # clear list
-                    contents_chunk = []
+        Raises
+        ------
+        ValueError
+            Raised if the file does not have a '.fastq' extension, optionally
+            followed by a compression extension
+        FastqFormatError
+            Raised if the file is empty
+        """
+        if not is_supported_path(self.fpath):
+            raise ValueError(
+                "FastqReader only takes files '.fastq' or '.FASTQ' files, "
+                "optionally compressed ('.gz', '.bgz', '.zst')"
+            )
+        elif self.fpath.stat().st_size == 0:
+            raise FastqFormatError("Fastq file contains no contents")
 
-                    # yield entry
-                    yield fastq_entry
+    def __collect(self, task: str, **options) -> Any:
+        """Parses the file and reduces all batches with the selected task (see
+        `smartdada2.reader.shards.TASKS`). If the reader uses multiple
+        workers, byte ranges of the file are reduced in parallel and merged.
+        Options are passed to the task as keyword arguments.
 
-        self.__n_entries = entry_count
-        self.__counted = True
+        Results are cached, repeated calls with an unmodified file and the
+        same settings are not parsed again.
+        """
+        self.__check_file()
+        key = (
+            *file_identity(self.fpath),
+            self.scale,
+            self.validate,
+            task,
+            tuple(sorted(options.items())),
+        )
+        result = self.__cache.get(key)
+        if result is not None:
+            return result
+
+        columns = self.__load_columns() if task in COLUMN_TASKS else None
+        if columns is not None:
+            result = columns.collect(task, **options)
+        elif self.n_workers > 1 and self.compression is None:
+            partials = map_shards(
+                task,
+                self.fpath,
+                self.n_workers,
+                self.scale,
+                validate=self.validate,
+                options=options,
+            )
+            result = merge_partials(task, partials)
+        else:
+            result = self.__collect_batches(task, options)
+
+        self.__cache.put(key, result)
+        return result
+
+    def __load_columns(self) -> Optional[QualityColumns]:
+        """Loads the columns of the file from the disk cache, None if the
+        disk cache is disabled or does not contain the file"""
+        if self.disk_cache is None:
+            return None
+
+        # columns are memory mapped once per file identity
+        identity = file_identity(self.fpath)
+        if self.__columns is None or self.__columns[0] != identity:
+            key = self.disk_cache.key(self.fpath, self.scale)
+            columns = self.disk_cache.load(key)
+            if columns is None:
+                return None
+            self.__columns = (identity, columns)
+        return self.__columns[1]
+
+    def __caching_batches(self, batch_size: int = 10_000) -> Iterable[FastqBatch]:
+        """Streams batches and writes their columns into the disk cache once
+        all batches were read. Only fully validated reads are cached."""
+        if self.disk_cache is None or self.validate != "full":
+            yield from self.iter_batches(batch_size)
+            return
+
+        writer = self.disk_cache.writer(self.disk_cache.key(self.fpath, self.scale))
+        try:
+            for batch in self.iter_batches(batch_size):
+                writer.add(batch)
+                yield batch
+        except BaseException:
+            # errors and early stops (GeneratorExit) leave no entry
+            writer.abort()
+            raise
+        writer.commit()
+
+    def __collect_batches(
+        self, task: str, options: dict, batch_size: int = 10_000
+    ) -> Any:
+        """Computes the result of a task within a single pass and writes the
+        columns into the disk cache. Results that are computed from the
+        profile alone reuse the profile of the written columns instead of
+        computing the same statistics twice."""
+        if self.disk_cache is None or self.validate != "full":
+            return TASKS[task](self.iter_batches(batch_size), **options)
+
+        trim = options.get("trim") if task == "profile" else None
+        key = self.disk_cache.key(self.fpath, self.scale)
+        writer = self.disk_cache.writer(key, trim)
+        result = None
+        try:
+            if task in PROFILE_TASKS:
+                for batch in self.iter_batches(batch_size):
+                    writer.add(batch)
+            elif task == "columns":
+                result = collect_ragged_scores(
+                    writer.add_all(self.iter_batches(batch_size))
+                )
+            else:
+                result = TASKS[task](
+                    writer.add_all(self.iter_batches(batch_size)), **options
+                )
+        except BaseException:
+            writer.abort()
+            raise
+        profile = writer.commit()
+        if task in PROFILE_TASKS:
+            return profile_result(profile, task)
+        elif task == "columns":
+            return QualityColumns(profile, result)
+        return result
+
+    def __iter_blocks(self, batch_size: int) -> Iterable[bytes]:
+        """Streams blocks of raw fastq records with the selected backend.
+        Compressed files cannot be memory mapped and are always streamed"""
+        if self.backend == "mmap" and self.compression is None:
+            blocks = iter_mmap_blocks(self.fpath, batch_size)
+        else:
+            blocks = iter_text_blocks(self.fpath, batch_size)
+        for block in blocks:
+            self.n_bytes_loaded += len(block)
+            yield block
 
     def __slice(self, range_idx: tuple[int, int]) -> Iterable[FastqEntry]:
         """ "Creates a generator of py FastqEntry object by a given range
@@ -575,6 +1150,12 @@ class FastqReader:
         # unpacking range
         start, end = range_idx
 
+        # seeking straight to the starting record with the index
+        record_index = self.__get_index()
+        if record_index is not None:
+            yield from self.__indexed_slice(record_index, start, end)
+            return
+
         # iterating reads
         for idx, read in enumerate(self.iter_reads()):
             # break the iteration if the current idx == ending idx
@@ -585,26 +1166,48 @@ class FastqReader:
             elif idx >= start and idx < end:
                 yield read
 
+    def __indexed_slice(
+        self, record_index: RecordIndex, start: int, end: int, batch_size=10_000
+    ) -> Iterable[FastqEntry]:
+        """Reads the records between start and end by seeking to their byte
+        offsets"""
+        end = min(end, len(record_index))
+        with open(self.fpath, "rb") as fastq_file:
+            for block_start in range(start, end, batch_size):
+                block_end = min(block_start + batch_size, end)
+                offset = int(record_index.offsets[block_start])
+                fastq_file.seek(offset)
+                block = fastq_file.read(int(record_index.offsets[block_end]) - offset)
+                batch = parse_records(block, scale=self.scale, validate=self.validate)
+                yield from batch_entries(batch)
+
+    def __get_index(self) -> Optional[RecordIndex]:
+        """Returns the record index if the reader uses an index. The index is
+        loaded (or built) on first use and revalidated against the file"""
+        if self.index is not True:
+            return None
+        if self.__index is None or not self.__index.is_valid_for(self.fpath):
+            self.build_index()
+        return self.__index
+
+    def __random_access_index(self) -> Optional[RecordIndex]:
+        """Returns the record index used for random access, None for
+        compressed files. Without a sidecar index the index is kept in
+        memory only"""
+        self.__check_file()
+        if self.compression is not None:
+            return None
+        record_index = self.__get_index()
+        if record_index is not None:
+            return record_index
+        if self.__index is None or not self.__index.is_valid_for(self.fpath):
+            self.__index = RecordIndex.build(self.fpath)
+        return self.__index
+
     def __base_max_ee_df(self) -> pd.DataFrame:
         """Creates a base dataframe for expected errors calculations"""
-        # create empty df
-        base_ee_df = pd.DataFrame()
-
-        # extract read direction
-        _dir = []
-        for read in self.iter_reads():
-            if read.rseq is True:
-                _dir.append("forward")
-            else:
-                _dir.append("reverse")
-
-        # add sequence direction
-        base_ee_df["direction"] = _dir
-
-        # add sequence length information
-        base_ee_df["length"] = [entry.length for entry in self.iter_reads()]
-
-        return base_ee_df
+        lengths, directions, _ = self.__collect("max_ee")
+        return base_ee_frame([lengths], [directions])
 
 
 # NOTE: Should this be in the FastqReader class or a separate function?
@@ -630,3 +1233,106 @@ def search_ambiguous_nucleotide(nucleotides: pd.Series) -> int:
     ]
 
     return count_series[found_ambiguous_nucleotide].sum()
+
+
+def batch_entries(batch: FastqBatch) -> Iterable[FastqEntry]:
+    """Unpacks a FastqBatch into FastqEntry objects
+
+    Parameters
+    ----------
+    batch : FastqBatch
+        block of reads stored as arrays
+
+    Returns
+    -------
+    Iterable[FastqEntry]
+        Generator object containing FastqEntries
+    """
+    for header, seq, scores, length in zip(
+        batch.headers,
+        batch.sequences(),
+        batch.quality_strings(),
+        batch.lengths.tolist(),
+    ):
+        yield FastqEntry(header=header, seq=seq, scores=scores, length=length)
+
+
+def compact_entries(batch: FastqBatch) -> List[CompactFastqEntry]:
+    """Unpacks a FastqBatch into CompactFastqEntry objects, which store the
+    raw record bytes instead of decoded strings
+
+    Parameters
+    ----------
+    batch : FastqBatch
+        block of reads stored as arrays
+
+    Returns
+    -------
+    List[CompactFastqEntry]
+        entries of all reads within the batch
+    """
+    return list(map(CompactFastqEntry, batch.records()))
+
+
+def base_ee_frame(
+    lengths: List[np.ndarray], directions: List[np.ndarray]
+) -> pd.DataFrame:
+    """Creates a base dataframe for expected errors calculations from batched
+    read lengths and directions
+
+    Parameters
+    ----------
+    lengths : List[np.ndarray]
+        read lengths of each batch
+    directions : List[np.ndarray]
+        read directions of each batch (True == reverse)
+
+    Returns
+    -------
+    pd.DataFrame
+        dataframe with "direction" and "length" columns
+    """
+    # create empty df
+    base_ee_df = pd.DataFrame()
+
+    # add sequence direction
+    rseq = concat_arrays(directions, dtype=bool)
+    base_ee_df["direction"] = np.where(rseq, "forward", "reverse").tolist()
+
+    # add sequence length information
+    base_ee_df["length"] = concat_arrays(lengths, dtype=np.int64)
+
+    return base_ee_df
+
+
+def scores_to_frame(
+    scores: List[np.ndarray], lengths: List[np.ndarray]
+) -> pd.DataFrame:
+    """Stacks batched quality score matrices into a single DataFrame. Row
+    represents a read and the columns represents the position. If reads are
+    of different lengths, missing positions are filled with NaN.
+
+    Parameters
+    ----------
+    scores : List[np.ndarray]
+        phred score matrices of each batch
+    lengths : List[np.ndarray]
+        read lengths of each batch
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame containing quality scores per sequence
+    """
+    if len(scores) == 0:
+        return pd.DataFrame()
+
+    # padding all matrices into the same width
+    all_scores = stack_padded(scores).astype(np.int32)
+    all_lengths = concat_arrays(lengths, dtype=np.int64)
+
+    # reads with different lengths are NaN padded
+    mask = np.arange(all_scores.shape[1]) < all_lengths[:, None]
+    if not mask.all():
+        return pd.DataFrame(data=np.where(mask, all_scores, np.nan))
+    return pd.DataFrame(data=all_scores)
@@ -0,0 +1,140 @@
+"""
+Module contains the single pass reservoir sampling of fastq records.
+
+Reads are sampled with Algorithm L (Li, 1994): after the reservoir is filled
+with the first n records, the number of records to skip before the next
+replacement is drawn from a geometric distribution. Only the replacing
+records are parsed, all skipped records are only counted by their newlines.
+Random numbers are drawn in chunks from a local numpy Generator.
+"""
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+from smartdada2.reader.batch import NEWLINE
+
+# number of replacements drawn at once
+_CHUNK_SIZE = 1024
+
+# max number of skipped records, W becomes tiny once the reservoir is small
+# compared to the number of drawn replacements and the skips overflow
+_MAX_SKIP = 2**40
+
+
+def reservoir_replacements(
+    n_samples: int, rng: np.random.Generator, chunk_size: int = _CHUNK_SIZE
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Generates the record positions that replace a reservoir entry and the
+    replaced reservoir slots (Algorithm L)
+
+    Parameters
+    ----------
+    n_samples : int
+        size of the reservoir
+    rng : np.random.Generator
+        random number generator
+    chunk_size : int, optional
+        number of replacements per chunk, by default 1024
+
+    Yields
+    ------
+    Tuple[np.ndarray, np.ndarray]
+        increasing 0-based record positions and their reservoir slots
+    """
+    log_w = 0.0
+    position = n_samples - 1
+    while True:
+        # uniform values within (0, 1], log(0) is undefined
+        u_w = 1.0 - rng.random(chunk_size)
+        u_skip = 1.0 - rng.random(chunk_size)
+        slots = rng.integers(0, n_samples, size=chunk_size)
+
+        # W_i = W_(i - 1) * u ** (1 / n)
+        log_ws = log_w + np.cumsum(np.log(u_w)) / n_samples
+        log_w = float(log_ws[-1])
+
+        # skip_i = floor(log(u) / log(1 - W_i)) records before the next one
+        with np.errstate(divide="ignore", invalid="ignore"):
+            skips = np.floor(np.log(u_skip) / np.log1p(-np.exp(log_ws)))
+        skips = np.fmin(skips, _MAX_SKIP)
+        positions = position + np.cumsum(skips.astype(np.int64) + 1)
+        position = int(positions[-1])
+        yield positions, slots
+
+
+def sample_blocks(
+    blocks: Iterable[bytes], n_samples: int, rng: np.random.Generator
+) -> Iterator[Tuple[int, bytes, np.ndarray]]:
+    """Samples records from blocks of raw fastq records. Records within a
+    block are counted by their newlines and only the selected records are
+    copied out of the block.
+
+    Parameters
+    ----------
+    blocks : Iterable[bytes]
+        blocks of complete fastq records
+    n_samples : int
+        size of the reservoir
+    rng : np.random.Generator
+        random number generator
+
+    Yields
+    ------
+    Tuple[int, bytes, np.ndarray]
+        number of records within the block, selected records (raw bytes in
+        block order) and the reservoir slot of each selected record
+    """
+    replacements = reservoir_replacements(n_samples, rng)
+    positions, slots = next(replacements)
+    offset = 0
+    for block in blocks:
+        n_lines = block.count(b"\n")
+        if len(block) > 0 and block[-1] != NEWLINE:
+            n_lines += 1
+        n_records = n_lines // 4
+        if n_records == 0:
+            break
+        end = offset + n_records
+
+        # filling the reservoir with the first records
+        fill = np.arange(offset, min(end, n_samples), dtype=np.int64)
+        selected, selected_slots = [fill - offset], [fill]
+
+        # replacements within the block, drawing more until they pass it
+        while True:
+            n_within = int(np.searchsorted(positions, end))
+            selected.append(positions[:n_within] - offset)
+            selected_slots.append(slots[:n_within])
+            if n_within < len(positions):
+                positions, slots = positions[n_within:], slots[n_within:]
+                break
+            positions, slots = next(replacements)
+
+        indices = np.concatenate(selected)
+        indices_slots = np.concatenate(selected_slots)
+
+        # a slot replaced more than once within the block keeps the last read
+        _, last = np.unique(indices_slots[::-1], return_index=True)
+        keep = np.sort(len(indices) - 1 - last)
+        yield n_records, _select_records(block, indices[keep]), indices_slots[keep]
+        offset = end
+
+
+def _select_records(block: bytes, indices: np.ndarray) -> bytes:
+    """Copies the records at the selected (increasing) indices of a block"""
+    if len(indices) == 0:
+        return b""
+
+    # a record spans from the end of the previous 4th line to its 4th line
+    line_ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == NEWLINE)
+    record_ends = np.append(line_ends[3::4] + 1, len(block))
+    record_starts = np.append(0, record_ends[:-1])
+
+    # -- the last record of the block might not end with a newline, it is
+    # -- always the last selected record
+    return b"".join(
+        block[start:end]
+        for start, end in zip(
+            record_starts[indices].tolist(), record_ends[indices].tolist()
+        )
+    )
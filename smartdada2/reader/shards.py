@@ -0,0 +1,310 @@
+"""
+Module contains the sharded (multi-core) parsing of fastq files.
+
+The file is split into byte ranges which are resynchronised to record
+boundaries. Each shard is parsed within a worker process and reduced into a
+partial result (per position sums, per read expected errors, ...). The
+partial results are returned in file order and merged by the FastqReader.
+
+The same reductions ("tasks") are used when the file is parsed within a
+single process, therefore both modes produce the same results.
+"""
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from smartdada2.reader.accumulator import QualityAccumulator
+from smartdada2.reader.batch import (
+    AMB_TABLE,
+    FastqBatch,
+    add_padded,
+    concat_arrays,
+    parse_records,
+)
+from smartdada2.reader.cache import QualityColumns
+from smartdada2.reader.packed import PackedSequences
+from smartdada2.reader.phred import read_ee_sums
+from smartdada2.reader.profile import ProfileAccumulator, SampleProfile, collect_profile
+from smartdada2.reader.ragged import RaggedArray
+from smartdada2.reader.sources import find_record_start, iter_mmap_blocks
+
+
+# ----------------------------------------
+# tasks: reductions of batches into partial results
+# ----------------------------------------
+def collect_scores(batches: Iterable[FastqBatch]) -> Tuple[list, list]:
+    """Collects the score matrices and lengths of all batches"""
+    scores, lengths = [], []
+    for batch in batches:
+        scores.append(batch.scores)
+        lengths.append(batch.lengths)
+    return scores, lengths
+
+
+def collect_average(batches: Iterable[FastqBatch]) -> QualityAccumulator:
+    """Accumulates per position quality score sums and counts"""
+    accumulator = QualityAccumulator()
+    for batch in batches:
+        accumulator.update(batch.scores, batch.lengths)
+    return accumulator
+
+
+def collect_max_ee(
+    batches: Iterable[FastqBatch],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Collects the lengths, directions and rounded sum of expected errors of
+    each read"""
+    lengths, directions, max_ee = [], [], []
+    for batch in batches:
+        ee_sums = read_ee_sums(batch.scores, batch.lengths)
+        max_ee.append(np.round(ee_sums, 2))
+        lengths.append(batch.lengths)
+        directions.append(batch.rseq)
+    return (
+        concat_arrays(lengths, np.int64),
+        concat_arrays(directions, bool),
+        concat_arrays(max_ee, np.float64),
+    )
+
+
+def collect_ambiguous(batches: Iterable[FastqBatch]) -> np.ndarray:
+    """Counts ambiguous nucleotides per position"""
+    counts = np.zeros(0, dtype=np.int64)
+    for batch in batches:
+        batch_counts = AMB_TABLE[batch.seqs].sum(axis=0, dtype=np.int64)
+        counts = add_padded(counts, batch_counts)
+    return counts
+
+
+def collect_ragged_scores(batches: Iterable[FastqBatch]) -> RaggedArray:
+    """Collects the phred scores of all reads without padding"""
+    return RaggedArray.concat(
+        [RaggedArray.from_padded(batch.scores, batch.lengths) for batch in batches]
+    )
+
+
+def collect_ragged_seqs(batches: Iterable[FastqBatch]) -> RaggedArray:
+    """Collects the sequences (ASCII) of all reads without padding"""
+    return RaggedArray.concat(
+        [RaggedArray.from_padded(batch.seqs, batch.lengths) for batch in batches]
+    )
+
+
+def collect_packed_seqs(batches: Iterable[FastqBatch]) -> PackedSequences:
+    """Collects the sequences of all reads as 2-bit packed bases"""
+    return PackedSequences.concat(
+        [PackedSequences.from_padded(batch.seqs, batch.lengths) for batch in batches]
+    )
+
+
+def collect_columns(batches: Iterable[FastqBatch]) -> QualityColumns:
+    """Collects the profile and the phred scores (without padding) of all
+    reads within a single pass"""
+    accumulator = ProfileAccumulator()
+    scores = []
+    for batch in batches:
+        accumulator.update(batch)
+        scores.append(RaggedArray.from_padded(batch.scores, batch.lengths))
+    return QualityColumns(accumulator.result(), RaggedArray.concat(scores))
+
+
+TASKS: Dict[str, Callable[..., Any]] = {
+    "scores": collect_scores,
+    "average": collect_average,
+    "max_ee": collect_max_ee,
+    "ambiguous": collect_ambiguous,
+    "profile": collect_profile,
+    "ragged_scores": collect_ragged_scores,
+    "ragged_seqs": collect_ragged_seqs,
+    "packed_seqs": collect_packed_seqs,
+    "columns": collect_columns,
+}
+
+
+# ----------------------------------------
+# merging partial results
+# ----------------------------------------
+def merge_partials(task: str, partials: List[Any]) -> Any:
+    """Merges the partial results of all shards in file order
+
+    Parameters
+    ----------
+    task : str
+        name of the task that produced the partial results
+    partials : List[Any]
+        partial results in file order
+
+    Returns
+    -------
+    Any
+        merged result, same type as the partial results
+    """
+    if task == "scores":
+        return (
+            [matrix for scores, _ in partials for matrix in scores],
+            [vector for _, lengths in partials for vector in lengths],
+        )
+    elif task == "average":
+        accumulator = QualityAccumulator()
+        for partial in partials:
+            accumulator.merge(partial)
+        return accumulator
+    elif task == "max_ee":
+        return tuple(np.concatenate(columns) for columns in zip(*partials))
+    elif task == "ambiguous":
+        counts = np.zeros(0, dtype=np.int64)
+        for partial in partials:
+            counts = add_padded(counts, partial)
+        return counts
+    elif task == "profile":
+        return SampleProfile.concat(partials)
+    elif task in ("ragged_scores", "ragged_seqs"):
+        return RaggedArray.concat(partials)
+    elif task == "packed_seqs":
+        return PackedSequences.concat(partials)
+    elif task == "columns":
+        return QualityColumns(
+            SampleProfile.concat([partial.profile for partial in partials]),
+            RaggedArray.concat([partial.scores for partial in partials]),
+        )
+    raise ValueError(f"unknown task: {task}")
+
+
+# ----------------------------------------
+# sharding
+# ----------------------------------------
+def shard_ranges(fpath: Path, n_shards: int) -> List[Tuple[int, int]]:
+    """Splits a fastq file into byte ranges that start at record boundaries
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+    n_shards : int
+        number of shards
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        (start, end) byte ranges. Ranges are contiguous and cover all records
+    """
+    size = fpath.stat().st_size
+    with open(fpath, "rb") as fastq_file:
+        with mmap.mmap(fastq_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            boundaries = [
+                find_record_start(mapped, size * idx // n_shards)
+                for idx in range(n_shards)
+            ]
+    boundaries.append(size)
+
+    # removing empty shards, boundaries might collapse on small files
+    return [
+        (start, end)
+        for start, end in zip(boundaries[:-1], boundaries[1:])
+        if end > start
+    ]
+
+
+def run_shard(
+    task: str,
+    fpath: Path,
+    byte_range: Tuple[int, int],
+    scale: Optional[int] = None,
+    batch_size: int = 10_000,
+    validate: str = "full",
+    options: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """Parses a single shard and reduces it with the selected task. This is
+    the function executed by the worker processes.
+
+    Parameters
+    ----------
+    task : str
+        name of the task
+    fpath : Path
+        path to fastq file
+    byte_range : Tuple[int, int]
+        (start, end) byte range of the shard
+    scale : Optional[int], optional
+        max length of the reads, by default None
+    batch_size : int, optional
+        number of reads per batch, by default 10_000
+    validate : str, optional
+        validation mode, by default "full"
+    options : Optional[Dict[str, Any]], optional
+        keyword arguments of the task, by default None
+
+    Returns
+    -------
+    Any
+        partial result of the task
+    """
+    start, end = byte_range
+    batches = (
+        parse_records(block, scale=scale, validate=validate)
+        for block in iter_mmap_blocks(fpath, batch_size, start=start, end=end)
+    )
+    return TASKS[task](batches, **(options or {}))
+
+
+def map_shards(
+    task: str,
+    fpath: Path,
+    n_workers: int,
+    scale: Optional[int] = None,
+    batch_size: int = 10_000,
+    validate: str = "full",
+    options: Optional[Dict[str, Any]] = None,
+) -> List[Any]:
+    """Splits a fastq file into one shard per worker and runs the task on
+    each shard within a process pool
+
+    Parameters
+    ----------
+    task : str
+        name of the task
+    fpath : Path
+        path to fastq file
+    n_workers : int
+        number of worker processes
+    scale : Optional[int], optional
+        max length of the reads, by default None
+    batch_size : int, optional
+        number of reads per batch, by default 10_000
+    validate : str, optional
+        validation mode, by default "full"
+    options : Optional[Dict[str, Any]], optional
+        keyword arguments of the task, by default None
+
+    Returns
+    -------
+    List[Any]
+        partial results in file order
+    """
+    if task not in TASKS:
+        raise ValueError(f"task must be one of {tuple(TASKS)}, provided: {task}")
+
+    ranges = shard_ranges(fpath, n_workers)
+    if len(ranges) <= 1:
+        return [
+            run_shard(task, fpath, byte_range, scale, batch_size, validate, options)
+            for byte_range in ranges
+        ]
+
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(ranges))) as pool:
+        return list(
+            pool.map(
+                run_shard,
+                repeat(task),
+                repeat(fpath),
+                ranges,
+                repeat(scale),
+                repeat(batch_size),
+                repeat(validate),
+                repeat(options),
+            )
+        )
@@ -0,0 +1,206 @@
+"""
+Module contains functions that stream blocks of complete fastq records from
+a file as raw bytes. The blocks are parsed into FastqBatches by
+`smartdada2.reader.batch.parse_records`.
+
+Backends
+--------
+text
+    iterates the lines of the file and joins every 4 * batch_size lines.
+    Compressed files are decompressed in background threads.
+mmap
+    memory maps the file and finds record boundaries by scanning the mapped
+    buffer for newlines. Repeated passes are served by the OS page cache.
+"""
+import itertools
+import mmap
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from smartdada2.common.constants import ALL_DNA
+from smartdada2.common.errors import FastqFormatError
+from smartdada2.reader.batch import NEWLINE
+from smartdada2.reader.compression import open_fastq
+
+BACKENDS = ("text", "mmap")
+
+# nucleotides used for finding the start of records
+_SEQ_CHARS = "".join(ALL_DNA).encode()
+
+# initial guess of bytes per line when searching for record boundaries
+_LINE_SIZE_GUESS = 128
+
+
+def iter_text_blocks(fpath: Path, batch_size: int) -> Iterable[bytes]:
+    """Streams blocks of `batch_size` records by iterating lines
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+    batch_size : int
+        number of records within each block
+
+    Yields
+    ------
+    bytes
+        block of complete fastq records
+    """
+    with open_fastq(fpath) as fastq_file:
+        while True:
+            lines = list(itertools.islice(fastq_file, 4 * batch_size))
+            if len(lines) == 0:
+                break
+            yield b"".join(lines)
+
+
+def iter_mmap_blocks(
+    fpath: Path, batch_size: int, start: int = 0, end: Optional[int] = None
+) -> Iterable[bytes]:
+    """Streams blocks of `batch_size` records from a memory mapped file
+
+    Parameters
+    ----------
+    fpath : Path
+        path to fastq file
+    batch_size : int
+        number of records within each block
+    start : int, optional
+        byte offset of the first record, by default 0
+    end : Optional[int], optional
+        byte offset where the records end (exclusive), by default None (end
+        of the file)
+
+    Yields
+    ------
+    bytes
+        block of complete fastq records
+    """
+    with open(fpath, "rb") as fastq_file:
+        with mmap.mmap(fastq_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = len(mapped) if end is None else min(end, len(mapped))
+            window = 4 * batch_size * _LINE_SIZE_GUESS
+            while start < end:
+                block_end, window = find_block_end(
+                    mapped, start, 4 * batch_size, window, end
+                )
+                yield mapped[start:block_end]
+                start = block_end
+
+
+def find_block_end(
+    mapped: mmap.mmap,
+    start: int,
+    n_lines: int,
+    window: int,
+    end: Optional[int] = None,
+) -> tuple[int, int]:
+    """Finds the end of the block that contains `n_lines` lines from the start
+    position by scanning for newlines. The search window doubles until enough
+    lines are found or the end is reached.
+
+    Parameters
+    ----------
+    mapped : mmap.mmap
+        memory mapped file
+    start : int
+        starting byte offset
+    n_lines : int
+        number of lines within the block
+    window : int
+        number of bytes to scan
+    end : Optional[int], optional
+        byte offset where the search stops, by default None (end of the file)
+
+    Returns
+    -------
+    tuple[int, int]
+        ending byte offset (exclusive) and the window size that was used
+    """
+    size = len(mapped) if end is None else end
+    while True:
+        count = min(window, size - start)
+        view = np.frombuffer(mapped, dtype=np.uint8, count=count, offset=start)
+        newlines = np.flatnonzero(view == NEWLINE)
+
+        # releasing the exported buffer, required before closing the mmap
+        del view
+
+        if len(newlines) >= n_lines:
+            return start + int(newlines[n_lines - 1]) + 1, window
+        elif start + count >= size:
+            return size, window
+        window *= 2
+
+
+def find_record_start(mapped: mmap.mmap, offset: int) -> int:
+    """Resynchronises a byte offset to the start of the next record.
+
+    A line is considered to be the start of a record if it begins with "@",
+    the next line only contains nucleotides, the fourth line (scores) has
+    the same length as the sequence and the next record is valid as well.
+    Quality lines may also begin with "@", however the line after a quality
+    line is a header, which never only contains nucleotides.
+
+    Parameters
+    ----------
+    mapped : mmap.mmap
+        memory mapped file
+    offset : int
+        byte offset within the file
+
+    Returns
+    -------
+    int
+        byte offset of the first record starting at or after offset. Returns
+        the size of the file if there are no records after offset.
+
+    Raises
+    ------
+    FastqFormatError
+        Raised if none of the next 4 lines is the start of a record
+    """
+    size = len(mapped)
+    if offset <= 0:
+        return 0
+
+    # moving to the start of the next line
+    line_start = mapped.find(b"\n", offset - 1) + 1
+    if line_start == 0:
+        return size
+
+    # collecting the next 3 records worth of lines
+    line_starts, lines = [], []
+    while len(lines) < 12 and line_start < size:
+        line_end = mapped.find(b"\n", line_start)
+        line_end = size if line_end == -1 else line_end
+        line_starts.append(line_start)
+        lines.append(mapped[line_start:line_end].rstrip(b"\r"))
+        line_start = line_end + 1
+
+    # checking which of the next 4 lines is a header
+    for idx in range(min(4, len(lines))):
+        if _is_record(lines, idx) and (
+            len(lines) < idx + 8 or _is_record(lines, idx + 4)
+        ):
+            return line_starts[idx]
+
+    # all 4 candidate lines were checked without finding a header
+    if len(lines) >= 8:
+        raise FastqFormatError("Unable to find the start of a record")
+    return size
+
+
+def _is_record(lines: list[bytes], idx: int) -> bool:
+    """Checks if the 4 lines starting at idx are a plausible fastq record"""
+    if len(lines) < idx + 4:
+        return False
+    header, seq, separator, scores = lines[idx : idx + 4]  # noqa
+    return (
+        header.startswith(b"@")
+        and separator[:1] == b"+"
+        and len(seq) == len(scores)
+        and len(seq.upper().translate(None, _SEQ_CHARS)) == 0
+    )
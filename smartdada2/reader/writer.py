@@ -0,0 +1,313 @@
+"""
+Module contains the buffered writing of fastq files.
+
+Records are collected into large chunks before they are written, therefore
+writing costs one system call per chunk instead of one per line. Whole
+FastqBatches are written by copying their raw record bytes.
+
+Compressed outputs ('.gz', '.bgz', '.zst') are compressed in a background
+thread so compression overlaps with parsing. zlib and zstandard release the
+GIL while compressing. '.bgz' outputs are written as BGZF blocks, which can
+be decompressed in parallel and are accepted by samtools and tabix.
+"""
+import gzip
+import queue
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional, Union
+
+import numpy as np
+
+from smartdada2.reader.batch import FastqBatch
+from smartdada2.reader.compression import (
+    BGZF_FEXTRA,
+    BGZF_HEADER,
+    CHUNK_SIZE,
+    COMPRESSION_SUFFIXES,
+)
+
+# supported output compressions
+WRITE_COMPRESSIONS = (None, "gzip", "bgzip", "zstd")
+
+# max uncompressed bytes per BGZF block, the compressed block (including
+# incompressible data) always fits within the 64 KiB block limit
+BGZF_BLOCK_SIZE = 65280
+
+# empty BGZF block marking the end of the file
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+# default compression levels, favouring speed over size
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class FastqWriter:
+    """Writes fastq records to a file in large joined chunks. Records can be
+    written as FastqEntries or as whole FastqBatches.
+
+    Parameters
+    ----------
+    fpath : Union[str, Path]
+        path to output file
+    compression : Optional[str], optional
+        "gzip", "bgzip", "zstd" or None. By default inferred from the
+        extension of the file ('.gz', '.bgz', '.zst')
+    threaded : bool, optional
+        compress the output within a background thread, by default True
+    chunk_size : int, optional
+        number of bytes collected before writing, by default 4 MiB
+
+    Raises
+    ------
+    ValueError
+        Raised if the compression is not supported
+    """
+
+    def __init__(
+        self,
+        fpath: Union[str, Path],
+        compression: Optional[str] = "infer",
+        threaded: bool = True,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.fpath = Path(fpath)
+        if compression == "infer":
+            suffix = self.fpath.suffix.lower()
+            compression = (
+                "bgzip" if suffix == ".bgz" else COMPRESSION_SUFFIXES.get(suffix)
+            )
+        if compression not in WRITE_COMPRESSIONS:
+            raise ValueError(
+                f"compression must be one of {WRITE_COMPRESSIONS}, "
+                f"provided: {compression}"
+            )
+        self.compression = compression
+        self.chunk_size = chunk_size
+
+        # number of written records and (uncompressed) bytes
+        self.n_records = 0
+        self.n_bytes = 0
+
+        self.__chunks: list[bytes] = []
+        self.__chunks_size = 0
+        stream = _open_output(self.fpath, compression)
+        if compression is not None and threaded:
+            self.__stream: Union[BinaryIO, ThreadedWriter] = ThreadedWriter(stream)
+        else:
+            self.__stream = stream
+
+    def __enter__(self) -> "FastqWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write_entry(self, entry) -> None:
+        """Writes a single FastqEntry
+
+        Parameters
+        ----------
+        entry : FastqEntry
+            read to write
+        """
+        self.write_entries((entry,))
+
+    def write_entries(self, entries: Iterable) -> None:
+        """Writes FastqEntries (or CompactFastqEntries)
+
+        Parameters
+        ----------
+        entries : Iterable[FastqEntry]
+            reads to write
+        """
+        lines = []
+        for entry in entries:
+            lines.append(f"{entry.header}\n{entry.seq}\n+\n{entry.scores}\n")
+            if len(lines) >= 10_000:
+                self.__append("".join(lines).encode(), len(lines))
+                lines = []
+        if len(lines) > 0:
+            self.__append("".join(lines).encode(), len(lines))
+
+    def write_batch(
+        self, batch: FastqBatch, select: Optional[np.ndarray] = None
+    ) -> None:
+        """Writes the reads of a FastqBatch by copying their raw bytes
+
+        Parameters
+        ----------
+        batch : FastqBatch
+            reads to write
+        select : Optional[np.ndarray], optional
+            boolean mask or indices of the reads to write, by default None
+            (all reads)
+        """
+        n_records = len(batch) if select is None else len(batch.lengths[select])
+        self.__append(batch.to_fastq(select), n_records)
+
+    def flush(self) -> None:
+        """Writes all collected records"""
+        if len(self.__chunks) > 0:
+            self.__stream.write(b"".join(self.__chunks))
+            self.__chunks = []
+            self.__chunks_size = 0
+
+    def close(self) -> None:
+        """Writes all collected records and closes the file"""
+        if self.__stream.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self.__stream.close()
+
+    def __append(self, data: bytes, n_records: int) -> None:
+        """Collects records and writes them once the chunk is full"""
+        self.__chunks.append(data)
+        self.__chunks_size += len(data)
+        self.n_records += n_records
+        self.n_bytes += len(data)
+        if self.__chunks_size >= self.chunk_size:
+            self.flush()
+
+
+class BgzfWriter:
+    """Write-only stream that compresses data into BGZF blocks. Each block is
+    an independent gzip member of at most `BGZF_BLOCK_SIZE` uncompressed
+    bytes that stores its compressed size within the "BC" extra field. An
+    empty end-of-file block is written on close.
+
+    Parameters
+    ----------
+    fpath : Path
+        path to output file
+    level : int, optional
+        compression level, by default GZIP_LEVEL
+    """
+
+    def __init__(self, fpath: Path, level: int = GZIP_LEVEL):
+        self.level = level
+        self.closed = False
+        self.__file = open(fpath, "wb")
+        self.__pending = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.__pending += data
+        n_full = len(self.__pending) // BGZF_BLOCK_SIZE * BGZF_BLOCK_SIZE
+        if n_full > 0:
+            view = memoryview(self.__pending)
+            self.__file.write(
+                b"".join(
+                    _bgzf_block(view[start : start + BGZF_BLOCK_SIZE], self.level)
+                    for start in range(0, n_full, BGZF_BLOCK_SIZE)
+                )
+            )
+            view.release()
+            del self.__pending[:n_full]
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if len(self.__pending) > 0:
+                self.__file.write(_bgzf_block(self.__pending, self.level))
+            self.__file.write(BGZF_EOF)
+        finally:
+            self.__file.close()
+
+
+class ThreadedWriter:
+    """Write-only stream that passes chunks of bytes to a background thread
+    which writes them into a (compressing) stream. The number of pending
+    chunks is bounded to limit memory usage. Errors of the background thread
+    are raised by the next write or close.
+    """
+
+    def __init__(self, stream: BinaryIO, max_pending: int = 8):
+        self.__stream = stream
+        self.__queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.__error: Optional[Exception] = None
+        self.__reported = False
+        self.closed = False
+
+        self.__thread = threading.Thread(target=self.__consume, daemon=True)
+        self.__thread.start()
+
+    def write(self, data: bytes) -> int:
+        self.__raise_error()
+        self.__queue.put(data)
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__raise_error()
+
+    def __consume(self) -> None:
+        """Writes chunks from the queue, None marks the end. After an error
+        the remaining chunks are dropped so the writer never blocks"""
+        while True:
+            chunk = self.__queue.get()
+            if chunk is None:
+                break
+            elif self.__error is None:
+                try:
+                    self.__stream.write(chunk)
+                except Exception as e:
+                    self.__error = e
+
+        try:
+            self.__stream.close()
+        except Exception as e:
+            if self.__error is None:
+                self.__error = e
+
+    def __raise_error(self) -> None:
+        """Raises an error of the background thread once within the caller"""
+        if self.__error is not None and not self.__reported:
+            self.__reported = True
+            raise self.__error
+
+
+def _open_output(fpath: Path, compression: Optional[str]) -> BinaryIO:
+    """Opens an output file as a binary stream, optionally compressing"""
+    if compression == "gzip":
+        return gzip.open(fpath, "wb", compresslevel=GZIP_LEVEL)
+    elif compression == "bgzip":
+        return BgzfWriter(fpath)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "writing '.zst' files requires the zstandard package: "
+                "pip install zstandard"
+            ) from e
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+            open(fpath, "wb"), closefd=True
+        )
+    return open(fpath, "wb")
+
+
+def _bgzf_block(data: bytes, level: int) -> bytes:
+    """Compresses data into a single BGZF block"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+
+    # header (18 bytes) + deflated data + crc32 and size (8 bytes)
+    block_size = BGZF_HEADER.size + 6 + len(deflated) + 8
+    return b"".join(
+        (
+            BGZF_HEADER.pack(31, 139, 8, BGZF_FEXTRA, 0, 0, 255, 6),
+            struct.pack("<2BHH", 66, 67, 2, block_size - 1),
+            deflated,
+            struct.pack("<2I", zlib.crc32(data), len(data)),
+        )
+    )
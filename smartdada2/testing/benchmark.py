@@ -0,0 +1,333 @@
+"""
+Benchmark suite of the FastqReader and the smartdada2 scripts.
+
+Deterministic synthetic fastq files of increasing size are generated and
+every benchmark case is timed on each file within a fresh subprocess, so
+the peak memory (RSS) of a case is not affected by the other cases. Results
+are written as JSON so runs of different commits can be compared.
+
+Usage
+-----
+python -m smartdada2.testing.benchmark --sizes 10000 100000 --out bench.json
+python -m smartdada2.testing.benchmark --cases profile get_average_score
+"""
+import argparse as arg
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import smartdada2.GetMaxEE as GME
+import smartdada2.GetPairedendFiles as GPF
+import smartdada2.GetSubsamples as GSS
+import smartdada2.GetTrimParameters as GTP
+from smartdada2.common.profiling import peak_rss_mb
+from smartdada2.reader.reader import FastqReader
+from smartdada2.testing.help_test_funcs import write_synthetic_fastq
+
+# default number of reads of the synthetic files
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+
+# cases that load every read into memory are skipped for larger files
+HEAVY_MAX_READS = 1_000_000
+
+
+# ----------------------------------------
+# benchmark cases
+# ----------------------------------------
+def _consume(iterable) -> int:
+    """Iterates all items, returns the number of items"""
+    count = 0
+    for _ in iterable:
+        count += 1
+    return count
+
+
+def _workdir_path(fpath: Path, name: str) -> str:
+    """Returns the path of an output file next to the input file"""
+    return str(fpath.parent / f"{fpath.stem}.{name}")
+
+
+CASES: Dict[str, Callable[[Path], object]] = {
+    # reader methods
+    "iter_batches": lambda fpath: _consume(FastqReader(fpath).iter_batches()),
+    "iter_reads": lambda fpath: _consume(FastqReader(fpath).iter_reads()),
+    "total_reads": lambda fpath: FastqReader(fpath).total_reads(),
+    "get_quality_scores": lambda fpath: FastqReader(fpath).get_quality_scores(),
+    "get_average_score": lambda fpath: FastqReader(fpath).get_average_score(),
+    "get_position_coverage": lambda fpath: FastqReader(fpath).get_position_coverage(),
+    "get_ragged_scores": lambda fpath: FastqReader(fpath).get_ragged_scores(),
+    "get_ragged_sequences": lambda fpath: FastqReader(fpath).get_ragged_sequences(),
+    "get_packed_sequences": lambda fpath: FastqReader(fpath).get_packed_sequences(),
+    "get_expected_error": lambda fpath: FastqReader(fpath).get_expected_error(),
+    "get_seq_ee_errors": lambda fpath: FastqReader(fpath).get_seq_ee_errors(),
+    "get_max_seq_ee": lambda fpath: FastqReader(fpath).get_max_seq_ee(),
+    "get_avg_seq_ee": lambda fpath: FastqReader(fpath).get_avg_seq_ee(),
+    "sequence_df": lambda fpath: FastqReader(fpath).sequence_df(),
+    "ambiguous_nucleotide_counts": lambda fpath: FastqReader(
+        fpath
+    ).ambiguous_nucleotide_counts(),
+    "profile": lambda fpath: FastqReader(fpath).profile(),
+    "estimate_quality": lambda fpath: FastqReader(fpath).estimate_quality(),
+    "get_forward_reads": lambda fpath: _consume(FastqReader(fpath).get_forward_reads()),
+    "get_reverse_reads": lambda fpath: _consume(FastqReader(fpath).get_reverse_reads()),
+    "reservoir_sampling": lambda fpath: FastqReader(fpath).reservoir_sampling(
+        1000, seed=5
+    ),
+    "unpack_entries": lambda fpath: FastqReader(fpath).unpack_entries(),
+    "build_index": lambda fpath: FastqReader(fpath).build_index(),
+    # scripts
+    "read_size_by_avg_EE": lambda fpath: GTP.read_size_by_avg_EE(
+        FastqReader(fpath), 10, 240
+    ),
+    "read_size_by_maxEE": lambda fpath: GME.read_size_by_maxEE(
+        FastqReader(fpath), 10, 240
+    ),
+    "subsample": lambda fpath: GSS.subsample(
+        str(fpath), 1000, _workdir_path(fpath, "subsample.fastq")
+    ),
+    "paired_end_split": lambda fpath: GPF.getPairedFiles(
+        str(fpath),
+        _workdir_path(fpath, "forward.fastq"),
+        _workdir_path(fpath, "reverse.fastq"),
+    ),
+}
+
+# cases whose memory usage grows with the number of reads
+HEAVY_CASES = {
+    "iter_reads",
+    "get_quality_scores",
+    "get_seq_ee_errors",
+    "sequence_df",
+    "unpack_entries",
+}
+
+
+def run_case(case: str, fpath: Path) -> dict:
+    """Runs a single benchmark case within the current process
+
+    Parameters
+    ----------
+    case : str
+        name of the case
+    fpath : Path
+        path to fastq file
+
+    Returns
+    -------
+    dict
+        wall time, cpu time (seconds) and peak RSS (MB) of the process
+    """
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    CASES[case](fpath)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    return {"seconds": wall, "cpu_seconds": cpu, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_case_subprocess(case: str, fpath: Path) -> dict:
+    """Runs a single benchmark case within a fresh python process"""
+    command = [sys.executable, "-m", "smartdada2.testing.benchmark"]
+    command += ["--run_case", case, "--fastq", str(fpath)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return {"error": error[-1] if len(error) > 0 else "unknown error"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+# ----------------------------------------
+# synthetic data
+# ----------------------------------------
+def synthetic_fastq(data_dir: Path, n_reads: int, seed: int = 0) -> Path:
+    """Returns the path of a synthetic fastq file, generating it if it does
+    not exist"""
+    fpath = data_dir / f"synthetic_{n_reads}_{seed}.fastq"
+    if not fpath.exists():
+        partial = fpath.with_suffix(".partial")
+        write_synthetic_fastq(partial, n_reads, quality_sd=4.0, seed=seed)
+        partial.rename(fpath)
+    return fpath
+
+
+# ----------------------------------------
+# suite
+# ----------------------------------------
+def run_suite(
+    sizes: List[int],
+    cases: List[str],
+    data_dir: Path,
+    repeat: int = 1,
+    seed: int = 0,
+) -> dict:
+    """Runs every case on every synthetic file
+
+    Parameters
+    ----------
+    sizes : List[int]
+        number of reads of each synthetic file
+    cases : List[str]
+        names of the cases
+    data_dir : Path
+        directory of the synthetic files
+    repeat : int, optional
+        number of runs per case, by default 1
+    seed : int, optional
+        seed of the synthetic files, by default 0
+
+    Returns
+    -------
+    dict
+        metadata of the run and results of each case
+    """
+    results = []
+    for n_reads in sizes:
+        fpath = synthetic_fastq(data_dir, n_reads, seed)
+        file_mb = fpath.stat().st_size / 1024 / 1024
+        for case in cases:
+            result = {"case": case, "n_reads": n_reads, "file_mb": file_mb}
+            if case in HEAVY_CASES and n_reads > HEAVY_MAX_READS:
+                results.append({**result, "status": "skipped"})
+                continue
+
+            runs = [run_case_subprocess(case, fpath) for _ in range(repeat)]
+            errors = [run["error"] for run in runs if "error" in run]
+            if len(errors) > 0:
+                results.append({**result, "status": "error", "error": errors[0]})
+                continue
+
+            seconds = [run["seconds"] for run in runs]
+            best = min(seconds)
+            results.append(
+                {
+                    **result,
+                    "status": "ok",
+                    "seconds": seconds,
+                    "best_seconds": best,
+                    "median_seconds": statistics.median(seconds),
+                    "cpu_seconds": min(run["cpu_seconds"] for run in runs),
+                    "reads_per_s": n_reads / best,
+                    "mb_per_s": file_mb / best,
+                    "peak_rss_mb": max(
+                        (
+                            run["peak_rss_mb"]
+                            for run in runs
+                            if run["peak_rss_mb"] is not None
+                        ),
+                        default=None,
+                    ),
+                }
+            )
+            print(_format_result(results[-1]), file=sys.stderr)
+
+    return {"metadata": _metadata(seed, repeat), "results": results}
+
+
+def _format_result(result: dict) -> str:
+    """Formats a result as a single progress line"""
+    peak = result["peak_rss_mb"]
+    memory = "n/a" if peak is None else f"{peak:.1f}"
+    return (
+        f"{result['case']:<28} {result['n_reads']:>10} reads "
+        f"{result['best_seconds']:>9.3f} s {result['reads_per_s']:>12.0f} reads/s "
+        f"{result['mb_per_s']:>8.1f} MB/s {memory:>8} MB"
+    )
+
+
+def _metadata(seed: int, repeat: int) -> dict:
+    """Collects the environment of a benchmark run"""
+    try:
+        commit: Optional[str] = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+    }
+
+
+# created parser to run through terminal
+def main():
+    parser = arg.ArgumentParser(
+        description="Benchmarks the FastqReader and smartdada2 scripts on "
+        + "synthetic fastq files and writes the results as JSON"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help="number of reads of each synthetic file",
+    )
+    parser.add_argument(
+        "--cases",
+        type=str,
+        nargs="+",
+        choices=list(CASES),
+        default=list(CASES),
+        help="benchmark cases to run, by default all cases",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs per case")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the synthetic files"
+    )
+    parser.add_argument(
+        "--data_dir",
+        type=str,
+        default=None,
+        help="directory of the synthetic files, files are reused between "
+        + "runs. By default a temporary directory",
+    )
+    parser.add_argument(
+        "--out", type=str, default="benchmark.json", help="output JSON file"
+    )
+
+    # internal: runs a single case, used by the subprocesses
+    parser.add_argument("--run_case", type=str, default=None, help=arg.SUPPRESS)
+    parser.add_argument("--fastq", type=str, default=None, help=arg.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_case is not None:
+        print(json.dumps(run_case(args.run_case, Path(args.fastq))))
+        return
+
+    if args.data_dir is not None:
+        data_dir = Path(args.data_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        report = run_suite(args.sizes, args.cases, data_dir, args.repeat, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = run_suite(
+                args.sizes, args.cases, Path(tmp_dir), args.repeat, args.seed
+            )
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
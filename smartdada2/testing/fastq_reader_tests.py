@@ -2,16 +2,41 @@
 Testing module tests all random, positive, and negative cases that FastqReader
 may encounter
 """
+import gzip
+import io
 import os
+import shutil
+import sys
 import unittest
+from pathlib import Path
+from unittest import mock
 
+import numpy as np
 from pandas import DataFrame
 
+from smartdada2.common.constants import AMB_DNA
 from smartdada2.common.errors import FastqFormatError
-from smartdada2.reader.reader import FastqEntry, FastqReader
+from smartdada2.reader.batch import FastqBatch, parse_records
+from smartdada2.reader.cache import ResultCache
+from smartdada2.reader.compression import detect_compression, open_fastq
+from smartdada2.reader.progress import LoadObserver, ProgressBar, PrometheusTextfile
+from smartdada2.reader.reader import (
+    CompactFastqEntry,
+    FastqEntry,
+    FastqReader,
+    search_ambiguous_nucleotide,
+)
+from smartdada2.reader.shards import run_shard, shard_ranges
+from smartdada2.reader.sources import find_record_start
+from smartdada2.reader.writer import BGZF_BLOCK_SIZE, BGZF_EOF, FastqWriter
 
 # smartdada2 imports
-from smartdada2.testing.help_test_funcs import toy_sequencer
+from smartdada2.testing.help_test_funcs import toy_sequencer, write_bgzf
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 class TestFastqEntry(unittest.TestCase):
@@ -189,6 +214,21 @@ class TestFastqEntry(unittest.TestCase):
 
         self.assertRaises(FastqFormatError, FastqEntry, header, seq, scores, length)
 
+    def test_header_trailing_whitespace(self):
+        """Checks if trailing whitespace after the direction token is
+        ignored"""
+        records = (
+            b"@r1 1:N:0:1 \nACGT\n+\nIIII\n"
+            b"@r2 2:N:0:1\t \r\nACGT\n+\nIIII\n"
+            b"@r3 2\nACGT\n+\nIIII\n"
+        )
+        batch = parse_records(records)
+        self.assertEqual([False, True, True], batch.rseq.tolist())
+
+        entry = FastqEntry("@r1 2:N:0:1 ", "ACGT", "IIII", 4)
+        self.assertTrue(entry.rseq)
+        self.assertRaises(FastqFormatError, parse_records, b"@r1  \nA\n+\nI\n")
+
 
 class TestFastqReader(unittest.TestCase):
     """FastqReader is the main engine that attempts to extract as much
@@ -209,6 +249,138 @@ class TestFastqReader(unittest.TestCase):
         test_reader = FastqReader("./lower_seq.fastq")
         self.assertIsInstance(test_reader, FastqReader)
 
+    def test_reader_invalid_backend(self) -> None:
+        """Tests if unknown parsing backends are captured"""
+        self.assertRaises(ValueError, FastqReader, "./small.fastq", backend="json")
+
+    def test_reader_mmap_backend(self) -> None:
+        """Tests if the memory mapped backend produces the same reads as the
+        text backend"""
+        text_reader = FastqReader("./upper_seq.fastq")
+        mmap_reader = FastqReader("./upper_seq.fastq", backend="mmap")
+
+        self.assertEqual(
+            text_reader.unpack_entries(full=True),
+            mmap_reader.unpack_entries(full=True),
+        )
+        self.assertEqual(
+            [len(batch) for batch in mmap_reader.iter_batches(batch_size=4)],
+            [4, 4, 4, 4, 4, 4, 4, 2],
+        )
+        self.assertTrue(
+            text_reader.get_quality_scores().equals(mmap_reader.get_quality_scores())
+        )
+
+    def test_reader_compressed(self) -> None:
+        """Tests if gzip and bgzip compressed files produce the same reads as
+        uncompressed files"""
+        with open(self.upper_fastq, "rb") as f:
+            contents = f.read()
+        with gzip.open(self.gzip_fastq, "wb") as f:
+            f.write(contents)
+        write_bgzf(self.bgzip_fastq, contents, block_size=1000)
+
+        expected = FastqReader(self.upper_fastq).unpack_entries(full=True)
+        for fpath, compression in (
+            (self.gzip_fastq, "gzip"),
+            (self.bgzip_fastq, "bgzip"),
+        ):
+            test_reader = FastqReader(fpath)
+            self.assertEqual(compression, test_reader.compression)
+            self.assertEqual(expected, test_reader.unpack_entries(full=True))
+            self.assertEqual(
+                [7, 7, 7, 7, 2],
+                [len(batch) for batch in test_reader.iter_batches(batch_size=7)],
+            )
+
+    @unittest.skipUnless(zstandard is not None, "requires the zstandard package")
+    def test_reader_zstd(self) -> None:
+        """Tests if single and concatenated frame zstd compressed files
+        produce the same reads as uncompressed files"""
+        with open(self.upper_fastq, "rb") as f:
+            contents = f.read()
+        half = contents.index(b"\n@", len(contents) // 2) + 1
+
+        expected = FastqReader(self.upper_fastq).unpack_entries(full=True)
+        for frames in ([contents], [contents[:half], contents[half:]]):
+            with open(self.zstd_fastq, "wb") as f:
+                for frame in frames:
+                    f.write(zstandard.ZstdCompressor().compress(frame))
+
+            test_reader = FastqReader(self.zstd_fastq)
+            self.assertEqual("zstd", test_reader.compression)
+            self.assertEqual(expected, test_reader.unpack_entries(full=True))
+            self.assertEqual(
+                [7, 7, 7, 7, 2],
+                [len(batch) for batch in test_reader.iter_batches(batch_size=7)],
+            )
+
+    def test_reader_zstd_missing(self) -> None:
+        """Tests if reading zstd files without the zstandard package raises
+        an ImportError with installation instructions"""
+        with open(self.zstd_fastq, "wb") as f:
+            f.write(b"\x28\xb5\x2f\xfd")
+
+        # None within sys.modules makes the import fail
+        with mock.patch.dict(sys.modules, {"zstandard": None}):
+            with self.assertRaisesRegex(ImportError, "pip install zstandard"):
+                FastqReader(self.zstd_fastq).unpack_entries()
+
+    def test_fastq_writer(self) -> None:
+        """Tests if batches and entries written by the FastqWriter are read
+        back as the same reads, with and without compression"""
+        expected = [
+            (entry.header, entry.seq, entry.scores, entry.rseq)
+            for entry in FastqReader(self.upper_fastq).iter_reads()
+        ]
+        for fpath, compression in (
+            (self.written_fastq, None),
+            (self.gzip_fastq, "gzip"),
+            (self.bgzip_fastq, "bgzip"),
+        ):
+            # writing reverse reads as batches and forward reads as entries
+            with FastqWriter(fpath, chunk_size=1000) as writer:
+                for batch in FastqReader(self.upper_fastq).iter_batches(7):
+                    writer.write_batch(batch, batch.rseq)
+                writer.write_entries(FastqReader(self.upper_fastq).get_forward_reads())
+            self.assertEqual(30, writer.n_records)
+
+            test_reader = FastqReader(fpath)
+            self.assertEqual(compression, detect_compression(Path(fpath)))
+            self.assertEqual(compression, test_reader.compression)
+            self.assertEqual(
+                [entry for entry in expected if entry[3]]
+                + [entry for entry in expected if not entry[3]],
+                [
+                    (entry.header, entry.seq, entry.scores, entry.rseq)
+                    for entry in test_reader.iter_reads()
+                ],
+            )
+
+        # bgzip outputs are split into blocks and end with the EOF block
+        contents = b"".join(
+            batch.to_fastq() for batch in FastqReader(self.upper_fastq).iter_batches()
+        )
+        with FastqWriter(self.bgzip_fastq) as writer:
+            for _ in range(10):
+                for batch in FastqReader(self.upper_fastq).iter_batches():
+                    writer.write_batch(batch)
+        with open(self.bgzip_fastq, "rb") as f:
+            self.assertEqual(BGZF_EOF, f.read()[-len(BGZF_EOF) :])
+        with open_fastq(Path(self.bgzip_fastq)) as f:
+            self.assertEqual(contents * 10, f.read())
+        self.assertGreater(len(contents) * 10, 2 * BGZF_BLOCK_SIZE)
+
+        self.assertRaises(ValueError, FastqWriter, self.written_fastq, "bz2")
+
+    def test_reader_invalid_compressed_ext(self) -> None:
+        """Tests if unsupported compression extensions are captured"""
+        with open(self.invalid_compressed_ext, "w") as f:
+            f.write("invalid ext")
+
+        test_reader = FastqReader(self.invalid_compressed_ext)
+        self.assertRaises(ValueError, next, test_reader.iter_reads())
+
     def test_reader_invalid_seqs(self) -> None:
         """Tests if Fastq files contains unwanted types. For example, if digits
         or booleans or unknown characters are captured within the sequence"""
@@ -232,6 +404,31 @@ class TestFastqReader(unittest.TestCase):
         except Exception as e:
             self.fail(f"{e.__class__.__name__} captured, not FastqFormatError")
 
+    def test_reader_validation_modes(self) -> None:
+        """Tests if the validation modes check the expected parts of the
+        records"""
+        with open(self.bad_quality_fastq, "w") as f:
+            f.write("@read.1 1:N\nACGTN\n+\nII II\n")
+
+        # quality characters are only checked by full validation
+        test_reader = FastqReader(self.bad_quality_fastq)
+        self.assertRaises(FastqFormatError, next, test_reader.iter_batches())
+        test_reader = FastqReader(self.bad_quality_fastq, validate="fast")
+        self.assertEqual(1, len(next(test_reader.iter_batches())))
+
+        # sequence and quality lines with different lengths
+        with open(self.bad_quality_fastq, "w") as f:
+            f.write("@read.1 1:N\nACGTN\n+\nIIII\n")
+        test_reader = FastqReader(self.bad_quality_fastq)
+        self.assertRaises(FastqFormatError, next, test_reader.iter_batches())
+
+        # skipping validation
+        with open(self.bad_quality_fastq, "w") as f:
+            f.write("@read.1 1:N\nAC1T@\n+\nII II\n")
+        test_reader = FastqReader(self.bad_quality_fastq, validate="off")
+        self.assertEqual(1, len(next(test_reader.iter_batches())))
+        self.assertRaises(ValueError, FastqReader, "./small.fastq", validate="all")
+
     def test_reader_file_not_exist(self) -> None:
         """Tests if exception is raised if the file is not found"""
         self.assertRaises(FileNotFoundError, FastqReader, "./does_not_exist.fastq")
@@ -322,6 +519,127 @@ class TestFastqReader(unittest.TestCase):
 
         self.assertEqual(expected_avg_scores, test_avg_scores)
 
+    def test_average_quality_score_streaming(self) -> None:
+        """Checks if the streaming accumulator matches the DataFrame based
+        averages"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        streamed = test_reader.get_average_score()
+        in_memory = test_reader.get_average_score(streaming=False)
+
+        self.assertEqual(streamed.values.tolist(), in_memory.values.tolist())
+
+    def test_average_quality_score_ragged(self) -> None:
+        """Checks if averages only use the reads that reach each position"""
+        with open(self.ragged_fastq, "w") as f:
+            reads = toy_sequencer(15, 4, rev_seq=True, seed=42)
+            for idx, read in enumerate(reads):
+                read[1] = read[1][: 10 + idx]
+                read[3] = read[3][: 10 + idx]
+                for read_data in read:
+                    f.write(f"{read_data}\n")
+
+        test_reader = FastqReader(self.ragged_fastq)
+        streamed = test_reader.get_average_score()
+        in_memory = test_reader.get_average_score(streaming=False)
+
+        self.assertEqual(13, len(streamed))
+        self.assertEqual(streamed.values.tolist(), in_memory.values.tolist())
+
+    def test_ragged_scores(self) -> None:
+        """Checks if ragged scores only store the bases of each read and
+        provide per position coverage"""
+        with open(self.ragged_fastq, "w") as f:
+            reads = toy_sequencer(15, 4, rev_seq=True, seed=42)
+            for idx, read in enumerate(reads):
+                read[1] = read[1][: 10 + idx]
+                read[3] = read[3][: 10 + idx]
+                for read_data in read:
+                    f.write(f"{read_data}\n")
+
+        test_reader = FastqReader(self.ragged_fastq)
+        scores = test_reader.get_ragged_scores()
+        seqs = test_reader.get_ragged_sequences()
+        coverage = test_reader.get_position_coverage()
+
+        self.assertEqual([10, 11, 12, 13], scores.lengths.tolist())
+        self.assertEqual(46, len(scores.values))
+        self.assertEqual(scores.offsets.tolist(), seqs.offsets.tolist())
+        self.assertEqual([4] * 10 + [3, 2, 1], coverage["Coverage"].tolist())
+        self.assertEqual(coverage["Coverage"].tolist(), scores.coverage().tolist())
+        np.testing.assert_allclose(
+            test_reader.get_average_score()["AverageQualityScore"],
+            scores.position_means(),
+        )
+        np.testing.assert_array_equal(
+            test_reader.get_quality_scores().fillna(0).to_numpy(),
+            scores.to_padded(),
+        )
+        self.assertEqual(
+            [entry.seq for entry in test_reader.iter_reads()][-1],
+            seqs[-1].tobytes().decode(),
+        )
+
+    def test_packed_sequences(self) -> None:
+        """Checks if packed sequences are unpacked into the original reads,
+        including ambiguous nucleotides and reads of different lengths"""
+        with open(self.ragged_fastq, "w") as f:
+            reads = toy_sequencer(15, 4, rev_seq=True, seed=42)
+            for idx, read in enumerate(reads):
+                read[1] = "NRY"[idx % 3] + read[1][1 : 9 + idx] + "K"
+                read[3] = read[3][: 10 + idx]
+                for read_data in read:
+                    f.write(f"{read_data}\n")
+
+        for fpath in (self.ragged_fastq, self.upper_fastq):
+            test_reader = FastqReader(fpath)
+            packed = test_reader.get_packed_sequences()
+            expected = [entry.seq for entry in test_reader.iter_reads()]
+
+            self.assertEqual(expected, packed.to_strings())
+            self.assertEqual(expected[-1], packed[-1])
+            self.assertEqual(
+                test_reader.get_ragged_sequences().to_padded().tolist(),
+                packed.to_padded().tolist(),
+            )
+            self.assertLess(packed.bits.nbytes, sum(map(len, expected)) / 3)
+
+            # sharded results are concatenated in file order
+            sharded = FastqReader(fpath, n_workers=2).get_packed_sequences()
+            self.assertEqual(expected, sharded.to_strings())
+
+        # only non ACGT bases are stored separately
+        test_reader = FastqReader(self.ragged_fastq)
+        packed = test_reader.get_packed_sequences()
+        expected = [entry.seq for entry in test_reader.iter_reads()]
+        self.assertEqual(
+            sum(base not in "ACGT" for seq in expected for base in seq),
+            len(packed.other_bases),
+        )
+        self.assertEqual(
+            [
+                sum(len(seq) > pos and seq[pos] in AMB_DNA for seq in expected)
+                for pos in range(13)
+            ],
+            packed.ambiguous_counts().tolist(),
+        )
+        self.assertEqual(
+            [expected[i] for i in (3, 0, 3)],
+            packed.select(np.array([3, 0, 3])).to_strings(),
+        )
+
+    def test_sequence_df_encoded(self) -> None:
+        """Checks if encoded sequence DataFrames contain the ASCII codes of
+        the nucleotides"""
+        test_reader = FastqReader("./small.fastq")
+        seq_df = test_reader.sequence_df()
+        encoded_df = test_reader.sequence_df(encoded=True)
+
+        self.assertEqual(np.uint8, encoded_df.dtypes.unique()[0])
+        self.assertEqual(
+            seq_df.map(ord).values.tolist(),
+            encoded_df.values.tolist(),
+        )
+
     # -- Testing Max expected error function
     def test_max_ee_type(self) -> None:
         """checks values produced"""
@@ -417,6 +735,68 @@ class TestFastqReader(unittest.TestCase):
         for entry in unpack_reads:
             self.assertIsInstance(entry, FastqEntry)
 
+    def test_compact_entries(self):
+        """Checks if compact entries decode the same contents as the
+        FastqEntries and cannot be modified"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        expected = list(test_reader.iter_reads())
+        entries = test_reader.unpack_entries()
+
+        self.assertEqual(len(expected), len(entries))
+        for expected_entry, entry in zip(expected, entries):
+            self.assertIsInstance(entry, CompactFastqEntry)
+            self.assertFalse(hasattr(entry, "__dict__"))
+            self.assertEqual(expected_entry.header, entry.header)
+            self.assertEqual(expected_entry.seq, entry.seq)
+            self.assertEqual(expected_entry.scores, entry.scores)
+            self.assertEqual(expected_entry.length, entry.length)
+            self.assertEqual(expected_entry.rseq, entry.rseq)
+            self.assertEqual(expected_entry, entry)
+            self.assertEqual(entry, expected_entry)
+
+        self.assertEqual(expected, entries)
+        self.assertNotEqual(entries[0], entries[1])
+        self.assertNotEqual(entries[0], entries[0].seq)
+        self.assertRaises(AttributeError, setattr, entries[0], "seq", "ACGT")
+
+    def test_reservoir_sampling(self):
+        """Checks if reservoir sampling selects distinct reads from the file,
+        is reproducible with a seed and selects each read equally often"""
+        # headers are not unique, reads are identified by sequence and scores
+        expected = {
+            (entry.seq, entry.scores)
+            for entry in FastqReader("./upper_seq.fastq").iter_reads()
+        }
+        samples = FastqReader("./upper_seq.fastq").reservoir_sampling(10, seed=3)
+        self.assertEqual(10, len(samples))
+        sampled = {(entry.seq, entry.scores) for entry in samples}
+        self.assertEqual(10, len(sampled))
+        self.assertTrue(sampled <= expected)
+
+        repeated = FastqReader("./upper_seq.fastq").reservoir_sampling(10, seed=3)
+        self.assertEqual(
+            [entry.seq for entry in samples], [entry.seq for entry in repeated]
+        )
+
+        # sampling all reads and more reads than the file contains
+        test_reader = FastqReader("./upper_seq.fastq")
+        all_reads = test_reader.reservoir_sampling(30, seed=3)
+        self.assertEqual(
+            set(expected), {(entry.seq, entry.scores) for entry in all_reads}
+        )
+        self.assertRaises(
+            StopIteration, FastqReader("./upper_seq.fastq").reservoir_sampling, 31
+        )
+        self.assertRaises(ValueError, test_reader.reservoir_sampling, 31)
+        self.assertRaises(ValueError, test_reader.reservoir_sampling, 5, seed=1.0)
+
+        # each read is expected to be selected 5 / 30 * 600 = 100 times
+        counts = dict.fromkeys(expected, 0)
+        for seed in range(600):
+            for entry in test_reader.reservoir_sampling(5, seed=seed):
+                counts[(entry.seq, entry.scores)] += 1
+        self.assertTrue(all(50 < count < 150 for count in counts.values()))
+
     def test_sequence_df(self) -> None:
         """Builds a pandas dataframe containing a sequence"""
 
@@ -432,9 +812,458 @@ class TestFastqReader(unittest.TestCase):
         test_reader = FastqReader("./small.fastq")
 
         # build sequence df
-        test_seq_df = test_reader.sequence_df().values.tolist()
+        seq_df = test_reader.sequence_df()
+        test_seq_df = seq_df.values.tolist()
 
         self.assertEqual(test_seq_df, expected_seqs)
+        self.assertEqual([object], seq_df.dtypes.unique().tolist())
+
+    # -- testing batched reads
+    def test_iter_batches_type(self) -> None:
+        """Checks if batches are FastqBatch objects containing arrays"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        batches = list(test_reader.iter_batches(batch_size=7))
+
+        # 30 reads split into batches of 7 reads
+        self.assertEqual([7, 7, 7, 7, 2], [len(batch) for batch in batches])
+        for batch in batches:
+            self.assertIsInstance(batch, FastqBatch)
+            self.assertEqual(batch.scores.dtype, np.uint8)
+            self.assertEqual(batch.seqs.dtype, np.uint8)
+            self.assertEqual(batch.scores.shape, (len(batch), 200))
+
+    def test_iter_batches_values(self) -> None:
+        """Checks if batched arrays contain the same contents as the
+        FastqEntries"""
+        test_reader = FastqReader("./small.fastq")
+        entries = test_reader.unpack_entries()
+        batch = next(test_reader.iter_batches())
+
+        self.assertEqual(batch.headers, [entry.header for entry in entries])
+        self.assertEqual(batch.lengths.tolist(), [entry.length for entry in entries])
+        self.assertEqual(batch.rseq.tolist(), [entry.rseq for entry in entries])
+        self.assertEqual(
+            [row.tobytes().decode() for row in batch.seqs],
+            [entry.seq for entry in entries],
+        )
+        self.assertEqual(
+            batch.scores.tolist(), test_reader.get_quality_scores().values.tolist()
+        )
+
+    def test_iter_batches_invalid_batch_size(self) -> None:
+        """Checks if invalid batch sizes are captured"""
+        test_reader = FastqReader("./small.fastq")
+        self.assertRaises(ValueError, next, test_reader.iter_batches(batch_size=0))
+
+    def test_iter_batches_invalid_seqs(self) -> None:
+        """Checks if invalid sequences are captured when reading batches"""
+        test_reader = FastqReader("./invalid_seq.fastq")
+        self.assertRaises(FastqFormatError, next, test_reader.iter_batches())
+
+    # -- testing record offset index
+    def test_index_slice_reads(self) -> None:
+        """Checks if indexed slicing returns the same reads as iterating"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        indexed_reader = FastqReader("./upper_seq.fastq", index=True)
+
+        expected = [entry.header for entry in test_reader.slice_reads((5, 12))]
+        indexed = [entry.header for entry in indexed_reader.slice_reads((5, 12))]
+
+        self.assertEqual(expected, indexed)
+        self.assertEqual(7, len(indexed))
+        self.assertTrue(os.path.exists("./upper_seq.fastq.fqi"))
+
+    def test_index_random_access(self) -> None:
+        """Checks random access of reads with and without an index"""
+        entries = FastqReader("./upper_seq.fastq").unpack_entries()
+        test_reader = FastqReader("./upper_seq.fastq")
+        indexed_reader = FastqReader("./upper_seq.fastq", index=True)
+
+        self.assertEqual(30, indexed_reader.total_reads())
+        for idx in (0, 17, 29, -1):
+            self.assertEqual(entries[idx].seq, indexed_reader[idx].seq)
+            self.assertEqual(entries[idx].seq, test_reader[idx].seq)
+        self.assertRaises(IndexError, indexed_reader.__getitem__, 30)
+        self.assertRaises(IndexError, test_reader.__getitem__, 30)
+        self.assertRaises(IndexError, test_reader.__getitem__, -31)
+
+        # iterating the reader is a single pass over the file
+        self.assertEqual(
+            [entry.seq for entry in entries], [entry.seq for entry in test_reader]
+        )
+
+        # compressed files are scanned
+        with open("./upper_seq.fastq", "rb") as f:
+            write_bgzf(self.bgzip_fastq, f.read())
+        self.assertEqual(entries[-1].seq, FastqReader(self.bgzip_fastq)[-1].seq)
+
+    def test_index_rebuild(self) -> None:
+        """Checks if the index is rebuilt once the fastq file is modified"""
+        indexed_reader = FastqReader("./small.fastq")
+        self.assertEqual(5, len(indexed_reader.build_index()))
+
+        # appending reads to the fastq file
+        with open(self.small_fastq, "a") as f:
+            for read in toy_sequencer(15, 2, rev_seq=True, seed=1):
+                for read_data in read:
+                    f.write(f"{read_data}\n")
+        os.utime(self.small_fastq, ns=(0, 0))
+
+        self.assertEqual(7, FastqReader("./small.fastq", index=True).total_reads())
+
+    # -- testing result cache
+    def test_result_cache(self) -> None:
+        """Checks if cached results are reused and recomputed once the fastq
+        file is modified"""
+        test_reader = FastqReader("./small.fastq")
+        max_ee = test_reader.get_max_seq_ee()
+        self.assertTrue(max_ee.equals(test_reader.get_max_seq_ee()))
+        self.assertEqual(5, len(test_reader.get_avg_seq_ee()))
+
+        # appending reads to the fastq file
+        with open(self.small_fastq, "a") as f:
+            for read in toy_sequencer(15, 2, rev_seq=True, seed=1):
+                for read_data in read:
+                    f.write(f"{read_data}\n")
+        os.utime(self.small_fastq, ns=(0, 0))
+        self.assertEqual(7, len(test_reader.get_max_seq_ee()))
+
+        # disabled cache produces the same results
+        no_cache_reader = FastqReader("./small.fastq", cache_size=0)
+        self.assertTrue(
+            test_reader.get_average_score().equals(no_cache_reader.get_average_score())
+        )
+        test_reader.clear_cache()
+        self.assertRaises(ValueError, FastqReader, "./small.fastq", cache_size=-1)
+
+    def test_result_cache_eviction(self) -> None:
+        """Checks if the least recently used results are evicted"""
+        cache = ResultCache(max_size=200)
+        cache.put("a", np.zeros(10))
+        cache.put("b", np.zeros(10))
+        cache.get("a")
+        cache.put("c", np.zeros(10))
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(160, cache.size)
+        self.assertFalse(cache.get("a").flags.writeable)
+        self.assertFalse(cache.put("d", np.zeros(100)))
+
+    # -- testing sharded parsing
+    def test_shard_ranges(self) -> None:
+        """Checks if byte ranges start at records and cover all reads"""
+        fpath = Path(self.upper_fastq)
+        for n_shards in (1, 2, 7, 30, 100):
+            ranges = shard_ranges(fpath, n_shards)
+            self.assertEqual(0, ranges[0][0])
+            self.assertEqual(fpath.stat().st_size, ranges[-1][1])
+            n_reads = sum(
+                len(batch)
+                for byte_range in ranges
+                for batch in [run_shard("scores", fpath, byte_range)[1][0]]
+            )
+            self.assertEqual(30, n_reads)
+
+        # the third line of a record must start with "+"
+        records = b"@r1 1\nACGT\n+\nIIII\n@r2 2\nACGT\n+\nIIII\n"
+        invalid = records.replace(b"\n+\n", b"\n@r 1\n")
+        self.assertEqual(len(records) // 2, find_record_start(records * 2, 1))
+        self.assertRaises(FastqFormatError, find_record_start, invalid * 2, 1)
+
+    def test_sharded_reader(self) -> None:
+        """Checks if multiple workers produce the same results as a single
+        worker"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        sharded_reader = FastqReader("./upper_seq.fastq", n_workers=3)
+
+        self.assertTrue(
+            test_reader.get_quality_scores().equals(sharded_reader.get_quality_scores())
+        )
+        self.assertTrue(
+            test_reader.get_average_score().equals(sharded_reader.get_average_score())
+        )
+        self.assertTrue(
+            test_reader.get_max_seq_ee().equals(sharded_reader.get_max_seq_ee())
+        )
+        self.assertTrue(
+            test_reader.ambiguous_nucleotide_counts().equals(
+                sharded_reader.ambiguous_nucleotide_counts()
+            )
+        )
+
+    # -- testing fused profile
+    def test_profile(self) -> None:
+        """Checks if the fused profile contains the same statistics as the
+        separate methods"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        profile = test_reader.profile(trim=(10, 150))
+        max_ee = test_reader.get_max_seq_ee()
+
+        self.assertEqual(30, profile.n_reads)
+        self.assertTrue(profile.quality_frame().equals(test_reader.get_average_score()))
+        self.assertTrue(
+            profile.ambiguous_frame().equals(test_reader.ambiguous_nucleotide_counts())
+        )
+        self.assertEqual(max_ee["length"].tolist(), profile.lengths.tolist())
+        self.assertEqual(max_ee["max_ee"].tolist(), profile.read_ee.round(2).tolist())
+        np.testing.assert_allclose(
+            test_reader.get_expected_error()["AverageExpectedError"],
+            profile.expected_error_frame()["AverageExpectedError"],
+        )
+        np.testing.assert_allclose(
+            test_reader.get_seq_ee_errors().mean().to_numpy(), profile.mean_ee
+        )
+        np.testing.assert_allclose(
+            test_reader.get_seq_ee_errors().iloc[:, 10:150].sum(axis=1),
+            profile.max_ee_frame()["ObviousTrimming"],
+        )
+
+        # sharded profile and invalid trimming windows
+        sharded = FastqReader("./upper_seq.fastq", n_workers=3).profile((10, 150))
+        np.testing.assert_allclose(profile.trimmed_ee, sharded.trimmed_ee)
+        self.assertRaises(ValueError, test_reader.profile().max_ee_frame)
+        self.assertRaises(ValueError, test_reader.profile, (150, 10))
+        self.assertRaises(TypeError, test_reader.profile, (1.0, 10))
+
+        # profile and scores collected within a single pass
+        for n_workers in (1, 3):
+            columns = FastqReader(
+                "./upper_seq.fastq", n_workers=n_workers
+            ).get_quality_columns()
+            np.testing.assert_array_equal(profile.read_ee, columns.profile.read_ee)
+            np.testing.assert_array_equal(
+                test_reader.get_ragged_scores().values, columns.scores.values
+            )
+            np.testing.assert_allclose(
+                profile.trimmed_ee, columns.trimmed_profile((10, 150)).trimmed_ee
+            )
+        columns_reader = FastqReader("./upper_seq.fastq")
+        columns_reader.get_quality_columns()
+        self.assertEqual(
+            os.path.getsize("./upper_seq.fastq"), columns_reader.n_bytes_loaded
+        )
+
+    def test_disk_cache(self) -> None:
+        """Checks if results loaded from the disk cache are the same as
+        parsed results and if the cache is keyed by contents and scale"""
+        expected = FastqReader(self.upper_fastq)
+        cached = FastqReader(self.upper_fastq, cache_dir=self.cache_dir)
+        cached.disk_cache.clear()
+        profile = cached.profile()
+        self.assertEqual(1, len(list(Path(self.cache_dir).iterdir())))
+
+        # a new reader loads the columns instead of parsing the file
+        test_reader = FastqReader(self.upper_fastq, cache_dir=self.cache_dir)
+        trimmed = test_reader.profile((10, 150))
+        np.testing.assert_allclose(
+            expected.profile((10, 150)).trimmed_ee, trimmed.trimmed_ee
+        )
+        np.testing.assert_array_equal(profile.read_ee, trimmed.read_ee)
+        self.assertTrue(
+            expected.get_quality_scores().equals(test_reader.get_quality_scores())
+        )
+        self.assertTrue(
+            expected.get_average_score().equals(test_reader.get_average_score())
+        )
+        self.assertTrue(expected.get_max_seq_ee().equals(test_reader.get_max_seq_ee()))
+        self.assertTrue(
+            expected.ambiguous_nucleotide_counts().equals(
+                test_reader.profile().ambiguous_frame()
+            )
+        )
+        for batch, cached_batch in zip(
+            expected.iter_batches(batch_size=7),
+            test_reader.iter_quality_batches(batch_size=7),
+        ):
+            np.testing.assert_array_equal(batch.scores, cached_batch.scores)
+            np.testing.assert_array_equal(batch.rseq, cached_batch.rseq)
+        self.assertEqual(0, test_reader.n_bytes_loaded)
+
+        # copies that keep the modification time share the entry, rewritten
+        # -- files (same size) and other scales are separate entries
+        shutil.copy2(self.upper_fastq, self.written_fastq)
+        copied = FastqReader(self.written_fastq, cache_dir=self.cache_dir)
+        copied.get_average_score()
+        self.assertEqual(0, copied.n_bytes_loaded)
+        stats = os.stat(self.written_fastq)
+        os.utime(self.written_fastq, ns=(stats.st_atime_ns, stats.st_mtime_ns + 1))
+        rewritten = FastqReader(self.written_fastq, cache_dir=self.cache_dir)
+        rewritten.get_average_score()
+        self.assertLess(0, rewritten.n_bytes_loaded)
+        FastqReader(self.upper_fastq, scale=50, cache_dir=self.cache_dir).profile()
+        self.assertEqual(3, len(cached.disk_cache))
+
+        # the results of the caching pass are the same as parsed results
+        for method in (
+            "get_average_score",
+            "get_max_seq_ee",
+            "ambiguous_nucleotide_counts",
+        ):
+            cached.disk_cache.clear()
+            test_reader = FastqReader(self.upper_fastq, cache_dir=self.cache_dir)
+            result = getattr(test_reader, method)()
+            self.assertTrue(getattr(expected, method)().equals(result), method)
+            self.assertEqual(1, len(cached.disk_cache))
+        cached.disk_cache.clear()
+        trimmed = FastqReader(self.upper_fastq, cache_dir=self.cache_dir).profile(
+            (10, 150)
+        )
+        np.testing.assert_allclose(
+            expected.profile((10, 150)).trimmed_ee, trimmed.trimmed_ee
+        )
+
+        # unvalidated reads and stopped passes are not cached
+        cached.disk_cache.clear()
+        FastqReader(
+            self.upper_fastq, validate="off", cache_dir=self.cache_dir
+        ).profile()
+        next(iter(cached.iter_quality_batches(batch_size=7)))
+        self.assertEqual([], list(Path(self.cache_dir).iterdir()))
+
+    def test_disk_cache_eviction(self) -> None:
+        """Checks if least recently used entries are evicted once the cache
+        exceeds its max size"""
+        test_reader = FastqReader(self.upper_fastq, cache_dir=self.cache_dir)
+        cache = test_reader.disk_cache
+        cache.clear()
+        test_reader.profile()
+        entry_size = cache.size
+
+        # the most recent entry is kept
+        test_reader = FastqReader(
+            self.upper_fastq,
+            scale=50,
+            cache_dir=self.cache_dir,
+            disk_cache_size=entry_size + 1,
+        )
+        test_reader.profile()
+        self.assertEqual(
+            [test_reader.disk_cache.key(Path(self.upper_fastq), 50)],
+            [entry.name for entry in cache.entries()],
+        )
+
+        # entries larger than the cache are not stored
+        cache.clear()
+        FastqReader(
+            self.upper_fastq, cache_dir=self.cache_dir, disk_cache_size=100
+        ).profile()
+        self.assertEqual(0, len(cache))
+        self.assertRaises(
+            ValueError,
+            FastqReader,
+            self.upper_fastq,
+            cache_dir=self.cache_dir,
+            disk_cache_size=-1,
+        )
+
+    def test_estimate_quality(self) -> None:
+        """Checks if early stopping estimates stop once converged and report
+        the number of reads used"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        scores = test_reader.get_quality_scores()
+
+        # a tolerance that is never reached uses all reads
+        estimate = test_reader.estimate_quality(tolerance=1e-6, min_reads=1)
+        self.assertFalse(estimate.converged)
+        self.assertEqual(30, estimate.n_reads)
+        np.testing.assert_allclose(
+            test_reader.get_average_score()["AverageQualityScore"],
+            estimate.quality_frame()["AverageQualityScore"],
+        )
+        np.testing.assert_allclose(
+            1.959964 * scores.std() / np.sqrt(scores.count()),
+            estimate.quality_frame()["HalfWidth"],
+            rtol=1e-5,
+        )
+
+        # a large tolerance stops after the first batch
+        estimate = test_reader.estimate_quality(
+            tolerance=100, min_reads=1, batch_size=5
+        )
+        self.assertTrue(estimate.converged)
+        self.assertEqual(5, estimate.n_reads)
+        np.testing.assert_allclose(
+            scores.iloc[:5].mean(), estimate.mean_quality[: scores.shape[1]]
+        )
+
+        self.assertRaises(ValueError, test_reader.estimate_quality, tolerance=0)
+        self.assertRaises(ValueError, test_reader.estimate_quality, confidence=1.0)
+
+    def test_load_observers(self) -> None:
+        """Checks if observers are notified about the progress of each pass
+        and if the built-in sinks report it"""
+
+        class Recorder(LoadObserver):
+            def __init__(self, **intervals):
+                super().__init__(**intervals)
+                self.progress = []
+
+            def on_progress(self, progress):
+                self.progress.append(progress)
+
+        by_records = Recorder(every_records=10)
+        by_bytes = Recorder(every_records=None, every_bytes=1)
+        stream = io.StringIO()
+        test_reader = FastqReader(
+            self.upper_fastq,
+            observers=[
+                by_records,
+                by_bytes,
+                ProgressBar(stream=stream, every_records=10),
+                PrometheusTextfile(self.metrics_prom, every_records=10),
+            ],
+        )
+        file_size = os.path.getsize(self.upper_fastq)
+
+        # notified after the blocks that pass the interval and at the end
+        list(test_reader.iter_batches(batch_size=4))
+        self.assertEqual(
+            [12, 24, 30], [progress.n_records for progress in by_records.progress]
+        )
+        self.assertEqual(9, len(by_bytes.progress))
+        last = by_records.progress[-1]
+        self.assertTrue(last.finished)
+        self.assertEqual((file_size, False, 0.0), (last.n_bytes, last.failed, last.eta))
+        self.assertLess(by_records.progress[0].fraction, 1.0)
+        self.assertIn("100.0% 30 reads", stream.getvalue())
+        with open(self.metrics_prom) as f:
+            metrics = f.read()
+        self.assertIn(
+            'smartdada2_reads_loaded_total{file="upper_seq.fastq"} 30', metrics
+        )
+        self.assertIn('smartdada2_load_finished{file="upper_seq.fastq"} 1', metrics)
+        self.assertIn('smartdada2_load_failed{file="upper_seq.fastq"} 0', metrics)
+
+        # sampling passes are observed too
+        test_reader.reservoir_sampling(5, seed=1)
+        last = by_records.progress[-1]
+        self.assertEqual((30, file_size), (last.n_records, last.n_bytes))
+        self.assertTrue(last.finished)
+
+        # validation failures are reported before raising
+        failures = Recorder()
+        invalid_reader = FastqReader(self.invalid_seq, observers=[failures])
+        self.assertRaises(FastqFormatError, list, invalid_reader.iter_batches())
+        self.assertTrue(failures.progress[-1].failed)
+        self.assertFalse(failures.progress[-1].finished)
+
+        self.assertRaises(ValueError, Recorder, every_records=0)
+
+    def test_ambiguous_nucleotide_counts(self) -> None:
+        """Checks ambiguous nucleotide counts against the sequence
+        DataFrame"""
+        test_reader = FastqReader("./upper_seq.fastq")
+        seq_df = test_reader.sequence_df()
+        expected = seq_df.apply(search_ambiguous_nucleotide).tolist()
+
+        test_counts = test_reader.ambiguous_nucleotide_counts()
+        self.assertEqual(["Position", "AmbiguousCounts"], test_counts.columns.tolist())
+        self.assertEqual(expected, test_counts["AmbiguousCounts"].tolist())
+
+    def test_invalid_n_workers(self) -> None:
+        """Checks if invalid number of workers are captured"""
+        self.assertRaises(ValueError, FastqReader, "./small.fastq", n_workers=0)
 
     # ------------------------------
     # Setup class methods
@@ -454,6 +1283,15 @@ class TestFastqReader(unittest.TestCase):
         cls.capital_ext = "capital_ext_seq.FASTQ"
         cls.invalid_ext = "invalid_ext_seq.fasta"
         cls.empty_file = "empty.fastq"
+        cls.ragged_fastq = "ragged.fastq"
+        cls.gzip_fastq = "upper_seq.fastq.gz"
+        cls.bgzip_fastq = "upper_seq.fastq.bgz"
+        cls.zstd_fastq = "upper_seq.fastq.zst"
+        cls.invalid_compressed_ext = "invalid_ext_seq.fastq.bz2"
+        cls.bad_quality_fastq = "bad_quality.fastq"
+        cls.written_fastq = "written.fastq"
+        cls.metrics_prom = "load_metrics.prom"
+        cls.cache_dir = "reader_cache"
 
         # generating small fastq file
         with open(cls.small_fastq, "w") as f:
@@ -525,6 +1363,21 @@ class TestFastqReader(unittest.TestCase):
         os.remove(cls.invalid_ext)
         os.remove(cls.capital_ext)
         os.remove(cls.empty_file)
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+        for fpath in (
+            cls.ragged_fastq,
+            cls.gzip_fastq,
+            cls.bgzip_fastq,
+            cls.zstd_fastq,
+            cls.invalid_compressed_ext,
+            cls.bad_quality_fastq,
+            cls.written_fastq,
+            cls.metrics_prom,
+            "small.fastq.fqi",
+            "upper_seq.fastq.fqi",
+        ):
+            if os.path.exists(fpath):
+                os.remove(fpath)
 
 
 if __name__ == "__main__":
@@ -2,10 +2,19 @@
 Module that contains helper functions for testing
 
 - toy_sequencer: Generates fastq data if it came from a sequencer
+- write_bgzf: Writes data into a bgzip (blocked gzip) compressed file
+- synthetic_reads: Generates chunks of realistic fastq records with NumPy
+- write_synthetic_fastq: Writes large synthetic fastq files for load testing
 """
 
 import random
-from typing import List, Optional, Union
+import struct
+import zlib
+from pathlib import Path
+from statistics import NormalDist
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
 
 # constants
 DNA = list("ATCGU")
@@ -13,6 +22,15 @@ AMB_DNA = list("NRYKMSWBDHV")
 ASCII_SCORES = [chr(i) for i in range(33, 70 + 1)]
 NUMERICAL_SCORES: list[int] = list(range(33, 70 + 1))
 
+# synthetic reads
+# -- header: fixed width read number followed by the direction
+SYNTHETIC_HEADER = b"@SYNTH:1:000000000-A0000:1:1101:0000000000 1:N:0:1\n"
+_HEADER_DIGITS = slice(32, 42)
+_HEADER_DIRECTION = 43
+LENGTH_DISTRIBUTIONS = ("fixed", "normal", "uniform")
+MIN_PHRED, MAX_PHRED = 2, 41
+_SCORE_OFFSET = 31
+
 
 def toy_sequencer(
     amp_length: int,
@@ -109,7 +127,7 @@ def toy_sequencer(
             f_read_id = f"{machine_id} 1{read_id}"
 
             # compile and store
-            result = [f_read_id, f_read, f_read_id, f_score]
+            result = [f_read_id, f_read, "+" + f_read_id[1:], f_score]
             collected_read_data.append(result)
 
             # formatting reverse read as fastq entries
@@ -120,7 +138,7 @@ def toy_sequencer(
                 r_read_id = f"{machine_id} 2{read_id}"
 
                 # compile and store
-                result = [r_read_id, r_read, r_read_id, r_score]
+                result = [r_read_id, r_read, "+" + r_read_id[1:], r_score]
                 collected_read_data.append(result)
 
         # break out of the while loop if the generator is out of entries
@@ -128,3 +146,232 @@ def toy_sequencer(
             break
 
     return collected_read_data
+
+
+def write_bgzf(fpath: str, data: bytes, block_size: Optional[int] = 65280) -> None:
+    """Writes data into a bgzip compressed file. Each block is an independent
+    gzip member that contains its size within the "BC" extra field.
+
+    Parameters
+    ----------
+    fpath : str
+        output file path
+    data : bytes
+        uncompressed contents
+    block_size : int, optional
+        max number of uncompressed bytes per block, by default 65280
+    """
+    with open(fpath, "wb") as f:
+        # the last block is an empty end-of-file marker block
+        blocks = [data[i : i + block_size] for i in range(0, len(data), block_size)]
+        for block in blocks + [b""]:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            deflated = compressor.compress(block) + compressor.flush()
+
+            # header (18 bytes) + deflated data + crc32 and size (8 bytes)
+            total_size = 18 + len(deflated) + 8
+            f.write(struct.pack("<4BI2BH", 31, 139, 8, 4, 0, 0, 255, 6))
+            f.write(struct.pack("<2BHH", 66, 67, 2, total_size - 1))
+            f.write(deflated)
+            f.write(struct.pack("<2I", zlib.crc32(block), len(block)))
+
+
+def synthetic_reads(
+    n_reads: int,
+    read_length: int = 250,
+    length_distribution: str = "fixed",
+    length_sd: float = 10.0,
+    min_length: int = 50,
+    start_quality: float = 38.0,
+    end_quality: float = 25.0,
+    decay_power: float = 2.0,
+    quality_sd: float = 3.0,
+    read_quality_sd: float = 2.0,
+    reverse_penalty: float = 2.0,
+    ambiguous_rate: float = 0.001,
+    interleaved: bool = True,
+    seed: Optional[int] = None,
+    chunk_size: int = 100_000,
+) -> Iterable[np.ndarray]:
+    """Generates chunks of synthetic fastq records. All random values of a
+    chunk are drawn at once and the records are assembled within a single
+    byte matrix, therefore millions of reads are generated within seconds.
+
+    Parameters
+    ----------
+    n_reads : int
+        number of reads
+    read_length : int, optional
+        (max) length of the reads, by default 250
+    length_distribution : str, optional
+        "fixed" (all reads have read_length), "normal" (mean read_length and
+        length_sd, truncated to [min_length, read_length]) or "uniform"
+        (between min_length and read_length), by default "fixed"
+    length_sd : float, optional
+        standard deviation of normal read lengths, by default 10.0
+    min_length : int, optional
+        min length of normal and uniform read lengths, by default 50
+    start_quality : float, optional
+        average phred score of the first position, by default 38.0
+    end_quality : float, optional
+        average phred score of the last position, by default 25.0
+    decay_power : float, optional
+        shape of the quality decay along the read, values larger than 1 keep
+        the quality high and drop it towards the end, by default 2.0
+    quality_sd : float, optional
+        standard deviation of the phred scores of each base, by default 3.0
+    read_quality_sd : float, optional
+        standard deviation of the quality offset of each read, by default 2.0
+    reverse_penalty : float, optional
+        decrease of the phred scores of reverse reads, by default 2.0
+    ambiguous_rate : float, optional
+        fraction of ambiguous bases ('N', phred score 2), by default 0.001
+    interleaved : bool, optional
+        if True, forward and reverse reads of each pair alternate, otherwise
+        all reads are forward reads, by default True
+    seed : Optional[int], optional
+        seed of the random generator, the same seed (and chunk size) gives
+        the same reads, by default None
+    chunk_size : int, optional
+        number of reads per chunk, by default 100_000
+
+    Yields
+    ------
+    np.ndarray
+        chunk of fastq records as a contiguous uint8 array
+
+    Raises
+    ------
+    ValueError
+        Raised if the length distribution is unknown or the read lengths are
+        invalid
+    """
+    if length_distribution not in LENGTH_DISTRIBUTIONS:
+        raise ValueError(
+            f"length_distribution must be one of {LENGTH_DISTRIBUTIONS}, "
+            f"provided: {length_distribution}"
+        )
+    elif not 0 < min_length <= read_length:
+        raise ValueError("lengths must satisfy 0 < min_length <= read_length")
+
+    rng = np.random.default_rng(seed)
+
+    # average ascii score of each position, with an offset of 31 all scores
+    # and their noise stay positive within uint8
+    positions = np.arange(read_length) / max(read_length - 1, 1)
+    mean_quality = np.rint(
+        start_quality - (start_quality - end_quality) * positions**decay_power
+    )
+    mean_score = (mean_quality + 33 + _SCORE_OFFSET).astype(np.uint8)
+    min_score, max_score = (
+        MIN_PHRED + 33 + _SCORE_OFFSET,
+        MAX_PHRED + 33 + _SCORE_OFFSET,
+    )
+
+    # lookup tables of random bytes
+    # -- nucleotides: 4 bases per random byte (2 bits per base)
+    # -- noise: 2 normal quantiles (of 256 equally likely bytes) per 2 bytes
+    bits = np.arange(256)[:, None] >> np.arange(0, 8, 2) & 3
+    base_table = np.frombuffer(b"ACGT", dtype=np.uint8)[bits].view(np.uint32).ravel()
+    quantiles = [NormalDist(0, quality_sd).inv_cdf((i + 0.5) / 256) for i in range(256)]
+    noise = np.clip(np.rint(quantiles), -_SCORE_OFFSET, _SCORE_OFFSET).astype(np.int8)
+    pairs = np.arange(2**16)
+    noise_table = np.stack((noise[pairs & 255], noise[pairs >> 8]), axis=1)
+    noise_table = noise_table.view(np.uint16).ravel()
+    n_base_bytes, n_noise_pairs = -(-read_length // 4), -(-read_length // 2)
+
+    # record layout: header, sequence, newline, "+" line, scores, newline
+    header = np.frombuffer(SYNTHETIC_HEADER, dtype=np.uint8)
+    seq_start = len(header)
+    score_start = seq_start + read_length + 3
+    width = score_start + read_length + 1
+    powers = 10 ** np.arange(9, -1, -1, dtype=np.int64)
+
+    for start in range(0, n_reads, chunk_size):
+        n_chunk = min(chunk_size, n_reads - start)
+        read_idx = np.arange(start, start + n_chunk)
+        reverse = read_idx % 2 == 1 if interleaved else np.zeros(n_chunk, bool)
+        lengths = _synthetic_lengths(
+            rng, n_chunk, length_distribution, read_length, length_sd, min_length
+        )
+
+        records = np.empty((n_chunk, width), dtype=np.uint8)
+        seqs = records[:, seq_start : seq_start + read_length]  # noqa
+        scores = records[:, score_start:-1]
+
+        # headers: mates share the same read number
+        records[:, :seq_start] = header
+        numbers = read_idx // 2 if interleaved else read_idx
+        records[:, _HEADER_DIGITS] = (numbers[:, None] // powers) % 10 + ord("0")
+        records[:, _HEADER_DIRECTION] = np.where(reverse, ord("2"), ord("1"))
+        records[:, seq_start + read_length : score_start] = np.frombuffer(
+            b"\n+\n", dtype=np.uint8
+        )
+        records[:, -1] = ord("\n")
+
+        # sequences
+        random_bases = np.frombuffer(rng.bytes(n_chunk * n_base_bytes), np.uint8)
+        bases = base_table[random_bases.reshape(n_chunk, n_base_bytes)]
+        seqs[:] = bases.view(np.uint8)[:, :read_length]
+
+        # scores: position average, read offset and base noise (uint8 wraps
+        # around, adding the int8 noise as uint8 subtracts negative noise)
+        offsets = rng.normal(0, read_quality_sd, n_chunk) - reverse * reverse_penalty
+        offsets = np.clip(np.rint(offsets), -_SCORE_OFFSET, _SCORE_OFFSET)
+        random_noise = np.frombuffer(rng.bytes(n_chunk * n_noise_pairs * 2), np.uint16)
+        noises = noise_table[random_noise.reshape(n_chunk, n_noise_pairs)]
+        np.add(mean_score, offsets.astype(np.int8).view(np.uint8)[:, None], out=scores)
+        np.add(scores, noises.view(np.uint8)[:, :read_length], out=scores)
+        np.clip(scores, min_score, max_score, out=scores)
+        np.subtract(scores, _SCORE_OFFSET, out=scores)
+
+        # ambiguous bases
+        n_ambiguous = rng.binomial(n_chunk * read_length, ambiguous_rate)
+        rows, cols = np.divmod(
+            rng.integers(0, n_chunk * read_length, n_ambiguous), read_length
+        )
+        seqs[rows, cols] = ord("N")
+        scores[rows, cols] = MIN_PHRED + 33
+
+        # removing positions beyond the length of each read
+        if length_distribution == "fixed":
+            yield records.ravel()
+        else:
+            mask = np.ones((n_chunk, width), dtype=bool)
+            valid = np.arange(read_length) < lengths[:, None]
+            mask[:, seq_start : seq_start + read_length] = valid  # noqa
+            mask[:, score_start:-1] = valid
+            yield records[mask]
+
+
+def write_synthetic_fastq(fpath: Union[str, Path], n_reads: int, **kwargs) -> None:
+    """Writes a synthetic fastq file. Keyword arguments are passed to
+    `synthetic_reads`.
+
+    Parameters
+    ----------
+    fpath : Union[str, Path]
+        output file path
+    n_reads : int
+        number of reads
+    """
+    with open(fpath, "wb") as f:
+        for chunk in synthetic_reads(n_reads, **kwargs):
+            f.write(chunk)
+
+
+def _synthetic_lengths(
+    rng: np.random.Generator,
+    n_reads: int,
+    distribution: str,
+    read_length: int,
+    length_sd: float,
+    min_length: int,
+) -> np.ndarray:
+    """Draws the length of each synthetic read"""
+    if distribution == "normal":
+        lengths = np.rint(rng.normal(read_length, length_sd, n_reads))
+        return np.clip(lengths, min_length, read_length).astype(np.int64)
+    elif distribution == "uniform":
+        return rng.integers(min_length, read_length + 1, n_reads)
+    return np.full(n_reads, read_length, dtype=np.int64)
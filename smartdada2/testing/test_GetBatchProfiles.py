@@ -0,0 +1,105 @@
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+import smartdada2.GetBatchProfiles as GBP
+from smartdada2.pipeline import trimming_tables
+from smartdada2.reader.reader import FastqReader
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.manifest = "batch_manifest.tsv"
+        with open(self.manifest, "w") as f:
+            f.write("# sample\tpath\n")
+            f.write("loz_1\ttest_data/LOZ_Nano_Trunc.fastq\n")
+            f.write("loz_2\ttest_data/LOZ_Nano_Trunc.fastq\n")
+            f.write("test_data/SRR1591840_tunc.fastq\n")
+
+    def tearDown(self):
+        os.remove(self.manifest)
+
+    def test_find_samples(self):
+        self.assertRaises(TypeError, GBP.find_samples, 1)
+
+        samples = GBP.find_samples(self.manifest)
+        self.assertEqual(
+            ["loz_1", "loz_2", "SRR1591840_tunc"], [name for name, _ in samples]
+        )
+
+        # samples of a directory are named by their files
+        samples = GBP.find_samples("./test_data")
+        self.assertEqual(
+            ["LOZ_Nano_Trunc", "SRR1591840_tunc"], [name for name, _ in samples]
+        )
+
+    def test_batch_profiles(self):
+        samples = GBP.find_samples(self.manifest)
+        self.assertRaises(ValueError, GBP.batch_profiles, samples, n_workers=0)
+
+        # the SRR file has no sequence direction and fails
+        trim_df, sumEE, retained_df, errors = GBP.batch_profiles(
+            samples, n_workers=2, max_memory=1
+        )
+        self.assertIsNone(retained_df)
+        self.assertEqual(["SRR1591840_tunc"], list(errors))
+        self.assertEqual(["loz_1", "loz_2"], trim_df["Sample"].unique().tolist())
+        self.assertEqual(["loz_1", "loz_2"], sumEE["Sample"].unique().tolist())
+
+        # combined tables contain the tables of each sample
+        expected_trim, expected_sumEE, _ = GBP.profile_sample(
+            "loz_2", "test_data/LOZ_Nano_Trunc.fastq"
+        )
+        sample_trim = trim_df[trim_df["Sample"] == "loz_2"].reset_index(drop=True)
+        sample_sumEE = sumEE[sumEE["Sample"] == "loz_2"].reset_index(drop=True)
+        self.assertTrue(expected_trim.equals(sample_trim))
+        self.assertTrue(expected_sumEE.equals(sample_sumEE))
+
+    def test_broken_pool(self):
+        """Checks if the results of finished samples are kept once a killed
+        worker breaks the pool"""
+        samples = GBP.find_samples(self.manifest)
+        submit = ProcessPoolExecutor.submit
+
+        def break_after_first(pool, *args, **kwargs):
+            if args[1] != "loz_1":
+                raise BrokenProcessPool("worker was killed")
+            return submit(pool, *args, **kwargs)
+
+        with mock.patch.object(ProcessPoolExecutor, "submit", break_after_first):
+            trim_df, sumEE, _, errors = GBP.batch_profiles(samples, n_workers=1)
+        self.assertEqual(["loz_2", "SRR1591840_tunc"], list(errors))
+        self.assertIsInstance(errors["loz_2"], BrokenProcessPool)
+        self.assertEqual(["loz_1"], trim_df["Sample"].unique().tolist())
+        self.assertEqual(["loz_1"], sumEE["Sample"].unique().tolist())
+
+    def test_profile_sample_options(self):
+        """Checks if samples use the same pipeline and options as main.py"""
+        fpath = "test_data/LOZ_Nano_Trunc.fastq"
+        options = {"threshold": 28, "qs_tol": 0.5, "max_ee": [1.0, 2.0]}
+        tables = trimming_tables(FastqReader(fpath), **options)
+        trim, sumEE, retained = GBP.profile_sample("loz", fpath, **options)
+
+        for expected, sample_df in (
+            (tables.trim_info, trim),
+            (tables.sum_ee, sumEE),
+            (tables.retained_reads, retained),
+        ):
+            self.assertEqual(["loz"], sample_df.pop("Sample").unique().tolist())
+            self.assertTrue(expected.equals(sample_df))
+
+        # the whole pipeline reads the file once
+        fqe = FastqReader(fpath)
+        trimming_tables(fqe, max_ee=[1.0, 2.0])
+        self.assertEqual(os.path.getsize(fpath), fqe.n_bytes_loaded)
+
+        _, _, retained_df, _ = GBP.batch_profiles(
+            [("loz", fpath)], n_workers=1, **options
+        )
+        self.assertEqual(len(retained), len(retained_df))
+
+
+if __name__ == "__main__":
+    unittest.main()
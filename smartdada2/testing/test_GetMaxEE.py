@@ -24,6 +24,28 @@ class MyTestCase(unittest.TestCase):
         # make sure output is a pandas df
         df = GME.read_size_by_maxEE(fastqs, 1, 150)
         self.assertEqual(isinstance(df, pd.DataFrame), True)
+        self.assertEqual(["float64", "float64"], [str(t) for t in df.dtypes])
+
+    def test_retained_reads_by_maxEE(self):
+        fastqs = reader.FastqReader("./test_data/LOZ_Nano_Trunc.fastq")
+
+        # check input types
+        self.assertRaises(
+            TypeError, GME.retained_reads_by_maxEE, "not_a_reader", [0], [150]
+        )
+        self.assertRaises(ValueError, GME.retained_reads_by_maxEE, fastqs, [10], [5])
+
+        # compare with the sum of expected errors of each read
+        df = GME.retained_reads_by_maxEE(fastqs, [0, 10], [150, 251, 260], [0.5, 2.0])
+        self.assertEqual(len(df), 12)
+
+        ee_scores = fastqs.get_seq_ee_errors()
+        for row in df.itertuples():
+            window_ee = ee_scores.iloc[:, row.LeftIndex : row.RightIndex].sum(axis=1)
+            expected = int((window_ee <= row.MaxEE).sum())
+            if row.RightIndex > 251:
+                expected = 0
+            self.assertEqual(expected, row.RetainedReads)
 
 
 if __name__ == "__main__":
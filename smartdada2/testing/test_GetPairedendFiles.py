@@ -1,6 +1,8 @@
+import os
 import unittest
 
 import smartdada2.GetPairedendFiles as GPF
+from smartdada2.reader import reader
 
 
 class MyTestCase(unittest.TestCase):
@@ -10,8 +12,22 @@ class MyTestCase(unittest.TestCase):
             TypeError, GPF.getPairedFiles, "./test_data/SRR1591840_tunc.fastq", False
         )
 
-        # TODO
-        # run tests to make sure it works on proper test data
+    def test_get_paired_files_outputs(self):
+        input_fp = "./test_data/LOZ_Nano_Trunc.fastq"
+        GPF.getPairedFiles(input_fp, "paired_f.fastq", "paired_r.fastq")
+
+        # outputs contain the reads of each direction in file order
+        fqe = reader.FastqReader(input_fp)
+        for output_fp, expected in (
+            ("paired_f.fastq", fqe.get_forward_reads()),
+            ("paired_r.fastq", fqe.get_reverse_reads()),
+        ):
+            lines = []
+            for entry in expected:
+                lines.extend((entry.header, entry.seq, "+", entry.scores))
+            with open(output_fp) as f:
+                self.assertEqual(lines, f.read().splitlines())
+            os.remove(output_fp)
 
 
 if __name__ == "__main__":
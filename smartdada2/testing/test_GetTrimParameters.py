@@ -107,6 +107,19 @@ class MyTestCase(unittest.TestCase):
         df = GTP.read_size_by_avg_EE(test_data_fp, 0, 150)
         self.assertEqual(len(df), 2500)
 
+    def test_avg_EE_trim_grid(self):
+        # grid values match the per pair calculation
+        test_EE_list = [0.5, 0.1, 0.02, 0.01, 0.01, 0.03, 0.2, 0.4]
+        read_lens, avg_EEs = GTP.avg_EE_trim_grid(test_EE_list, [0, 1, 2], [6, 7, 8])
+        for row, left in enumerate([0, 1, 2]):
+            for col, right in enumerate([6, 7, 8]):
+                expected = GTP.get_trim_length_avgEE(test_EE_list, left, right)
+                self.assertEqual(read_lens[row, col], expected[2])
+                self.assertAlmostEqual(avg_EEs[row, col], expected[3])
+
+        # pairs without positions
+        self.assertRaises(ValueError, GTP.avg_EE_trim_grid, test_EE_list, [5], [5])
+
 
 if __name__ == "__main__":
     unittest.main()
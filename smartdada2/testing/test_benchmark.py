@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import smartdada2.testing.benchmark as bench
+from smartdada2.reader.reader import FastqReader
+from smartdada2.testing.help_test_funcs import synthetic_reads, write_synthetic_fastq
+
+
+class MyTestCase(unittest.TestCase):
+    def test_synthetic_fastq(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fpath = bench.synthetic_fastq(Path(tmp_dir), 300, seed=1)
+            with open(fpath, "rb") as f:
+                contents = f.read()
+
+            # same seed gives the same file
+            os.remove(fpath)
+            with open(bench.synthetic_fastq(Path(tmp_dir), 300, seed=1), "rb") as f:
+                self.assertEqual(contents, f.read())
+
+            test_reader = FastqReader(fpath)
+            self.assertEqual(300, test_reader.total_reads())
+            self.assertEqual(150, len(list(test_reader.get_reverse_reads())))
+
+    def test_write_synthetic_fastq(self):
+        self.assertRaises(
+            ValueError, list, synthetic_reads(10, length_distribution="poisson")
+        )
+        self.assertRaises(ValueError, list, synthetic_reads(10, min_length=300))
+
+        # the same seed gives the same reads
+        options = dict(
+            read_length=150,
+            length_distribution="uniform",
+            min_length=100,
+            ambiguous_rate=0.05,
+            seed=3,
+            chunk_size=400,
+        )
+        first = b"".join(chunk.tobytes() for chunk in synthetic_reads(1000, **options))
+        second = b"".join(chunk.tobytes() for chunk in synthetic_reads(1000, **options))
+        self.assertEqual(first, second)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fpath = os.path.join(tmp_dir, "synthetic.fastq")
+            write_synthetic_fastq(fpath, 1000, **options)
+            with open(fpath, "rb") as f:
+                self.assertEqual(first, f.read())
+
+            entries = list(FastqReader(fpath).iter_reads())
+
+        # interleaved pairs share the read number
+        self.assertEqual(1000, len(entries))
+        self.assertEqual([False, True] * 500, [entry.rseq for entry in entries])
+        self.assertEqual(entries[0].header[:-8], entries[1].header[:-8])
+        self.assertNotEqual(entries[0].header, entries[2].header)
+
+        lengths = np.array([len(entry.seq) for entry in entries])
+        self.assertTrue(((lengths >= 100) & (lengths <= 150)).all())
+        self.assertEqual(lengths.tolist(), [len(entry.scores) for entry in entries])
+
+        # ambiguous bases have the lowest score
+        seqs = "".join(entry.seq for entry in entries)
+        scores = "".join(entry.scores for entry in entries)
+        ambiguous = [i for i, base in enumerate(seqs) if base == "N"]
+        self.assertAlmostEqual(0.05, len(ambiguous) / len(seqs), delta=0.01)
+        self.assertEqual({"#"}, {scores[i] for i in ambiguous})
+        self.assertTrue(set(scores) <= set(chr(33 + q) for q in range(2, 42)))
+
+    def test_run_suite(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = bench.run_suite([2000], ["profile", "subsample"], Path(tmp_dir))
+
+        self.assertIn("commit", report["metadata"])
+        self.assertEqual(
+            ["profile", "subsample"], [result["case"] for result in report["results"]]
+        )
+        for result in report["results"]:
+            self.assertEqual("ok", result["status"])
+            self.assertGreater(result["reads_per_s"], 0)
+            self.assertGreater(result["peak_rss_mb"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from smartdada2.reader import phred
+
+
+class MyTestCase(unittest.TestCase):
+    def test_phred_to_ee(self):
+        # lookup table and direct calculation
+        scores = np.array([0, 10, 20, 30, 40], dtype=np.uint8)
+        expected = [1.0, 0.1, 0.01, 0.001, 0.0001]
+        np.testing.assert_allclose(phred.phred_to_ee(scores), expected)
+        np.testing.assert_allclose(phred.phred_to_ee(scores.astype(float)), expected)
+
+    def test_ee_matrix_padding(self):
+        # padded positions should not contribute expected errors
+        scores = np.array([[10, 20, 30], [10, 20, 0]], dtype=np.uint8)
+        lengths = np.array([3, 2])
+        ee_scores = phred.ee_matrix(scores, lengths)
+        self.assertEqual(ee_scores[1, 2], 0.0)
+        self.assertTrue(np.isnan(phred.ee_matrix(scores, lengths, np.nan)[1, 2]))
+
+    def test_read_ee_sums(self):
+        scores = np.array([[10, 20, 30], [10, 20, 0]], dtype=np.uint8)
+        lengths = np.array([3, 2])
+        np.testing.assert_allclose(phred.read_ee_sums(scores, lengths), [0.111, 0.11])
+        np.testing.assert_allclose(
+            phred.read_ee_sums(scores, lengths, 1, 3), [0.011, 0.01]
+        )
+
+        # cumulative expected errors give the same window sums
+        cumulative = phred.cumulative_ee(scores, lengths)
+        self.assertEqual(cumulative.shape, (2, 4))
+        np.testing.assert_allclose(cumulative[:, 3] - cumulative[:, 1], [0.011, 0.01])
+
+
+if __name__ == "__main__":
+    unittest.main()
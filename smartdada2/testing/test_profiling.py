@@ -0,0 +1,106 @@
+import importlib
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+import smartdada2.GetPairedendFiles as GPF
+import smartdada2.GetSubsamples as GSS
+from smartdada2.common import profiling
+from smartdada2.common.profiling import StageProfiler
+from smartdada2.reader import reader
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.input_fp = "./test_data/LOZ_Nano_Trunc.fastq"
+        self.input_size = os.path.getsize(self.input_fp)
+        self.outputs = ["profile.json", "profile.prof", "out_f.fastq", "out_r.fastq"]
+
+    def tearDown(self):
+        for fpath in self.outputs:
+            if os.path.exists(fpath):
+                os.remove(fpath)
+
+    def test_stage_profiler(self):
+        fqe = reader.FastqReader(self.input_fp)
+        profiler = StageProfiler("test", cprofile_path="profile.prof")
+
+        # reads and bytes are taken from the loading counters of the reader
+        with profiler.stage("parsing", reader=fqe):
+            fqe.profile()
+        with profiler.stage("cached", reader=fqe):
+            fqe.profile()
+        with profiler.stage("output") as stats:
+            stats.bytes_written = 10
+
+        profiler.write("profile.json", input=self.input_fp)
+        with open("profile.json") as f:
+            report = json.load(f)
+        self.assertTrue(os.path.exists("profile.prof"))
+
+        self.assertEqual("test", report["command"])
+        self.assertEqual(self.input_fp, report["input"])
+        parsing, cached, output = report["stages"]
+        self.assertEqual(
+            ["parsing", "cached", "output"],
+            [parsing["name"], cached["name"], output["name"]],
+        )
+        self.assertEqual(
+            (8, self.input_size), (parsing["reads"], parsing["bytes_read"])
+        )
+        self.assertEqual((0, 0), (cached["reads"], cached["bytes_read"]))
+        self.assertEqual((None, 10), (output["reads"], output["bytes_written"]))
+        for stats in report["stages"]:
+            self.assertGreaterEqual(stats["wall_seconds"], 0)
+            self.assertGreater(stats["peak_rss_mb"], 0)
+
+    def test_disabled_profiler(self):
+        profiler = StageProfiler("test", enabled=False)
+        with profiler.stage("parsing") as stats:
+            pass
+        profiler.write("profile.json")
+
+        self.assertEqual(0.0, stats.wall_seconds)
+        self.assertEqual([], profiler.stages)
+        self.assertFalse(os.path.exists("profile.json"))
+
+    def test_without_resource(self):
+        """Checks if the module and the scripts work on platforms without the
+        resource module and /proc (windows)"""
+        with mock.patch.dict(sys.modules, {"resource": None}):
+            importlib.reload(profiling)
+            with mock.patch.object(profiling, "Path") as path:
+                path.return_value.exists.return_value = False
+                self.assertIsNone(profiling.peak_rss_mb())
+
+                profiler = profiling.StageProfiler("test")
+                with profiler.stage("parsing"):
+                    pass
+                report = profiler.report()
+        importlib.reload(profiling)
+
+        self.assertIsNone(report["total"]["peak_rss_mb"])
+        self.assertIsNone(report["stages"][0]["peak_rss_mb"])
+
+    def test_script_profiles(self):
+        profiler = StageProfiler("GetSubsamples")
+        GSS.subsample(self.input_fp, 3, "out_f.fastq", profiler=profiler)
+        sampling, writing = profiler.stages
+        self.assertEqual((8, self.input_size), (sampling.reads, sampling.bytes_read))
+        self.assertEqual(3, writing.reads)
+        self.assertEqual(os.path.getsize("out_f.fastq"), writing.bytes_written)
+
+        profiler = StageProfiler("GetPairedendFiles")
+        GPF.getPairedFiles(
+            self.input_fp, "out_f.fastq", "out_r.fastq", profiler=profiler
+        )
+        (splitting,) = profiler.stages
+        self.assertEqual((8, self.input_size), (splitting.reads, splitting.bytes_read))
+        written = os.path.getsize("out_f.fastq") + os.path.getsize("out_r.fastq")
+        self.assertEqual(written, splitting.bytes_written)
+
+
+if __name__ == "__main__":
+    unittest.main()